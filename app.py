@@ -1,13 +1,17 @@
 from flask import Flask, render_template, request, send_file, redirect, url_for, jsonify
-from simplified_category_scraper import scrape_category_pages, export_to_csv, scrap_leclerc_product, get_status, get_estimated_time_remaining, timestamp_to_time
+from simplified_category_scraper import scrape_category_pages, http_scrape_category, learn_listing_request, export_to_csv, scrap_leclerc_product, get_status, get_estimated_time_remaining, timestamp_to_time, initialize_webdriver, accept_cookies
+from driver_manager import WarmDriverPool
+from readiness import get_wait_stats
+from rate_limiter import rate_limiter
+from lean_browsing import get_lean_stats
+from network_capture import get_capture_stats
+from listing_api import LISTING_API_FILE
+from columnar_export import export_csv_to_parquet, parquet_filename
 import os
 import csv
 import threading
 import sys
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import atexit
 from datetime import datetime
 import logging
 
@@ -29,6 +33,32 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SPECIFIC_CSV_PATH = os.path.join(BASE_DIR, "produit_leclerc.csv")
 CATEGORY_CSV_PATH = os.path.join(BASE_DIR, "produits_leclerc_soinsvisage.csv")
 
+# Page ouverte par les navigateurs préchauffés pour accepter les cookies
+LECLERC_HOME_URL = "https://www.e.leclerc/"
+
+def crawl_category(category_url, max_pages, learn_listing_api=False):
+    """Crawl de catégorie, précédé si demandé de l'apprentissage de sa requête de listing
+
+    La requête apprise (LISTING_API_FILE) permet de paginer en HTTP; sans elle, ou si
+    l'apprentissage échoue, la découverte se fait avec le navigateur.
+    """
+    if learn_listing_api:
+        try:
+            learn_listing_request(category_url, LISTING_API_FILE)
+        except Exception as e:
+            logger.warning(f"Requête de listing non apprise ({e}), découverte par le navigateur")
+    return scrape_category_pages(category_url, max_pages, output_file=CATEGORY_CSV_PATH, listing_api_file=LISTING_API_FILE)
+
+def create_warm_driver():
+    """Crée un navigateur avec la bannière de cookies déjà acceptée"""
+    driver = initialize_webdriver()
+    accept_cookies(driver, LECLERC_HOME_URL)
+    return driver
+
+# Navigateurs gardés ouverts entre les requêtes pour les recherches ponctuelles
+browser_pool = WarmDriverPool(create_warm_driver)
+atexit.register(browser_pool.close_all)
+
 # Fonction de diagnostic pour les permissions
 def check_file_permissions():
     """Vérifie et corrige les permissions de fichiers"""
@@ -80,26 +110,21 @@ def index():
         try:
             if scrape_type == "specific":
                 # Scraper les produits spécifiques
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                
                 urls = [
                     "https://www.e.leclerc/fp/avene-cicalfate-creme-reparatrice-protectrice-peaux-sensibles-et-irritees-100-ml-3282770204681",
                     "https://www.e.leclerc/fp/avene-cicalfate-creme-reparatrice-protectrice-peaux-sensibles-et-irritees-40-ml-3282770204667"
                 ]
                 
-                try:
-                    results = [scrap_leclerc_product(url, driver) for url in urls]
-                    results = [r for r in results if r]  # Filtrer les résultats None
-                    export_to_csv(results, filename=SPECIFIC_CSV_PATH)
-                    status = f"Scraping de {len(urls)} produits spécifiques terminé avec succès!"
-                finally:
-                    driver.quit()
+                # Emprunter un navigateur préchauffé du pool
+                with browser_pool.lease() as (driver, lease_info):
+                    results = []
+                    for url in urls:
+                        product_data = scrap_leclerc_product(url, driver)
+                        lease_info["pages"] += 1
+                        if product_data:
+                            results.append(product_data)
+                export_to_csv(results, filename=SPECIFIC_CSV_PATH)
+                status = f"Scraping de {len(urls)} produits spécifiques terminé avec succès!"
                 
             elif scrape_type == "category":
                 # Scraper toute la catégorie (exécution en arrière-plan)
@@ -110,9 +135,13 @@ def index():
                 category_url = "https://www.e.leclerc/cat/marques-parapharmacie"
                 
                 # Passer le chemin absolu du fichier CSV
-                threading.Thread(
-                    target=lambda: scrape_category_pages(category_url, max_pages, output_file=CATEGORY_CSV_PATH)
-                ).start()
+                if request.form.get("engine") == "http":
+                    # Listing et fiches en HTTP, navigateur seulement en secours
+                    target = lambda: http_scrape_category(category_url, max_pages, output_file=CATEGORY_CSV_PATH)
+                else:
+                    learn_listing_api = request.form.get("learn_listing_api") == "1"
+                    target = lambda: crawl_category(category_url, max_pages, learn_listing_api)
+                threading.Thread(target=target).start()
                 
                 # Rediriger vers la page de statut
                 return redirect(url_for('status_page'))
@@ -144,6 +173,10 @@ def status_api():
     """Endpoint API pour obtenir le statut actuel du scraping"""
     current_status = get_status()
     current_status["estimated_time_remaining"] = get_estimated_time_remaining()
+    current_status["readiness_waits"] = get_wait_stats()
+    current_status["rate_limit"] = rate_limiter.get_stats()
+    current_status["lean_browsing"] = get_lean_stats()
+    current_status["network_capture"] = get_capture_stats()
     return jsonify(current_status)
 
 @app.route("/results")
@@ -266,7 +299,7 @@ def download_csv():
 
 @app.route("/download/<file_type>")
 def download_specific_csv(file_type):
-    """Télécharger un fichier CSV spécifique"""
+    """Télécharger un fichier CSV spécifique (ou sa version Parquet avec ?format=parquet)"""
     try:
         if file_type == "specific":
             target_file = SPECIFIC_CSV_PATH
@@ -284,6 +317,14 @@ def download_specific_csv(file_type):
             if file_size == 0:
                 return "Fichier vide, aucune donnée à télécharger", 404
             
+            if request.args.get("format") == "parquet":
+                return send_file(
+                    export_csv_to_parquet(target_file),
+                    as_attachment=True,
+                    download_name=parquet_filename(filename),
+                    mimetype='application/vnd.apache.parquet'
+                )
+            
             try:
                 return send_file(
                     target_file,
@@ -314,6 +355,8 @@ def download_specific_csv(file_type):
 def check_environment():
     """Vérifier l'environnement au démarrage de l'application"""
     logger.info("----- DIAGNOSTIC D'ENVIRONNEMENT -----")
+    # Préchauffer les navigateurs en arrière-plan
+    browser_pool.start()
     # Vérifier les chemins
     logger.info(f"Répertoire de base: {BASE_DIR}")
     logger.info(f"Chemin du CSV spécifique: {SPECIFIC_CSV_PATH}")
@@ -0,0 +1,101 @@
+"""
+Export colonnaire (Parquet) des résultats de scraping
+
+Contrairement au CSV, les colonnes sont typées: prix en centimes (int64), EAN en
+int64, date en date, disponibilité en booléen. Marque et catégorie, très répétées,
+sont encodées en dictionnaire. Les analystes rechargent donc le fichier sans
+réanalyser les prix. L'écriture se fait par groupes de lignes pour borner la mémoire.
+"""
+import os
+import csv
+import logging
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from product import as_product
+from storage import resolve_output_path
+
+logger = logging.getLogger(__name__)
+
+# Une seule conversion CSV -> Parquet à la fois
+parquet_export_lock = threading.Lock()
+
+# Schéma typé du fichier Parquet
+PARQUET_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("date", pa.date32()),
+    ("name", pa.string()),
+    ("brand", pa.dictionary(pa.int32(), pa.string())),
+    ("category", pa.dictionary(pa.int32(), pa.string())),
+    ("ean", pa.int64()),
+    ("price_cents", pa.int64()),
+    ("available", pa.bool_()),
+])
+
+# Lignes par groupe (row group) écrit dans le fichier
+PARQUET_ROW_GROUP_SIZE = 5000
+
+def parquet_filename(csv_filename):
+    """Nom du fichier Parquet correspondant à un export CSV"""
+    return os.path.splitext(csv_filename)[0] + ".parquet"
+
+def products_to_table(products):
+    """Convertit une liste de produits (Product ou dict aux colonnes du CSV) en table Arrow"""
+    products = [as_product(product) for product in products]
+    columns = {name: [getattr(product, name) for product in products] for name in PARQUET_SCHEMA.names}
+    return pa.Table.from_pydict(columns, schema=PARQUET_SCHEMA)
+
+def export_to_parquet(products, filename, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Écrit les produits dans un fichier Parquet, par groupes de lignes
+
+    Les produits peuvent être fournis par un itérateur: seul un groupe est en mémoire.
+    Le fichier est écrit sous un nom temporaire propre à cet appel puis renommé.
+    """
+    path = resolve_output_path(filename)
+    prefix = os.path.splitext(os.path.basename(path))[0] + "."
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=prefix, suffix=".parquet.tmp", delete=False) as tmp_file:
+        tmp_path = tmp_file.name
+    count = 0
+    batch = []
+    try:
+        with pq.ParquetWriter(tmp_path, PARQUET_SCHEMA) as writer:
+            for product in products:
+                batch.append(product)
+                if len(batch) >= row_group_size:
+                    writer.write_table(products_to_table(batch))
+                    count += len(batch)
+                    batch = []
+            if batch or count == 0:
+                writer.write_table(products_to_table(batch))
+                count += len(batch)
+        # NamedTemporaryFile crée le fichier en 0600
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"✅ Fichier Parquet créé: {path}, {count} lignes")
+    return path
+
+def iter_csv_products(filename):
+    """Relit un export CSV ligne par ligne"""
+    with open(resolve_output_path(filename), mode="r", newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield as_product(record)
+
+def export_csv_to_parquet(csv_filename, parquet_file=None):
+    """Convertit un export CSV en Parquet (régénéré seulement si le CSV est plus récent)
+
+    Les conversions sont sérialisées: des téléchargements simultanés attendent la
+    première au lieu de régénérer chacun le fichier.
+    """
+    csv_path = resolve_output_path(csv_filename)
+    path = resolve_output_path(parquet_file or parquet_filename(csv_filename))
+    with parquet_export_lock:
+        if os.path.isfile(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+            return path
+        return export_to_parquet(iter_csv_products(csv_path), path)
@@ -0,0 +1,146 @@
+"""
+Point de reprise d'un crawl de catégorie, indexé par URL
+
+Le journal est un fichier JSON Lines en ajout seul: une ligne d'en-tête (URL de la
+catégorie), une ligne par page de listing terminée avec ses liens produits, et une
+ligne par produit écrit. Au redémarrage, les pages terminées ne sont pas relistées,
+les produits déjà écrits sont ignorés et les liens restants sont remis en file.
+
+Le journal est aussi un sink du BackgroundWriter: les produits sont marqués comme
+terminés après leur écriture dans les autres sinks, et ces marques ne sont écrites
+sur disque qu'au checkpoint, après celui du CSV ou de la base.
+"""
+import os
+import json
+import logging
+import threading
+
+from storage import resolve_output_path
+
+logger = logging.getLogger(__name__)
+
+def crawl_checkpoint_filename(output_file):
+    """Nom du journal de reprise associé à un fichier de sortie"""
+    return output_file + ".crawl"
+
+class CrawlCheckpoint:
+    """Journal des pages de listing et des produits terminés d'un crawl"""
+
+    def __init__(self, filename, category_url):
+        self.path = resolve_output_path(filename)
+        self.category_url = category_url
+        self.completed_pages = {}
+        self.completed_urls = set()
+        self.pending_done = []
+        self.file = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Relit le journal existant, retourne True s'il reprend la même catégorie"""
+        self.completed_pages = {}
+        self.completed_urls = set()
+        if not os.path.isfile(self.path):
+            return False
+        with open(self.path, mode="r", encoding="utf-8") as f:
+            lines = iter(f)
+            try:
+                header = json.loads(next(lines))
+            except (StopIteration, ValueError):
+                return False
+            if header.get("category_url") != self.category_url:
+                logger.info(f"Journal de reprise {self.path} ignoré: autre catégorie")
+                return False
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne incomplète après un crash
+                    break
+                if "page" in entry:
+                    self.completed_pages[entry["page"]] = entry.get("links", [])
+                elif "done" in entry:
+                    self.completed_urls.add(entry["done"])
+        logger.info(
+            f"Reprise du crawl: {len(self.completed_pages)} pages et "
+            f"{len(self.completed_urls)} produits déjà terminés, {len(self.pending_urls())} liens en attente"
+        )
+        return True
+
+    def open(self):
+        """Réécrit le journal compacté (atomiquement) puis l'ouvre en ajout"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as f:
+            f.write(json.dumps({"category_url": self.category_url}) + "\n")
+            for page, links in sorted(self.completed_pages.items()):
+                f.write(json.dumps({"page": page, "links": links}) + "\n")
+            for url in self.completed_urls:
+                f.write(json.dumps({"done": url}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, mode="a", encoding="utf-8")
+        return self
+
+    def is_page_done(self, page):
+        return page in self.completed_pages
+
+    def is_done(self, url):
+        with self.lock:
+            return url in self.completed_urls
+
+    def done_urls(self):
+        """Produits déjà écrits (copie)"""
+        with self.lock:
+            return list(self.completed_urls)
+
+    def pending_urls(self):
+        """Liens des pages terminées qui n'ont pas encore été écrits"""
+        with self.lock:
+            return [
+                link
+                for page in sorted(self.completed_pages)
+                for link in self.completed_pages[page]
+                if link not in self.completed_urls
+            ]
+
+    def complete_page(self, page, links):
+        """Marque une page de listing comme terminée (liens tous mis en file)"""
+        with self.lock:
+            self.completed_pages[page] = list(links)
+            self._append({"page": page, "links": list(links)})
+            self.file.flush()
+
+    def write(self, record):
+        """Marque le produit comme terminé (écrit sur disque au prochain checkpoint)"""
+        with self.lock:
+            self.completed_urls.add(record["Lien"])
+            self.pending_done.append(record["Lien"])
+
+    def checkpoint(self):
+        """Écrit les produits terminés depuis le dernier checkpoint"""
+        with self.lock:
+            for url in self.pending_done:
+                self._append({"done": url})
+            self.pending_done = []
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+
+    def close(self):
+        """Écrit les dernières marques et ferme le journal"""
+        if self.file is None:
+            return
+        try:
+            self.checkpoint()
+        finally:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """Supprime le journal une fois le crawl terminé"""
+        self.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+            logger.info(f"Crawl terminé, journal de reprise supprimé: {self.path}")
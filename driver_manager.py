@@ -0,0 +1,372 @@
+"""
+Gestion du cycle de vie des WebDrivers: réutilisation et recyclage
+
+Un même navigateur est réutilisé pour plusieurs URLs. Il est recyclé (fermé puis
+recréé à la demande) après un nombre de pages donné, lorsque la mémoire de Chrome
+dépasse un seuil, ou après plusieurs échecs consécutifs.
+
+Le binaire chromedriver est résolu une seule fois par version de Chrome et gardé
+dans un cache local.
+"""
+import os
+import re
+import json
+import time
+import logging
+import platform
+import threading
+import subprocess
+from contextlib import contextmanager
+import psutil
+from webdriver_manager.chrome import ChromeDriverManager
+
+logger = logging.getLogger(__name__)
+
+# Seuils de recyclage par défaut
+DRIVER_RECYCLE_CONFIG = {
+    "max_pages": 200,        # Pages chargées avant recyclage
+    "max_rss_mb": 1500,      # Mémoire résidente de Chrome (chromedriver + navigateurs)
+    "max_failures": 3,       # Échecs consécutifs avant recyclage
+}
+
+# Configuration par défaut du pool de navigateurs préchauffés
+WARM_POOL_CONFIG = {
+    "min_size": 1,           # Navigateurs gardés prêts en permanence
+    "max_size": 2,           # Navigateurs ouverts au maximum
+    "idle_timeout": 600,     # Secondes d'inactivité avant fermeture (au-delà de min_size)
+    "acquire_timeout": 60,   # Attente maximale d'un navigateur libre
+    "eviction_interval": 30, # Fréquence de vérification des navigateurs inactifs
+}
+
+# Cache local des chromedrivers résolus: version de Chrome -> chemin du binaire
+CHROMEDRIVER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chromedriver_cache.json")
+
+# Chemin résolu dans ce processus, partagé par tous les appelants
+resolved_chromedriver = {"version": None, "path": None}
+chromedriver_lock = threading.Lock()
+
+def get_chrome_version():
+    """Retourne la version de Chrome installée, ou None si elle est introuvable"""
+    system = platform.system()
+    if system == "Windows":
+        commands = [["reg", "query", r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon", "/v", "version"]]
+    elif system == "Darwin":
+        commands = [["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"]]
+    else:
+        commands = [[name, "--version"] for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")]
+    
+    for command in commands:
+        try:
+            output = subprocess.run(command, capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'(\d+\.\d+\.\d+\.\d+)', output)
+        if match:
+            return match.group(1)
+    return None
+
+def load_chromedriver_cache():
+    """Charge le cache local des chromedrivers"""
+    try:
+        with open(CHROMEDRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_chromedriver_cache(cache):
+    """Écrit le cache local des chromedrivers"""
+    try:
+        with open(CHROMEDRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Impossible d'écrire le cache chromedriver: {e}")
+
+def resolve_chromedriver_path():
+    """Retourne le chemin du chromedriver adapté au Chrome installé
+
+    La résolution (ChromeDriverManager) n'a lieu qu'une fois par version de Chrome:
+    le résultat est gardé en mémoire pour le processus et dans CHROMEDRIVER_CACHE_FILE
+    pour les redémarrages.
+    """
+    with chromedriver_lock:
+        if resolved_chromedriver["path"] and os.path.isfile(resolved_chromedriver["path"]):
+            return resolved_chromedriver["path"]
+        
+        chrome_version = get_chrome_version() or "inconnue"
+        cache = load_chromedriver_cache()
+        path = cache.get(chrome_version)
+        if path and os.path.isfile(path):
+            logger.info(f"Chromedriver trouvé dans le cache pour Chrome {chrome_version}: {path}")
+        else:
+            logger.info(f"Résolution du chromedriver pour Chrome {chrome_version}...")
+            path = ChromeDriverManager().install()
+            cache[chrome_version] = path
+            save_chromedriver_cache(cache)
+            logger.info(f"Chromedriver mis en cache: {path}")
+        
+        resolved_chromedriver["version"] = chrome_version
+        resolved_chromedriver["path"] = path
+        return path
+
+def invalidate_chromedriver_cache():
+    """Oublie le chromedriver résolu (par exemple s'il ne démarre plus après une mise à jour de Chrome)"""
+    with chromedriver_lock:
+        chrome_version = resolved_chromedriver["version"]
+        resolved_chromedriver["version"] = None
+        resolved_chromedriver["path"] = None
+        if chrome_version:
+            cache = load_chromedriver_cache()
+            if cache.pop(chrome_version, None):
+                save_chromedriver_cache(cache)
+
+def get_driver_rss_mb(driver):
+    """Mémoire résidente (Mo) de chromedriver et de tous les processus Chrome lancés"""
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        rss = 0
+        for proc in processes:
+            try:
+                rss += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss / (1024 * 1024)
+    except Exception as e:
+        logger.warning(f"Impossible de mesurer la mémoire du WebDriver: {e}")
+        return 0
+
+class DriverManager:
+    """Fournit un WebDriver réutilisable et le recycle selon DRIVER_RECYCLE_CONFIG
+
+    factory est appelée sans argument pour créer un nouveau WebDriver prêt à l'emploi.
+    """
+
+    def __init__(self, factory, max_pages=None, max_rss_mb=None, max_failures=None, name="WebDriver"):
+        self.factory = factory
+        self.max_pages = max_pages or DRIVER_RECYCLE_CONFIG["max_pages"]
+        self.max_rss_mb = max_rss_mb or DRIVER_RECYCLE_CONFIG["max_rss_mb"]
+        self.max_failures = max_failures or DRIVER_RECYCLE_CONFIG["max_failures"]
+        self.name = name
+        self.driver = None
+        self.pages = 0
+        self.failures = 0
+        self.recycles = 0
+
+    def get(self):
+        """Retourne le WebDriver courant, en le créant si nécessaire"""
+        if self.driver is None:
+            self.driver = self.factory()
+            self.pages = 0
+            self.failures = 0
+        return self.driver
+
+    def record_page(self, success):
+        """Signale le résultat d'une page et recycle le WebDriver si un seuil est atteint"""
+        self.pages += 1
+        self.failures = 0 if success else self.failures + 1
+        reason = self.recycle_reason()
+        if reason:
+            self.recycle(reason)
+
+    def recycle_reason(self):
+        """Retourne la raison du recyclage, ou None si le WebDriver peut continuer"""
+        if self.driver is None:
+            return None
+        if self.failures >= self.max_failures:
+            return f"{self.failures} échecs consécutifs"
+        if self.pages >= self.max_pages:
+            return f"{self.pages} pages chargées"
+        rss_mb = get_driver_rss_mb(self.driver)
+        if rss_mb > self.max_rss_mb:
+            return f"mémoire de {rss_mb:.0f} Mo"
+        return None
+
+    def recycle(self, reason):
+        """Ferme le WebDriver courant; le suivant sera créé au prochain get()"""
+        logger.info(f"Recyclage du {self.name} ({reason})")
+        self.recycles += 1
+        self.close()
+
+    def close(self):
+        """Ferme le WebDriver courant s'il existe"""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"Erreur lors de la fermeture du {self.name}: {e}")
+            self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+def is_driver_healthy(driver):
+    """Vérifie que le navigateur répond encore"""
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+class WarmDriverPool:
+    """Pool de WebDrivers préchauffés (cookies acceptés) partagé entre les requêtes
+
+    Les navigateurs sont vérifiés avant chaque prêt, recyclés selon
+    DRIVER_RECYCLE_CONFIG, et fermés après une période d'inactivité au-delà de min_size.
+    """
+
+    def __init__(self, factory, min_size=None, max_size=None, idle_timeout=None,
+                 acquire_timeout=None, eviction_interval=None):
+        self.factory = factory
+        self.min_size = WARM_POOL_CONFIG["min_size"] if min_size is None else min_size
+        self.max_size = max_size or WARM_POOL_CONFIG["max_size"]
+        self.idle_timeout = idle_timeout or WARM_POOL_CONFIG["idle_timeout"]
+        self.acquire_timeout = acquire_timeout or WARM_POOL_CONFIG["acquire_timeout"]
+        self.eviction_interval = eviction_interval or WARM_POOL_CONFIG["eviction_interval"]
+        self.condition = threading.Condition()
+        self.idle = []          # [(driver, dernière utilisation)]
+        self.pages = {}         # id(driver) -> pages chargées
+        self.total = 0          # Navigateurs ouverts (libres + prêtés)
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        """Préchauffe min_size navigateurs et lance l'éviction des inactifs en arrière-plan"""
+        with self.condition:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self._run_maintenance, daemon=True).start()
+
+    def _create(self):
+        """Crée un navigateur (la place est déjà réservée dans self.total)"""
+        try:
+            driver = self.factory()
+        except Exception:
+            with self.condition:
+                self.total -= 1
+                self.condition.notify()
+            raise
+        self.pages[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver, reason):
+        """Ferme un navigateur et libère sa place dans le pool"""
+        logger.info(f"Fermeture d'un navigateur du pool ({reason})")
+        self.pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Erreur lors de la fermeture d'un navigateur du pool: {e}")
+        with self.condition:
+            self.total -= 1
+            self.condition.notify()
+
+    def acquire(self):
+        """Emprunte un navigateur sain, en le créant si le pool n'est pas plein"""
+        deadline = time.time() + self.acquire_timeout
+        while True:
+            with self.condition:
+                if self.closed:
+                    raise Exception("Le pool de navigateurs est fermé")
+                if self.idle:
+                    driver, _ = self.idle.pop()
+                elif self.total < self.max_size:
+                    self.total += 1
+                    driver = None
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise Exception("Aucun navigateur disponible dans le pool")
+                    self.condition.wait(remaining)
+                    continue
+            if driver is None:
+                return self._create()
+            if is_driver_healthy(driver):
+                return driver
+            self._discard(driver, "ne répond plus")
+
+    def release(self, driver, pages=0, healthy=True):
+        """Rend un navigateur au pool, ou le ferme s'il doit être recyclé"""
+        self.pages[id(driver)] = self.pages.get(id(driver), 0) + pages
+        if not healthy:
+            self._discard(driver, "erreur pendant l'utilisation")
+            return
+        if self.pages[id(driver)] >= DRIVER_RECYCLE_CONFIG["max_pages"]:
+            self._discard(driver, f"{self.pages[id(driver)]} pages chargées")
+            return
+        rss_mb = get_driver_rss_mb(driver)
+        if rss_mb > DRIVER_RECYCLE_CONFIG["max_rss_mb"]:
+            self._discard(driver, f"mémoire de {rss_mb:.0f} Mo")
+            return
+        with self.condition:
+            if self.closed:
+                closed = True
+            else:
+                closed = False
+                self.idle.append((driver, time.time()))
+                self.condition.notify()
+        if closed:
+            self._discard(driver, "pool fermé")
+
+    @contextmanager
+    def lease(self):
+        """Emprunte un navigateur le temps d'un bloc with
+
+        Le bloc peut indiquer le nombre de pages chargées via lease_info["pages"].
+        """
+        driver = self.acquire()
+        lease_info = {"pages": 0}
+        try:
+            yield driver, lease_info
+        except Exception:
+            self.release(driver, lease_info["pages"], healthy=is_driver_healthy(driver))
+            raise
+        self.release(driver, lease_info["pages"])
+
+    def _evict_idle(self):
+        """Ferme les navigateurs inactifs depuis plus de idle_timeout, au-delà de min_size"""
+        now = time.time()
+        expired = []
+        with self.condition:
+            while self.idle and self.total - len(expired) > self.min_size:
+                driver, last_used = self.idle[0]
+                if now - last_used < self.idle_timeout:
+                    break
+                self.idle.pop(0)
+                expired.append(driver)
+        for driver in expired:
+            self._discard(driver, "inactif")
+
+    def _prewarm(self):
+        """Complète le pool jusqu'à min_size navigateurs prêts"""
+        while True:
+            with self.condition:
+                if self.closed or self.total >= self.min_size:
+                    return
+                self.total += 1
+            try:
+                driver = self._create()
+            except Exception as e:
+                logger.warning(f"Impossible de préchauffer un navigateur: {e}")
+                return
+            self.release(driver)
+            logger.info("Navigateur préchauffé ajouté au pool")
+
+    def _run_maintenance(self):
+        """Boucle d'arrière-plan: préchauffage et éviction"""
+        while not self.closed:
+            self._prewarm()
+            self._evict_idle()
+            time.sleep(self.eviction_interval)
+
+    def close_all(self):
+        """Ferme tous les navigateurs libres; les navigateurs prêtés seront fermés à leur retour"""
+        with self.condition:
+            self.closed = True
+            idle = [driver for driver, _ in self.idle]
+            self.idle = []
+        for driver in idle:
+            self._discard(driver, "arrêt du pool")
@@ -0,0 +1,242 @@
+"""
+Logique d'extraction des fiches produits Leclerc, indépendante du navigateur
+
+Les sélecteurs et les règles de repli (fallback) sont partagés par tous les modes
+d'extraction: le navigateur fournit seulement les textes candidats, les décisions
+sont prises ici en Python.
+"""
+import re
+import logging
+from datetime import datetime
+
+from structured_data import parse_structured_data, is_valid_ean13
+
+logger = logging.getLogger(__name__)
+
+# Sélecteurs CSS utilisés pour chaque champ, par ordre de priorité
+TITLE_SELECTORS = ["h1.product-block-title", "h1.cbBiP", "h1"]
+EUROS_SELECTORS = [".vcEUR", "span.price-unit", "div.price-unit"]
+CENTS_SELECTORS = [".bYgjT", "span.price-cents"]
+PRICE_SELECTOR = ".price, .product-price, [data-testid*='price']"
+BRAND_SELECTORS = ["p.product-brand", ".brand-name", "[data-testid*='brand']"]
+
+# Blocs de données structurées (JSON-LD et état de transfert Angular)
+LD_JSON_SELECTOR = "script[type='application/ld+json']"
+TRANSFER_STATE_SELECTOR = "script#ng-state, script[id$='-state'][type='application/json']"
+
+# Catégorie par défaut des produits scrapés
+DEFAULT_CATEGORY = "Marques Parapharmacie"
+
+# Script exécuté en un seul aller-retour avec chromedriver.
+# Il renvoie tous les textes candidats, les règles de repli sont appliquées en Python.
+PRODUCT_EXTRACTION_SCRIPT = """
+const selectors = arguments[0];
+const textOf = (el) => (el && el.innerText ? el.innerText.trim() : "");
+const firstMatch = (list) => {
+    for (const selector of list) {
+        const el = document.querySelector(selector);
+        if (el) {
+            return textOf(el);
+        }
+    }
+    return null;
+};
+const allTexts = (selector) => Array.from(document.querySelectorAll(selector)).map(textOf);
+const scriptTexts = (selector) => Array.from(document.querySelectorAll(selector)).map((el) => el.textContent || "");
+return {
+    ld_json: scriptTexts(selectors.ld_json),
+    state: scriptTexts(selectors.state),
+    title: firstMatch(selectors.title),
+    h1_texts: allTexts("h1"),
+    td_texts: allTexts("td"),
+    euros: firstMatch(selectors.euros),
+    cents: firstMatch(selectors.cents),
+    price_texts: allTexts(selectors.price),
+    brand: firstMatch(selectors.brand),
+    body_text: document.body ? document.body.innerText : ""
+};
+"""
+
+# Sélecteurs des liens produits sur une page de listing, par ordre de priorité
+LISTING_SELECTORS = [
+    "a.product-card-link",                    # Sélecteur principal
+    ".product-thumbnail a",                   # Alternative 1
+    ".product-card a",                        # Alternative 2
+    "a[href*='/fp/']",                        # Lien contenant '/fp/' (product page)
+    "a[href*='/cat/']:not([href*='page='])",  # Lien vers une catégorie mais pas pagination
+]
+
+# Script de listing exécuté en un seul aller-retour: tous les liens /fp/ dédoublonnés
+# dans l'ordre de la page, avec le nombre de nouveaux liens apportés par chaque sélecteur.
+# Si aucun sélecteur ne trouve de produit, tous les liens <a> de la page sont parcourus.
+LINK_EXTRACTION_SCRIPT = """
+const selectors = arguments[0];
+const links = [];
+const seen = new Set();
+const matched = {};
+const collect = (elements) => {
+    let added = 0;
+    for (const el of elements) {
+        const href = el.href;
+        if (href && href.includes("/fp/") && !seen.has(href)) {
+            seen.add(href);
+            links.push(href);
+            added += 1;
+        }
+    }
+    return added;
+};
+for (const selector of selectors) {
+    try {
+        matched[selector] = collect(document.querySelectorAll(selector));
+    } catch (e) {
+        matched[selector] = 0;
+    }
+}
+if (!links.length) {
+    matched["a"] = collect(document.getElementsByTagName("a"));
+}
+return {links: links, matched: matched};
+"""
+
+def get_script_selectors():
+    """Retourne les sélecteurs passés en argument au script d'extraction"""
+    return {
+        "title": TITLE_SELECTORS,
+        "euros": EUROS_SELECTORS,
+        "cents": CENTS_SELECTORS,
+        "price": PRICE_SELECTOR,
+        "brand": BRAND_SELECTORS,
+        "ld_json": LD_JSON_SELECTOR,
+        "state": TRANSFER_STATE_SELECTOR,
+    }
+
+def extract_ean_from_url(url):
+    """Extrait un EAN (13 chiffres) depuis l'URL du produit"""
+    for part in url.split('-'):
+        # Nettoyage et vérification si c'est un EAN (13 chiffres)
+        cleaned_part = re.sub(r'\D', '', part)
+        if len(cleaned_part) == 13 and cleaned_part.isdigit():
+            return cleaned_part
+    return ""
+
+def pick_title(title, h1_texts):
+    """Choisit le nom du produit parmi les candidats"""
+    if title:
+        return title.strip()
+
+    # Si toujours pas de titre, essayer une recherche plus large
+    for text in h1_texts or []:
+        if text and len(text.strip()) > 5:  # Un titre significatif
+            return text.strip()
+    return ""
+
+def _ean_candidates(url, td_texts, body_text):
+    """EAN candidats (13 chiffres) dans l'ordre de priorité: URL, tableaux, texte"""
+    # Méthode 1: Extraire de l'URL
+    for part in url.split('-'):
+        cleaned_part = re.sub(r'\D', '', part)
+        if len(cleaned_part) == 13:
+            yield cleaned_part
+
+    # Méthode 2: Chercher dans les tableaux de données
+    for text in td_texts or []:
+        cleaned_text = re.sub(r'\D', '', text.strip())
+        if len(cleaned_text) == 13:
+            yield cleaned_text
+
+    # Méthode 3: Recherche générique dans le texte de la page
+    yield from re.findall(r'\b\d{13}\b', body_text or "")
+
+def pick_ean(url, td_texts, body_text):
+    """Choisit l'EAN: URL, puis cellules de tableau, puis texte de la page
+
+    Un candidat dont la clé de contrôle est fausse est signalé puis ignoré au
+    profit du suivant.
+    """
+    rejected = set()
+    for ean in _ean_candidates(url, td_texts, body_text):
+        if is_valid_ean13(ean):
+            return ean
+        if ean not in rejected:
+            rejected.add(ean)
+            logger.warning(f"EAN invalide ignoré pour {url}: {ean}")
+    return ""
+
+def pick_price(euros, cents, price_texts, body_text):
+    """Choisit le prix: euros/centimes séparés, puis bloc de prix, puis texte de la page"""
+    # Méthode 1: spans spécifiques pour les euros et centimes
+    if euros is not None and cents is not None:
+        return f"{euros.strip()},{cents.strip()} €"
+
+    # Méthode 2: Chercher un élément de prix complet
+    for price_text in price_texts or []:
+        price_text = price_text.strip()
+        if price_text and ('€' in price_text or 'EUR' in price_text):
+            return price_text
+
+    # Méthode 3: Recherche de motif de prix dans le texte
+    price_matches = re.findall(r'\d+[,\.]\d{2}\s*€', body_text or "")
+    if price_matches:
+        return price_matches[0]
+    return "Non disponible"
+
+def pick_brand(brand, nom):
+    """Choisit la marque, en la déduisant du titre si aucun élément n'est trouvé"""
+    if brand and brand.strip():
+        return brand.strip()
+
+    # Si aucune marque trouvée, essayer de l'extraire du titre
+    if nom:
+        first_word = nom.split(' ')[0]
+        if len(first_word) > 2:  # Éviter les petits mots comme "Le" ou "La"
+            return first_word
+    return ""
+
+# Nombre d'un prix (espaces comme séparateurs de milliers) et symbole monétaire qui le suit
+PRICE_NUMBER_RE = re.compile(r'(\d+(?:[ \u202f\u00a0]\d{3})*)(?:[,\.](\d{1,2}))?(?!\d)')
+PRICE_CURRENCY_RE = re.compile(r'\s*(?:€|EUR)')
+
+def parse_price_cents(price_text):
+    """Convertit un prix affiché ("14,99 €") en centimes, ou None s'il n'y a pas de prix
+
+    Le nombre suivi du symbole € est prioritaire sur le premier nombre du texte. Un
+    nombre qui suit directement un mot ne commence pas par un groupe de milliers:
+    c'est une quantité ("Lot de 2 150,00 €" vaut 150,00 €).
+    """
+    if not price_text:
+        return None
+    match = None
+    for candidate in PRICE_NUMBER_RE.finditer(price_text):
+        match = match or candidate
+        if PRICE_CURRENCY_RE.match(price_text, candidate.end()):
+            match = candidate
+            break
+    if not match:
+        return None
+    groups = re.split(r'[ \u202f\u00a0]', match.group(1))
+    if len(groups) > 1 and re.search(r'[^\W\d]\s+$', price_text[:match.start()]):
+        groups = groups[1:]
+    euros = int("".join(groups))
+    cents = int((match.group(2) or "0").ljust(2, "0"))
+    return euros * 100 + cents
+
+def build_product_record(url, candidates):
+    """Construit l'enregistrement produit à partir des textes candidats extraits de la page
+
+    Les données structurées (JSON-LD, état de transfert) sont prioritaires; les
+    heuristiques sur le DOM ne sont appliquées qu'aux champs qu'elles ne donnent pas.
+    """
+    structured = parse_structured_data(candidates.get("ld_json"), candidates.get("state"))
+    body_text = candidates.get("body_text", "")
+
+    nom = structured.get("Nom du produit") or pick_title(candidates.get("title"), candidates.get("h1_texts"))
+    return {
+        "Lien": url,
+        "Date": datetime.now().strftime("%Y-%m-%d"),
+        "Nom du produit": nom,
+        "Marque": structured.get("Marque") or pick_brand(candidates.get("brand"), nom),
+        "Catégorie": structured.get("Catégorie") or DEFAULT_CATEGORY,
+        "EAN": structured.get("EAN") or pick_ean(url, candidates.get("td_texts"), body_text),
+        "Prix": structured.get("Prix") or pick_price(candidates.get("euros"), candidates.get("cents"), candidates.get("price_texts"), body_text)
+    }
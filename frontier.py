@@ -0,0 +1,82 @@
+"""
+Frontière d'URLs commune à tout un crawl
+
+Un même produit peut apparaître sur plusieurs pages de listing ou dans plusieurs
+catégories, avec des paramètres de suivi différents. Chaque lien est ramené à une
+clé canonique: l'EAN contenu dans le slug /fp/ s'il est valide, sinon l'URL sans
+paramètres ni fragment. Les clés sont stockées sous forme d'entiers 64 bits
+(l'EAN lui-même, ou une empreinte de l'URL), ce qui reste compact sur un gros catalogue.
+"""
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+from product import parse_ean
+
+logger = logging.getLogger(__name__)
+
+def canonical_product_url(url):
+    """URL du produit sans paramètres, fragment ni slash final"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+def ean_from_slug(url):
+    """EAN valide en fin de slug /fp/ (ex: /fp/creme-hydratante-50ml-3401560000007), sinon None"""
+    path = urlsplit(url).path.rstrip("/")
+    if "/fp/" not in path:
+        return None
+    slug = path.rsplit("/", 1)[-1]
+    return parse_ean(slug.rsplit("-", 1)[-1])
+
+def url_fingerprint(url):
+    """Empreinte 64 bits d'une URL canonique"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+def canonical_product_key(url):
+    """Clé canonique d'un produit: ("ean", EAN) ou ("url", empreinte de l'URL canonique)"""
+    ean = ean_from_slug(url)
+    if ean is not None:
+        return ("ean", ean)
+    return ("url", url_fingerprint(canonical_product_url(url)))
+
+class URLFrontier:
+    """Ensemble des produits déjà mis en file pendant le crawl
+
+    Partager la même instance entre plusieurs catégories garantit qu'un produit
+    n'est scrapé qu'une fois par exécution.
+    """
+
+    def __init__(self):
+        self.eans = set()
+        self.fingerprints = set()
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    def add(self, url):
+        """Ajoute un lien, retourne False si le produit est déjà dans la frontière"""
+        kind, key = canonical_product_key(url)
+        keys = self.eans if kind == "ean" else self.fingerprints
+        with self.lock:
+            if key in keys:
+                self.duplicates += 1
+                return False
+            keys.add(key)
+            return True
+
+    def seed(self, urls):
+        """Ajoute des produits déjà traités (crawl repris) sans les compter comme doublons"""
+        for url in urls:
+            kind, key = canonical_product_key(url)
+            with self.lock:
+                (self.eans if kind == "ean" else self.fingerprints).add(key)
+
+    def __contains__(self, url):
+        kind, key = canonical_product_key(url)
+        with self.lock:
+            return key in (self.eans if kind == "ean" else self.fingerprints)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.eans) + len(self.fingerprints)
@@ -0,0 +1,113 @@
+"""
+Extraction des fiches produits depuis le HTML, sans navigateur
+
+Le HTML de la page (driver.page_source) est lu une seule fois puis analysé avec lxml,
+avec les mêmes sélecteurs et les mêmes règles de repli que le script d'extraction.
+Les fonctions sont pures: elles fonctionnent sur du HTML sauvegardé et peuvent
+être réparties sur un pool de processus.
+"""
+import logging
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
+
+from extraction import (
+    TITLE_SELECTORS, EUROS_SELECTORS, CENTS_SELECTORS, PRICE_SELECTOR, BRAND_SELECTORS,
+    LD_JSON_SELECTOR, TRANSFER_STATE_SELECTOR, LISTING_SELECTORS, build_product_record
+)
+from product import Product
+
+logger = logging.getLogger(__name__)
+
+# Nombre de pages envoyées à la fois à chaque processus
+HTML_CHUNK_SIZE = 20
+
+# Sélecteurs compilés une seule fois par processus
+_compiled_selectors = {}
+
+def _select(root, selector):
+    compiled = _compiled_selectors.get(selector)
+    if compiled is None:
+        compiled = _compiled_selectors[selector] = CSSSelector(selector)
+    return compiled(root)
+
+def _text_of(element):
+    """Texte visible d'un élément, espaces normalisés comme innerText"""
+    return " ".join(element.text_content().split())
+
+def _first_match(root, selectors):
+    """Texte du premier élément trouvé en suivant l'ordre des sélecteurs"""
+    for selector in selectors:
+        elements = _select(root, selector)
+        if elements:
+            return _text_of(elements[0])
+    return None
+
+def _all_texts(root, selector):
+    return [_text_of(element) for element in _select(root, selector)]
+
+def extract_candidates_from_html(html):
+    """Retourne les textes candidats d'une fiche produit (mêmes clés que PRODUCT_EXTRACTION_SCRIPT)"""
+    root = lxml.html.fromstring(html)
+    # Blocs de données structurées, lus avant de retirer les scripts
+    ld_json = [element.text or "" for element in _select(root, LD_JSON_SELECTOR)]
+    state = [element.text or "" for element in _select(root, TRANSFER_STATE_SELECTOR)]
+    # Scripts et styles ne font pas partie du texte visible
+    etree.strip_elements(root, "script", "style", "noscript", with_tail=False)
+    body = root.find("body")
+    return {
+        "ld_json": ld_json,
+        "state": state,
+        "title": _first_match(root, TITLE_SELECTORS),
+        "h1_texts": _all_texts(root, "h1"),
+        "td_texts": _all_texts(root, "td"),
+        "euros": _first_match(root, EUROS_SELECTORS),
+        "cents": _first_match(root, CENTS_SELECTORS),
+        "price_texts": _all_texts(root, PRICE_SELECTOR),
+        "brand": _first_match(root, BRAND_SELECTORS),
+        "body_text": body.text_content() if body is not None else "",
+    }
+
+def extract_product_from_html(url, html):
+    """Construit le Product d'une page à partir de son HTML"""
+    return Product.from_record(build_product_record(url, extract_candidates_from_html(html)))
+
+def extract_listing_links_from_html(html, page_url):
+    """Liens /fp/ d'une page de listing, absolus et dédoublonnés dans l'ordre de la page
+
+    Même logique que LINK_EXTRACTION_SCRIPT: sélecteurs de listing, puis tous les <a>.
+    """
+    root = lxml.html.fromstring(html)
+    links = []
+    seen = set()
+    for selector in LISTING_SELECTORS + ["a"]:
+        if selector == "a" and links:
+            break
+        for element in _select(root, selector):
+            href = element.get("href")
+            if not href or "/fp/" not in href:
+                continue
+            href = urljoin(page_url, href)
+            if href not in seen:
+                seen.add(href)
+                links.append(href)
+    return links
+
+def _extract_page(page):
+    url, html = page
+    try:
+        return extract_product_from_html(url, html)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'analyse du HTML de {url}: {e}")
+        return None
+
+def extract_products_from_pages(pages, max_workers=None, chunksize=HTML_CHUNK_SIZE):
+    """Analyse des pages (url, html) en parallèle sur un pool de processus
+
+    Les produits sont renvoyés dans l'ordre des pages, None pour une page illisible.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(_extract_page, pages, chunksize=chunksize)
@@ -0,0 +1,167 @@
+"""
+Moteur de récupération HTTP sans navigateur
+
+Les pages produits et de listing sont rendues côté serveur: elles sont téléchargées
+directement avec une session HTTP (connexions keep-alive réutilisées via un pool),
+puis passées à l'extraction lxml. Une page qui ne passe pas la validation (pas de nom,
+ni prix ni EAN) est confiée au navigateur par une fonction de secours.
+
+base_url permet de rediriger toutes les requêtes vers un serveur local de
+substitution (tests), en gardant les URLs d'origine dans les résultats.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from html_extraction import extract_product_from_html, extract_listing_links_from_html
+from rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Configuration par défaut du client HTTP
+HTTP_ENGINE_CONFIG = {
+    "base_url": None,          # Ex: "http://127.0.0.1:8000" pour un serveur local
+    "timeout": 15,             # Secondes par requête
+    "pool_size": 20,           # Connexions keep-alive gardées ouvertes par hôte
+    "max_workers": 8,          # Téléchargements simultanés
+    "retries": 2,              # Nouvelles tentatives sur erreurs réseau et 429/5xx
+    "backoff_factor": 0.5,
+}
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-FR,fr;q=0.9",
+}
+
+def create_http_session(pool_size=None, retries=None, backoff_factor=None):
+    """Session HTTP avec pool de connexions keep-alive et nouvelles tentatives"""
+    retry = Retry(
+        total=HTTP_ENGINE_CONFIG["retries"] if retries is None else retries,
+        backoff_factor=HTTP_ENGINE_CONFIG["backoff_factor"] if backoff_factor is None else backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+    )
+    pool_size = pool_size or HTTP_ENGINE_CONFIG["pool_size"]
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def rebase_url(url, base_url):
+    """Remplace le schéma et l'hôte de l'URL par ceux de base_url (si fourni)"""
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+def listing_page_url(category_url, page_number):
+    """URL d'une page de listing (format standard ?page=N)"""
+    if page_number <= 1:
+        return category_url
+    separator = "&" if "?" in category_url else "?"
+    return f"{category_url}{separator}page={page_number}"
+
+def is_valid_product(product):
+    """Une fiche est exploitable si elle a un nom et un prix ou un EAN"""
+    return bool(product and product.name and (product.price_cents is not None or product.ean is not None))
+
+class HTTPFetchEngine:
+    """Télécharge et extrait les pages sans navigateur, avec secours navigateur
+
+    fallback(url) est appelé pour les pages invalides et doit retourner un produit
+    ou None (par exemple scrape_product_with_retry avec un DriverManager). Il reçoit
+    l'URL sur base_url, comme le téléchargement HTTP; le produit garde l'URL d'origine.
+    """
+
+    def __init__(self, base_url=None, fallback=None, session=None, max_workers=None, timeout=None):
+        self.base_url = base_url if base_url is not None else HTTP_ENGINE_CONFIG["base_url"]
+        self.max_workers = max_workers or HTTP_ENGINE_CONFIG["max_workers"]
+        self.timeout = timeout or HTTP_ENGINE_CONFIG["timeout"]
+        self.session = session or create_http_session(pool_size=self.max_workers)
+        self.fallback = fallback
+        self.lock = threading.Lock()
+        self.stats = {"http": 0, "fallback": 0, "failed": 0, "bytes": 0}
+
+    def _count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+    def fetch(self, url):
+        """Télécharge une page (avec le limiteur de débit partagé), retourne son HTML"""
+        rate_limiter.acquire()
+        start_time = time.time()
+        try:
+            response = self.session.get(rebase_url(url, self.base_url), timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            rate_limiter.record_failure("erreur HTTP")
+            raise
+        rate_limiter.record_success(time.time() - start_time)
+        self._count("bytes", len(response.content))
+        return response.text
+
+    def scrape_product(self, url):
+        """Produit extrait du HTML, ou via le navigateur si la page n'est pas valide"""
+        try:
+            product = extract_product_from_html(url, self.fetch(url))
+            if is_valid_product(product):
+                self._count("http")
+                return product
+            logger.info(f"Page incomplète en HTTP, passage au navigateur: {url}")
+        except Exception as e:
+            logger.warning(f"Échec HTTP pour {url}: {e}")
+
+        if self.fallback is not None:
+            product = self.fallback(rebase_url(url, self.base_url))
+            if product is not None:
+                product.url = url
+                self._count("fallback")
+                return product
+        self._count("failed")
+        return None
+
+    def scrape_many(self, urls):
+        """Scrape les URLs en parallèle et produit les résultats au fil de l'eau
+
+        Le nombre de téléchargements en cours est borné (2 par worker): la mémoire
+        ne dépend pas du nombre d'URLs. Les échecs sont renvoyés comme None.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for url in urls:
+                pending.append(executor.submit(self.scrape_product, url))
+                if len(pending) >= self.max_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def fetch_listing_links(self, category_url, page_number):
+        """Liens produits d'une page de listing téléchargée en HTTP"""
+        page_url = listing_page_url(category_url, page_number)
+        return extract_listing_links_from_html(self.fetch(page_url), page_url)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        self.session.close()
+        logger.info(f"Moteur HTTP arrêté: {self.get_stats()}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
@@ -0,0 +1,145 @@
+"""
+Profil de navigation allégé: bloque images, polices, médias et traqueurs tiers
+
+Le blocage passe par le protocole Chrome DevTools (Network.setBlockedURLs), les
+images sont en plus désactivées par préférence Chrome pour couvrir les URLs de CDN
+sans extension. Les requêtes bloquées et les octets réellement chargés sont relevés
+page par page dans le journal de performance.
+"""
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Liste de blocage: extensions par type de ressource et domaines tiers
+LEAN_BLOCKLIST = {
+    "resource_types": {
+        "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"],
+        "font": ["woff", "woff2", "ttf", "otf", "eot"],
+        "media": ["mp4", "webm", "ogg", "mp3", "wav", "m3u8"],
+    },
+    "domains": [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "googlesyndication.com",
+        "facebook.net",
+        "facebook.com/tr",
+        "hotjar.com",
+        "criteo.com",
+        "criteo.net",
+        "tiktok.com",
+        "pinterest.com",
+        "bing.com",
+        "clarity.ms",
+        "contentsquare.net",
+        "abtasty.com",
+        "kameleoon.eu",
+    ],
+}
+
+# Totaux cumulés sur tous les WebDrivers allégés
+lean_stats = {
+    "pages": 0,
+    "requests": 0,
+    "blocked_requests": 0,
+    "transferred_bytes": 0,
+}
+lean_stats_lock = threading.Lock()
+
+def build_blocked_url_patterns(blocklist=None):
+    """Construit les motifs d'URL à bloquer à partir de la liste de blocage"""
+    blocklist = blocklist or LEAN_BLOCKLIST
+    patterns = []
+    for extensions in blocklist.get("resource_types", {}).values():
+        for extension in extensions:
+            patterns.append(f"*.{extension}")
+            patterns.append(f"*.{extension}?*")
+    for domain in blocklist.get("domains", []):
+        patterns.append(f"*{domain}*")
+    return patterns
+
+def apply_lean_options(options):
+    """Ajoute aux options Chrome la désactivation des images et le journal de performance"""
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+    })
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+def enable_request_blocking(driver, blocklist=None):
+    """Active le blocage des requêtes via Chrome DevTools"""
+    patterns = build_blocked_url_patterns(blocklist)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    driver.lean_browsing = True
+    logger.info(f"Navigation allégée activée ({len(patterns)} motifs bloqués)")
+
+def read_performance_messages(driver):
+    """Vide le journal de performance et retourne ses messages DevTools décodés
+
+    La lecture vide le journal: quand plusieurs modes l'utilisent (navigation allégée,
+    capture réseau), les messages sont lus une fois puis passés à chacun.
+    """
+    messages = []
+    for entry in driver.get_log("performance"):
+        try:
+            messages.append(json.loads(entry["message"])["message"])
+        except (KeyError, ValueError):
+            continue
+    return messages
+
+def collect_page_savings(driver, messages=None):
+    """Lit le journal de performance et résume les requêtes de la dernière page
+
+    Les ressources bloquées n'étant jamais téléchargées, leur taille est inconnue:
+    on compte les requêtes évitées et on mesure les octets réellement transférés.
+    """
+    if messages is None:
+        messages = read_performance_messages(driver)
+    report = {"requests": 0, "blocked_requests": 0, "blocked_by_type": {}, "transferred_bytes": 0}
+    request_types = {}
+    for message in messages:
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            report["requests"] += 1
+            request_types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            report["transferred_bytes"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            report["blocked_requests"] += 1
+            resource_type = params.get("type") or request_types.get(params.get("requestId"), "Other")
+            report["blocked_by_type"][resource_type] = report["blocked_by_type"].get(resource_type, 0) + 1
+
+    with lean_stats_lock:
+        lean_stats["pages"] += 1
+        lean_stats["requests"] += report["requests"]
+        lean_stats["blocked_requests"] += report["blocked_requests"]
+        lean_stats["transferred_bytes"] += report["transferred_bytes"]
+    return report
+
+def log_page_savings(driver, url, messages=None):
+    """Relève les économies de la page courante et les écrit dans les logs"""
+    try:
+        report = collect_page_savings(driver, messages)
+        logger.info(
+            f"Navigation allégée {url}: {report['blocked_requests']}/{report['requests']} requêtes bloquées "
+            f"{report['blocked_by_type']}, {report['transferred_bytes']} octets transférés"
+        )
+        return report
+    except Exception as e:
+        logger.warning(f"Impossible de lire le journal de performance: {e}")
+        return None
+
+def get_lean_stats():
+    """Retourne les totaux de la navigation allégée"""
+    with lean_stats_lock:
+        return dict(lean_stats)
+
+def reset_lean_stats():
+    """Réinitialise les totaux de la navigation allégée"""
+    with lean_stats_lock:
+        for key in lean_stats:
+            lean_stats[key] = 0
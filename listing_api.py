@@ -0,0 +1,321 @@
+"""
+Pagination directe de l'API de listing, sans navigateur
+
+La requête de recherche que fait le site pour afficher une catégorie est apprise une
+fois depuis un navigateur en mode capture réseau (voir network_capture), puis
+enregistrée dans un fichier JSON. Elle est ensuite rejouée en HTTP pour chaque page,
+en modifiant seulement le numéro de page (dans l'URL ou dans le corps JSON), avec
+plusieurs pages téléchargées en parallèle sur une session keep-alive. Sans taille de
+page dans la requête, le nombre de liens de la première page en tient lieu; une page
+qui renvoie les mêmes liens que la première arrête le parcours (pagination ignorée).
+"""
+import json
+import time
+import logging
+import itertools
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+
+from http_engine import HTTP_ENGINE_CONFIG, create_http_session, rebase_url
+from network_capture import get_captured_search_requests
+from rate_limiter import rate_limiter
+from storage import resolve_output_path
+
+logger = logging.getLogger(__name__)
+
+# Fichier où est enregistrée la requête de recherche apprise
+LISTING_API_FILE = "listing_api.json"
+
+# Noms possibles des paramètres de pagination
+PAGE_KEYS = ("page", "pageNumber", "currentPage", "p")
+OFFSET_KEYS = ("from", "offset", "start")
+SIZE_KEYS = ("size", "limit", "pageSize", "rows", "perPage")
+TOTAL_PAGES_KEYS = ("totalPages", "nbPages", "pageCount", "lastPage")
+TOTAL_ITEMS_KEYS = ("total", "totalCount", "nbHits", "totalItems", "totalResults")
+
+# Nouvelles tentatives pour une page du listing en échec (après celles de la session HTTP)
+LISTING_PAGE_RETRIES = 2
+LISTING_RETRY_DELAY = 2
+
+# En-têtes propres au navigateur qui ne doivent pas être rejoués
+SKIPPED_HEADERS = {"content-length", "host", "cookie", "accept-encoding", "connection"}
+
+def save_listing_request(category_url, request=None, filename=LISTING_API_FILE):
+    """Enregistre la requête de recherche d'une catégorie (par défaut la dernière capturée)"""
+    if request is None:
+        captured = get_captured_search_requests()
+        if not captured:
+            raise ValueError("Aucune requête de recherche capturée")
+        request = captured[-1]
+    # Les liens produits relatifs de la réponse sont résolus sur le site de la catégorie
+    parts = urlsplit(category_url)
+    request = {**request, "category_url": category_url, "site_url": f"{parts.scheme}://{parts.netloc}/"}
+    path = resolve_output_path(filename)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(request, f, ensure_ascii=False, indent=2)
+    logger.info(f"Requête de listing enregistrée dans {path}: {request.get('method', 'GET')} {request['url']}")
+    return path
+
+def load_listing_request(category_url, filename=LISTING_API_FILE):
+    """Charge la requête enregistrée pour cette catégorie, ou None"""
+    try:
+        with open(resolve_output_path(filename), "r", encoding="utf-8") as f:
+            request = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if request.get("category_url") != category_url:
+        logger.info(f"Requête de listing enregistrée pour une autre catégorie: {request.get('category_url')}")
+        return None
+    return request
+
+def _iter_keys(data, keys):
+    """(conteneur, clé) d'un JSON dont la clé fait partie de keys, des plus proches
+    de la racine aux plus profonds (parcours en largeur)"""
+    nodes = deque([data])
+    while nodes:
+        node = nodes.popleft()
+        if isinstance(node, dict):
+            for key in keys:
+                if key in node and isinstance(node[key], (int, str)) and not isinstance(node[key], bool):
+                    yield node, key
+            nodes.extend(node.values())
+        elif isinstance(node, list):
+            nodes.extend(node)
+
+def _find_key(data, keys):
+    """Premier (conteneur, clé) d'un JSON dont la clé fait partie de keys, ou (None, None)"""
+    return next(_iter_keys(data, keys), (None, None))
+
+def _page_base(template, container, page_key):
+    """Numéro de la première page pour l'API: 0 ou 1
+
+    Lu dans template["page_base"] s'il est fourni, sinon déduit de la valeur capturée:
+    une requête capturée avec page=0 indique une numérotation à partir de 0.
+    """
+    if "page_base" in template:
+        return int(template["page_base"])
+    return 0 if str(container[page_key]).strip() == "0" else 1
+
+def _page_size(container):
+    for key in SIZE_KEYS:
+        try:
+            return int(container[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+def _set_page(container, page_key, offset_key, page, page_size=None, page_base=1):
+    """Positionne le numéro de page (ou l'offset) dans un dict de paramètres
+
+    page est numérotée à partir de 1; page_base est le numéro de la première page
+    pour l'API. page_size sert pour l'offset si la requête n'indique pas elle-même
+    sa taille de page.
+    """
+    if page_key:
+        value = page - 1 + page_base
+        container[page_key] = value if isinstance(container[page_key], int) else str(value)
+    elif offset_key:
+        size = _page_size(container) or page_size
+        if not size and page > 1:
+            raise ValueError("Taille de page inconnue pour la pagination par offset")
+        offset = (page - 1) * (size or 0)
+        container[offset_key] = offset if isinstance(container[offset_key], int) else str(offset)
+
+def build_page_request(template, page, page_size=None):
+    """Copie de la requête apprise pour la page demandée (URL et corps modifiés)
+
+    Le paramètre de page est cherché dans le corps JSON puis dans l'URL. S'il n'existe
+    nulle part, il est ajouté au corps JSON (requête POST) ou à l'URL. page est
+    numérotée à partir de 1, quelle que soit la numérotation de l'API (voir _page_base).
+    """
+    parts = urlsplit(template["url"])
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    body = None
+    if template.get("postData"):
+        try:
+            body = json.loads(template["postData"])
+        except ValueError:
+            body = None
+
+    container, page_key = _find_key(body, PAGE_KEYS) if body is not None else (None, None)
+    offset_key = None
+    if container is None and body is not None:
+        container, offset_key = _find_key(body, OFFSET_KEYS)
+    if container is None:
+        page_key = next((key for key in PAGE_KEYS if key in query), None)
+        offset_key = None if page_key else next((key for key in OFFSET_KEYS if key in query), None)
+        if page_key or offset_key:
+            container = query
+        else:
+            container = body if isinstance(body, dict) else query
+            page_key = "page"
+            container[page_key] = page
+    page_base = _page_base(template, container, page_key) if page_key else 1
+    _set_page(container, page_key, offset_key, page, page_size, page_base)
+
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+    headers = {
+        name: value for name, value in (template.get("headers") or {}).items()
+        if name.lower() not in SKIPPED_HEADERS
+    }
+    return {
+        "method": template.get("method") or "GET",
+        "url": url,
+        "headers": headers,
+        "data": json.dumps(body) if body is not None else template.get("postData"),
+    }
+
+def extract_links_from_response(data, site_url):
+    """URLs de fiches produits (/fp/) contenues dans une réponse de l'API, dans l'ordre"""
+    links = []
+    seen = set()
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, str) and "/fp/" in node:
+            link = urljoin(site_url, node)
+            if link not in seen:
+                seen.add(link)
+                links.append(link)
+    return links
+
+def _int_value(value):
+    """Valeur entière d'un compteur JSON (entier ou texte de chiffres), sinon None"""
+    if isinstance(value, int):
+        return value
+    value = value.strip()
+    return int(value) if value.isdigit() else None
+
+def extract_total_pages(data, page_size=None):
+    """Nombre total de pages annoncé par l'API, ou None
+
+    Les clés les plus proches de la racine de la réponse sont préférées, et seules
+    les valeurs entières comptent (un "total" en euros n'est pas un nombre de produits).
+    """
+    for container, key in _iter_keys(data, TOTAL_PAGES_KEYS):
+        total_pages = _int_value(container[key])
+        if total_pages is not None:
+            return total_pages
+    if page_size:
+        for container, key in _iter_keys(data, TOTAL_ITEMS_KEYS):
+            total_items = _int_value(container[key])
+            if total_items is not None:
+                return -(-total_items // page_size)
+    return None
+
+class ListingAPICrawler:
+    """Rejoue la requête de listing apprise pour parcourir les pages d'une catégorie"""
+
+    def __init__(self, template, base_url=None, session=None, max_workers=None, timeout=None):
+        self.template = template
+        parts = urlsplit(template["url"])
+        self.site_url = template.get("site_url") or f"{parts.scheme}://{parts.netloc}/"
+        self.base_url = base_url if base_url is not None else HTTP_ENGINE_CONFIG["base_url"]
+        self.max_workers = max_workers or HTTP_ENGINE_CONFIG["max_workers"]
+        self.timeout = timeout or HTTP_ENGINE_CONFIG["timeout"]
+        self.session = session or create_http_session(pool_size=self.max_workers)
+        self.total_pages = None
+        self.page_size = None
+        self.failed_pages = []
+
+    def fetch_page(self, page):
+        """Télécharge une page du listing, retourne (liens produits, nombre total de pages)"""
+        request = build_page_request(self.template, page, self.page_size)
+        rate_limiter.acquire()
+        start_time = time.time()
+        try:
+            response = self.session.request(
+                request["method"], rebase_url(request["url"], self.base_url),
+                headers=request["headers"], data=request["data"], timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            rate_limiter.record_failure("erreur sur l'API de listing")
+            raise
+        links = extract_links_from_response(data, self.site_url)
+        if links:
+            rate_limiter.record_success(time.time() - start_time)
+        else:
+            rate_limiter.record_failure("listing vide")
+        return links, extract_total_pages(data, len(links) or None)
+
+    def crawl(self, max_pages=None, skip_pages=()):
+        """Parcourt les pages en parallèle et produit (page, liens) dans l'ordre des pages
+
+        La première page donne le nombre total de pages et la taille de page; une erreur
+        ou un listing vide sur cette page lève une exception. Une page suivante est
+        retentée LISTING_PAGE_RETRIES fois; si elle reste en échec, elle est signalée
+        avec une liste de liens None et notée dans failed_pages. Le parcours s'arrête si une
+        page renvoie les mêmes liens que la première (paramètre de page ignoré par l'API).
+        Si l'API n'annonce ni nombre de pages ni nombre de produits (total_pages reste
+        None), les pages sont parcourues jusqu'à la première page vide ou en échec.
+        """
+        first_links, total_pages = self.fetch_page(1)
+        if not first_links:
+            raise ValueError("Première page de l'API de listing vide")
+        self.page_size = len(first_links)
+        if total_pages and max_pages:
+            total_pages = min(total_pages, max_pages)
+        self.total_pages = total_pages
+        if total_pages:
+            logger.info(f"API de listing: {total_pages} pages à parcourir")
+            pages = range(2, total_pages + 1)
+        else:
+            logger.warning("API de listing sans nombre de pages, parcours jusqu'à une page vide")
+            pages = range(2, max_pages + 1) if max_pages else itertools.count(2)
+        if 1 not in skip_pages:
+            yield 1, first_links
+
+        def fetch(page):
+            for attempt in range(LISTING_PAGE_RETRIES + 1):
+                try:
+                    return self.fetch_page(page)[0]
+                except Exception as e:
+                    if attempt < LISTING_PAGE_RETRIES:
+                        logger.warning(f"Échec de la page {page} de l'API de listing (tentative {attempt + 1}): {e}")
+                        time.sleep(LISTING_RETRY_DELAY * (attempt + 1))
+                    else:
+                        logger.error(f"Échec définitif de la page {page} de l'API de listing: {e}")
+            return None
+
+        def fetch_in_order():
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = deque()
+                try:
+                    for page in pages:
+                        if page in skip_pages:
+                            continue
+                        pending.append((page, executor.submit(fetch, page)))
+                        if len(pending) >= self.max_workers * 2:
+                            done_page, future = pending.popleft()
+                            yield done_page, future.result()
+                    while pending:
+                        done_page, future = pending.popleft()
+                        yield done_page, future.result()
+                finally:
+                    for _, future in pending:
+                        future.cancel()
+
+        with closing(fetch_in_order()) as results:
+            for page, links in results:
+                if links is None:
+                    self.failed_pages.append(page)
+                if links == first_links:
+                    logger.warning(f"La page {page} de l'API de listing renvoie les mêmes liens que la page 1, arrêt de la pagination")
+                    return
+                if total_pages is None and not links:
+                    if links is None:
+                        yield page, None
+                    logger.info(f"Fin du listing de l'API à la page {page}")
+                    return
+                yield page, links
+
+    def close(self):
+        self.session.close()
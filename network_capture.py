@@ -0,0 +1,198 @@
+"""
+Mode capture réseau: données produit lues dans les réponses JSON de l'application
+
+À l'hydratation, le front Angular appelle les API produit et recherche du site. Avec
+le journal de performance Chrome (DevTools), les réponses JSON de ces appels sont
+repérées puis leur contenu est lu avec Network.getResponseBody. Les champs produit en
+sont extraits directement; le DOM ne sert qu'à compléter et à contrôler: tout
+désaccord entre le DOM et l'API est journalisé et compté. Seul le produit de l'API
+dont l'EAN est celui de la page (slug de l'URL ou DOM) est retenu: une réponse de
+recommandations ou de produits associés ne remplace jamais la fiche.
+
+Les requêtes de recherche capturées (URL, méthode, en-têtes, corps) sont conservées
+pour pouvoir être rejouées sans navigateur.
+"""
+import json
+import base64
+import logging
+import threading
+
+from lean_browsing import read_performance_messages
+from frontier import ean_from_slug
+from product import as_product, parse_ean
+from structured_data import extract_state_products
+
+logger = logging.getLogger(__name__)
+
+# Configuration de la capture (fragments d'URL des API produit et recherche)
+NETWORK_CAPTURE_CONFIG = {
+    "product_url_patterns": ["/product", "/produit", "/offer"],
+    "search_url_patterns": ["/search", "/recherche", "/listing", "/catalog"],
+    "max_body_bytes": 2_000_000,
+}
+
+# Champs comparés entre le DOM et l'API
+COMPARED_FIELDS = ("name", "ean", "price_cents", "brand")
+
+# Totaux cumulés sur tous les WebDrivers en mode capture
+capture_stats = {
+    "pages": 0,
+    "json_responses": 0,
+    "api_records": 0,
+    "unmatched": 0,
+    "disagreements": 0,
+}
+capture_stats_lock = threading.Lock()
+
+# Dernière requête de recherche capturée (rejouable en HTTP)
+captured_search_requests = []
+captured_search_lock = threading.Lock()
+
+def apply_capture_options(options):
+    """Active le journal de performance Chrome (même capacité que la navigation allégée)"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+def enable_network_capture(driver):
+    """Active le domaine Network de DevTools, nécessaire pour lire les corps de réponse"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.network_capture = True
+    logger.info("Capture réseau activée")
+
+def _matches(url, patterns):
+    url = url.lower()
+    return any(pattern in url for pattern in patterns)
+
+def capture_json_responses(driver, messages=None, config=None):
+    """Réponses JSON des API produit et recherche chargées depuis la dernière lecture
+
+    Retourne une liste de dicts {url, kind, request, data}; kind vaut "product" ou "search".
+    """
+    config = config or NETWORK_CAPTURE_CONFIG
+    if messages is None:
+        messages = read_performance_messages(driver)
+
+    requests_by_id = {}
+    candidates = {}
+    finished = set()
+    for message in messages:
+        method = message.get("method")
+        params = message.get("params", {})
+        request_id = params.get("requestId")
+        if method == "Network.requestWillBeSent":
+            requests_by_id[request_id] = params.get("request", {})
+        elif method == "Network.responseReceived":
+            response = params.get("response", {})
+            url = response.get("url", "")
+            if "json" not in response.get("mimeType", ""):
+                continue
+            if _matches(url, config["search_url_patterns"]):
+                candidates[request_id] = (url, "search")
+            elif _matches(url, config["product_url_patterns"]):
+                candidates[request_id] = (url, "product")
+        elif method == "Network.loadingFinished":
+            if int(params.get("encodedDataLength", 0)) <= config["max_body_bytes"]:
+                finished.add(request_id)
+
+    captured = []
+    for request_id, (url, kind) in candidates.items():
+        if request_id not in finished:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8")
+            data = json.loads(text)
+        except Exception as e:
+            logger.debug(f"Réponse non lisible pour {url}: {e}")
+            continue
+        captured.append({"url": url, "kind": kind, "request": requests_by_id.get(request_id, {}), "data": data})
+
+    with capture_stats_lock:
+        capture_stats["pages"] += 1
+        capture_stats["json_responses"] += len(captured)
+    return captured
+
+def remember_search_requests(responses):
+    """Conserve les requêtes de recherche capturées (la plus récente en dernier)"""
+    searches = [
+        {"url": response["url"], **{key: response["request"].get(key) for key in ("method", "headers", "postData")}}
+        for response in responses if response["kind"] == "search"
+    ]
+    if searches:
+        with captured_search_lock:
+            captured_search_requests.extend(searches)
+            del captured_search_requests[:-10]
+    return searches
+
+def get_captured_search_requests():
+    with captured_search_lock:
+        return list(captured_search_requests)
+
+def api_fields_from_responses(responses, eans):
+    """Champs produit (colonnes du CSV) du produit de l'API dont l'EAN fait partie de eans
+
+    Retourne (champs, nombre de produits API écartés); champs vaut {} si aucun ne correspond.
+    """
+    skipped = 0
+    for response in responses:
+        if response["kind"] != "product":
+            continue
+        for fields in extract_state_products(response["data"]):
+            if parse_ean(fields.get("EAN")) in eans:
+                with capture_stats_lock:
+                    capture_stats["api_records"] += 1
+                return fields, skipped
+            skipped += 1
+    return {}, skipped
+
+def compare_dom_and_api(url, dom_record, api_fields):
+    """Journalise les champs sur lesquels le DOM et l'API ne sont pas d'accord"""
+    if not api_fields:
+        return []
+    dom_product = as_product(dom_record)
+    api_product = as_product({"Lien": url, **api_fields})
+    disagreements = []
+    for field in COMPARED_FIELDS:
+        dom_value = getattr(dom_product, field)
+        api_value = getattr(api_product, field)
+        if dom_value in (None, "") or api_value in (None, ""):
+            continue
+        if str(dom_value).strip().lower() != str(api_value).strip().lower():
+            disagreements.append((field, dom_value, api_value))
+    if disagreements:
+        with capture_stats_lock:
+            capture_stats["disagreements"] += 1
+        logger.warning(f"Désaccord DOM/API pour {url}: {disagreements}")
+    return disagreements
+
+def build_record_from_capture(url, dom_record, responses):
+    """Enregistrement produit construit depuis l'API, complété par le DOM
+
+    Sans produit de l'API correspondant à l'EAN de la page, le DOM est gardé tel quel.
+    """
+    remember_search_requests(responses)
+    eans = {ean for ean in (ean_from_slug(url), parse_ean(dom_record.get("EAN"))) if ean is not None}
+    api_fields, skipped = api_fields_from_responses(responses, eans)
+    if not api_fields:
+        if skipped:
+            with capture_stats_lock:
+                capture_stats["unmatched"] += 1
+            logger.warning(f"Aucun des {skipped} produits de l'API ne correspond à l'EAN de {url}, DOM conservé")
+        return dom_record
+    compare_dom_and_api(url, dom_record, api_fields)
+    record = {column: dom_record.get(column) for column in dom_record.keys()}
+    record.update(api_fields)
+    return record
+
+def get_capture_stats():
+    """Retourne les totaux de la capture réseau"""
+    with capture_stats_lock:
+        return dict(capture_stats)
+
+def reset_capture_stats():
+    """Réinitialise les totaux de la capture réseau"""
+    with capture_stats_lock:
+        for key in capture_stats:
+            capture_stats[key] = 0
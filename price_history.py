@@ -0,0 +1,180 @@
+"""
+Historique compact des prix par EAN
+
+Chaque produit est stocké comme une suite de plages (runs): un prix en centimes
+valable du premier au dernier jour où il a été observé. Un prix inchangé d'un crawl
+à l'autre prolonge la plage au lieu d'ajouter une ligne, et un changement de prix
+ouvre une nouvelle plage. Les dates sont stockées en jours (date.toordinal()).
+"""
+import csv
+import sqlite3
+import logging
+import threading
+from datetime import date
+
+from product import as_product
+from storage import DATABASE_FILE, resolve_output_path
+
+logger = logging.getLogger(__name__)
+
+# Observations regroupées dans une même transaction
+HISTORY_BATCH_SIZE = 200
+
+def parse_day(value):
+    """Convertit une date "AAAA-MM-JJ" en numéro de jour"""
+    return date.fromisoformat(value).toordinal()
+
+def format_day(day):
+    """Convertit un numéro de jour en date "AAAA-MM-JJ" """
+    return date.fromordinal(day).isoformat()
+
+class PriceHistory:
+    """Historique des prix en plages (EAN, premier jour, dernier jour, prix en centimes)
+
+    Utilisable comme sink du BackgroundWriter: chaque produit écrit est une observation.
+    """
+
+    def __init__(self, filename=DATABASE_FILE, batch_size=HISTORY_BATCH_SIZE):
+        self.path = resolve_output_path(filename)
+        self.batch_size = batch_size
+        self.connection = None
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def open(self):
+        """Ouvre la base et crée la table des plages de prix si nécessaire"""
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS price_runs (
+                ean INTEGER NOT NULL,
+                first_day INTEGER NOT NULL,
+                last_day INTEGER NOT NULL,
+                price_cents INTEGER,
+                PRIMARY KEY (ean, first_day)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_price_runs_first_day ON price_runs(first_day);
+        """)
+        self.connection.commit()
+        return self
+
+    def observe(self, ean, day, price_cents):
+        """Ajoute une observation au prochain lot"""
+        with self.lock:
+            self.pending.append((ean, day, price_cents))
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def write(self, record):
+        """Enregistre le prix d'un produit scrapé (ignoré sans EAN valide)"""
+        product = as_product(record)
+        if product.ean is None:
+            return
+        self.observe(product.ean, product.date.toordinal(), product.price_cents)
+
+    def _flush(self):
+        """Applique le lot d'observations dans une transaction (verrou déjà pris)"""
+        if not self.pending:
+            return
+        with self.connection:
+            for ean, day, price_cents in self.pending:
+                self._apply(ean, day, price_cents)
+        self.pending = []
+
+    def _apply(self, ean, day, price_cents):
+        """Prolonge la plage courante si le prix est inchangé, sinon en ouvre une nouvelle"""
+        run = self.connection.execute(
+            "SELECT first_day, last_day, price_cents FROM price_runs "
+            "WHERE ean = ? AND first_day <= ? ORDER BY first_day DESC LIMIT 1",
+            (ean, day)
+        ).fetchone()
+        if run is not None:
+            first_day, last_day, run_price = run
+            if run_price == price_cents:
+                if day > last_day:
+                    self.connection.execute(
+                        "UPDATE price_runs SET last_day = ? WHERE ean = ? AND first_day = ?",
+                        (day, ean, first_day)
+                    )
+                return
+            if day <= last_day:
+                # Observation plus ancienne que la fin de la plage: on ne réécrit pas l'historique
+                return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO price_runs (ean, first_day, last_day, price_cents) VALUES (?, ?, ?, ?)",
+            (ean, day, day, price_cents)
+        )
+
+    def checkpoint(self):
+        """Écrit le lot d'observations en attente"""
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """Écrit le lot en attente et ferme la base"""
+        if self.connection is None:
+            return
+        with self.lock:
+            self._flush()
+            self.connection.close()
+            self.connection = None
+
+    def price_series(self, ean):
+        """Plages de prix d'un EAN, de la plus ancienne à la plus récente"""
+        with self.lock:
+            self._flush()
+            rows = self.connection.execute(
+                "SELECT first_day, last_day, price_cents FROM price_runs WHERE ean = ? ORDER BY first_day",
+                (int(ean),)
+            ).fetchall()
+        return [
+            {"from": format_day(first_day), "to": format_day(last_day), "price_cents": price_cents}
+            for first_day, last_day, price_cents in rows
+        ]
+
+    def changes_since(self, since):
+        """Changements de prix depuis la date donnée ("AAAA-MM-JJ"), avec le prix précédent
+
+        Seules les plages commençant après la date sont lues (index sur first_day).
+        La première observation d'un produit n'est pas un changement.
+        """
+        with self.lock:
+            self._flush()
+            rows = self.connection.execute("""
+                SELECT ean, first_day, price_cents, previous_price FROM (
+                    SELECT p.ean, p.first_day, p.price_cents,
+                           (SELECT price_cents FROM price_runs q
+                            WHERE q.ean = p.ean AND q.first_day < p.first_day
+                            ORDER BY q.first_day DESC LIMIT 1) AS previous_price,
+                           EXISTS (SELECT 1 FROM price_runs q
+                                   WHERE q.ean = p.ean AND q.first_day < p.first_day) AS has_previous
+                    FROM price_runs p
+                    WHERE p.first_day >= ?
+                )
+                WHERE has_previous
+                ORDER BY first_day, ean
+            """, (parse_day(since),)).fetchall()
+        return [
+            {
+                "ean": f"{ean:013d}",
+                "date": format_day(first_day),
+                "old_price_cents": previous_price,
+                "new_price_cents": price_cents,
+            }
+            for ean, first_day, price_cents, previous_price in rows
+        ]
+
+def import_csv_snapshot(filename, database_file=DATABASE_FILE):
+    """Importe un ancien export CSV (colonnes EAN, Date, Prix) dans l'historique"""
+    history = PriceHistory(database_file).open()
+    imported = 0
+    try:
+        with open(filename, mode="r", newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                history.write(record)
+                imported += 1
+    finally:
+        history.close()
+    logger.info(f"{imported} lignes de {filename} importées dans l'historique des prix")
+    return imported
@@ -0,0 +1,105 @@
+"""
+Enregistrement produit typé et compact
+
+Le prix est analysé une seule fois en centimes, l'EAN est validé et stocké en entier,
+et la disponibilité est explicite. Le produit se lit aussi comme un dict avec les
+noms de colonnes du CSV ("Lien", "Prix", ...), ce qui le rend utilisable tel quel par
+les exports, les templates et le code existant.
+"""
+import logging
+from datetime import date
+
+from extraction import parse_price_cents
+from structured_data import is_valid_ean13
+
+logger = logging.getLogger(__name__)
+
+# Texte du CSV pour un produit sans prix
+UNAVAILABLE_PRICE = "Non disponible"
+
+def parse_ean(value):
+    """Retourne l'EAN sous forme d'entier s'il est valide, sinon None"""
+    value = str(value or "").strip()
+    if is_valid_ean13(value):
+        return int(value)
+    if len(value) == 13 and value.isdigit():
+        # Un EAN à 13 chiffres dont la clé est fausse: donnée du site à vérifier
+        logger.warning(f"EAN invalide ignoré (clé de contrôle): {value}")
+    elif value:
+        logger.debug(f"EAN invalide ignoré: {value}")
+    return None
+
+def format_ean(ean):
+    """Formate un EAN entier sur 13 chiffres ("" si absent)"""
+    return f"{ean:013d}" if ean is not None else ""
+
+def format_price(price_cents):
+    """Formate un prix en centimes comme sur le site ("14,99 €")"""
+    if price_cents is None:
+        return UNAVAILABLE_PRICE
+    return f"{price_cents // 100},{price_cents % 100:02d} €"
+
+class Product:
+    """Produit scrapé, avec les champs numériques déjà analysés"""
+
+    __slots__ = ("url", "date", "name", "brand", "category", "ean", "price_cents", "available")
+
+    # Colonnes du CSV et fonction de formatage correspondante
+    COLUMNS = {
+        "Catégorie": lambda p: p.category,
+        "Date": lambda p: p.date.isoformat(),
+        "EAN": lambda p: format_ean(p.ean),
+        "Lien": lambda p: p.url,
+        "Marque": lambda p: p.brand,
+        "Nom du produit": lambda p: p.name,
+        "Prix": lambda p: format_price(p.price_cents),
+    }
+
+    def __init__(self, url, date, name="", brand="", category="", ean=None, price_cents=None, available=None):
+        self.url = url
+        self.date = date
+        self.name = name
+        self.brand = brand
+        self.category = category
+        self.ean = ean
+        self.price_cents = price_cents
+        # Sans indication contraire, un produit est disponible s'il a un prix
+        self.available = price_cents is not None if available is None else available
+
+    @classmethod
+    def from_record(cls, record):
+        """Crée un produit à partir d'un dict aux colonnes du CSV (prix et EAN en texte)"""
+        date_text = record.get("Date")
+        return cls(
+            url=record.get("Lien", ""),
+            date=date.fromisoformat(date_text) if date_text else date.today(),
+            name=record.get("Nom du produit", ""),
+            brand=record.get("Marque", ""),
+            category=record.get("Catégorie", ""),
+            ean=parse_ean(record.get("EAN")),
+            price_cents=parse_price_cents(record.get("Prix")),
+        )
+
+    def to_record(self):
+        """Retourne le produit sous forme de dict aux colonnes du CSV"""
+        return {column: format_value(self) for column, format_value in self.COLUMNS.items()}
+
+    # Accès façon dict avec les noms de colonnes du CSV
+    def __getitem__(self, column):
+        return self.COLUMNS[column](self)
+
+    def get(self, column, default=None):
+        format_value = self.COLUMNS.get(column)
+        return format_value(self) if format_value else default
+
+    def keys(self):
+        return self.COLUMNS.keys()
+
+    def __repr__(self):
+        return f"Product(ean={format_ean(self.ean) or None}, name={self.name!r}, price_cents={self.price_cents})"
+
+def as_product(record):
+    """Retourne un Product, en convertissant si besoin un dict aux colonnes du CSV"""
+    if isinstance(record, Product):
+        return record
+    return Product.from_record(record)
@@ -0,0 +1,109 @@
+"""
+Limiteur de débit adaptatif partagé par tous les points d'entrée du scraping
+
+Seau à jetons dont le débit suit une règle AIMD: augmentation additive tant que
+les réponses sont saines, diminution multiplicative en cas d'erreur, de page lente
+ou de listing vide.
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuration par défaut (débits en requêtes par seconde)
+RATE_LIMIT_CONFIG = {
+    "initial_rate": 0.5,      # Une requête toutes les 2 secondes au départ
+    "min_rate": 0.1,          # Jamais moins d'une requête toutes les 10 secondes
+    "max_rate": 5.0,          # Plafond de débit
+    "increase": 0.05,         # Augmentation additive après chaque succès
+    "decrease_factor": 0.5,   # Diminution multiplicative après un échec
+    "capacity": 1,            # Nombre de requêtes pouvant partir en rafale
+    "slow_threshold": 10,     # Au-delà (secondes), une réponse est considérée lente
+    "decrease_cooldown": 2,   # Délai minimal entre deux diminutions
+}
+
+class RateLimiter:
+    """Seau à jetons dont le débit est ajusté en AIMD, utilisable depuis plusieurs threads"""
+
+    def __init__(self, initial_rate=0.5, min_rate=0.1, max_rate=5.0, increase=0.05,
+                 decrease_factor=0.5, capacity=1, slow_threshold=10, decrease_cooldown=2):
+        self.lock = threading.Lock()
+        self.configure(initial_rate, min_rate, max_rate, increase, decrease_factor,
+                       capacity, slow_threshold, decrease_cooldown)
+
+    def configure(self, initial_rate=0.5, min_rate=0.1, max_rate=5.0, increase=0.05,
+                  decrease_factor=0.5, capacity=1, slow_threshold=10, decrease_cooldown=2):
+        """(Ré)initialise les paramètres et l'état du limiteur"""
+        with self.lock:
+            self.rate = initial_rate
+            self.min_rate = min_rate
+            self.max_rate = max_rate
+            self.increase = increase
+            self.decrease_factor = decrease_factor
+            self.capacity = capacity
+            self.slow_threshold = slow_threshold
+            self.decrease_cooldown = decrease_cooldown
+            self.tokens = capacity
+            self.last_refill = time.monotonic()
+            self.last_decrease = 0
+            self.successes = 0
+            self.failures = 0
+
+    def _refill(self):
+        """Ajoute les jetons accumulés depuis le dernier appel (verrou déjà pris)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'une requête soit autorisée"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def record_success(self, duration=None):
+        """Signale une réponse saine; une réponse trop lente compte comme un échec"""
+        if duration is not None and duration > self.slow_threshold:
+            self.record_failure(f"réponse lente ({duration:.1f}s)")
+            return
+        with self.lock:
+            self._refill()
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_failure(self, reason="erreur"):
+        """Signale un échec et réduit le débit"""
+        with self.lock:
+            self._refill()
+            self.failures += 1
+            now = time.monotonic()
+            # Plusieurs workers peuvent échouer en même temps pour la même cause
+            if now - self.last_decrease < self.decrease_cooldown:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            rate = self.rate
+        logger.warning(f"Ralentissement ({reason}): débit réduit à {rate:.2f} requêtes/s")
+
+    def get_stats(self):
+        """Retourne le débit courant et les compteurs"""
+        with self.lock:
+            return {
+                "rate": round(self.rate, 3),
+                "successes": self.successes,
+                "failures": self.failures,
+            }
+
+# Limiteur partagé par tous les scrapers
+rate_limiter = RateLimiter(**RATE_LIMIT_CONFIG)
+
+def configure_rate_limiter(**options):
+    """Modifie la configuration du limiteur partagé (clés de RATE_LIMIT_CONFIG)"""
+    RATE_LIMIT_CONFIG.update(options)
+    rate_limiter.configure(**RATE_LIMIT_CONFIG)
@@ -0,0 +1,155 @@
+"""
+Attentes de chargement pilotées par l'état du DOM au lieu de pauses fixes
+
+Chaque attente se termine dès que sa condition est remplie, ou au plus tard au bout
+de son plafond. La durée réelle de chaque attente est enregistrée pour pouvoir
+ajuster les plafonds.
+"""
+import time
+import logging
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, JavascriptException
+
+from extraction import TITLE_SELECTORS, EUROS_SELECTORS, PRICE_SELECTOR
+
+logger = logging.getLogger(__name__)
+
+# Plafonds (en secondes) de chaque attente
+READINESS_TIMEOUTS = {
+    "product_title": 10,
+    "product_price": 5,
+    "listing_links": 30,
+    "listing_navigation": 10,
+    "network_idle": 5,
+}
+
+# Intervalle entre deux vérifications d'une condition
+POLL_FREQUENCY = 0.1
+
+# Durée sans nouvelle requête réseau pour considérer la page comme stable
+NETWORK_IDLE_TIME = 0.5
+
+# Sélecteurs des liens de produits sur une page de listing
+LISTING_LINK_SELECTORS = ["a.product-card-link", ".product-thumbnail a", ".product-card a"]
+
+# Statistiques des attentes: nom -> compteurs
+wait_stats = {}
+wait_stats_lock = threading.Lock()
+
+class AnyElementPresent:
+    """Condition remplie dès qu'un des sélecteurs CSS correspond à un élément"""
+
+    SCRIPT = "return arguments[0].some(s => document.querySelector(s) !== null);"
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+
+    def __call__(self, driver):
+        return driver.execute_script(self.SCRIPT, self.selectors)
+
+class NetworkIdle:
+    """Condition remplie quand le document est chargé et qu'aucune ressource
+    n'a été ajoutée depuis idle_time secondes"""
+
+    SCRIPT = """
+    if (performance.setResourceTimingBufferSize) {
+        performance.setResourceTimingBufferSize(5000);
+    }
+    return [document.readyState, performance.getEntriesByType('resource').length];
+    """
+
+    def __init__(self, idle_time=NETWORK_IDLE_TIME):
+        self.idle_time = idle_time
+        self.last_count = None
+        self.last_change = time.time()
+
+    def __call__(self, driver):
+        ready_state, resource_count = driver.execute_script(self.SCRIPT)
+        now = time.time()
+        if resource_count != self.last_count:
+            self.last_count = resource_count
+            self.last_change = now
+            return False
+        return ready_state == "complete" and now - self.last_change >= self.idle_time
+
+def record_wait(name, elapsed, timed_out):
+    """Enregistre la durée d'une attente"""
+    with wait_stats_lock:
+        stats = wait_stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if timed_out:
+            stats["timeouts"] += 1
+
+def get_wait_stats():
+    """Retourne un résumé des attentes: nombre, moyenne, maximum et plafonds atteints"""
+    with wait_stats_lock:
+        return {
+            name: {
+                "count": stats["count"],
+                "mean": round(stats["total"] / stats["count"], 3),
+                "max": round(stats["max"], 3),
+                "timeouts": stats["timeouts"],
+                "timeout": READINESS_TIMEOUTS.get(name),
+            }
+            for name, stats in wait_stats.items()
+        }
+
+def reset_wait_stats():
+    """Réinitialise les statistiques des attentes"""
+    with wait_stats_lock:
+        wait_stats.clear()
+
+def log_wait_stats():
+    """Écrit le résumé des attentes dans les logs"""
+    for name, stats in get_wait_stats().items():
+        logger.info(
+            f"Attente '{name}': {stats['count']} fois, moyenne {stats['mean']}s, "
+            f"max {stats['max']}s, plafond {stats['timeout']}s atteint {stats['timeouts']} fois"
+        )
+
+def wait_until_ready(driver, name, condition, timeout=None):
+    """Attend que la condition soit remplie, sans dépasser le plafond
+
+    Retourne True si la condition est remplie, False si le plafond est atteint.
+    """
+    if timeout is None:
+        timeout = READINESS_TIMEOUTS.get(name, 10)
+    start = time.time()
+    try:
+        WebDriverWait(
+            driver, timeout, poll_frequency=POLL_FREQUENCY, ignored_exceptions=[JavascriptException]
+        ).until(condition)
+        ready = True
+    except TimeoutException:
+        ready = False
+    elapsed = time.time() - start
+    record_wait(name, elapsed, not ready)
+    if not ready:
+        logger.warning(f"Plafond de {timeout}s atteint pour l'attente '{name}'")
+    return ready
+
+def wait_for_network_idle(driver, timeout=None):
+    """Attend que la page ne charge plus de nouvelles ressources"""
+    return wait_until_ready(driver, "network_idle", NetworkIdle(), timeout)
+
+def wait_for_product_ready(driver):
+    """Attend que les champs d'une fiche produit soient présents dans le DOM
+
+    Le titre est attendu en premier. Le prix peut manquer (produit indisponible):
+    on attend alors au plus que le réseau soit stable.
+    """
+    if not wait_until_ready(driver, "product_title", AnyElementPresent(TITLE_SELECTORS)):
+        return False
+    price_present = AnyElementPresent(EUROS_SELECTORS + [PRICE_SELECTOR])
+    network_idle = NetworkIdle()
+    return wait_until_ready(
+        driver, "product_price",
+        lambda d: price_present(d) or network_idle(d)
+    )
+
+def wait_for_listing_ready(driver, name="listing_links", timeout=None):
+    """Attend que les liens de produits d'une page de listing soient présents"""
+    return wait_until_ready(driver, name, AnyElementPresent(LISTING_LINK_SELECTORS), timeout)
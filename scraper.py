@@ -1,10 +1,73 @@
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from datetime import datetime
+import asyncio
 import csv
 import time
 import json
 import os
-import random
+from rate_limiter import rate_limiter
+from product import Product
+from storage import StreamingCSVWriter, BackgroundWriter, CrawlResults, backup_filename, resolve_output_path
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Nombre de pages produits scrapées en même temps par le moteur asynchrone
+PLAYWRIGHT_CONCURRENCY = 5
+
+# Sélecteurs des champs d'une page produit
+PRODUCT_FIELDS_SELECTORS = {
+    "title": "h1.product-block-title",
+    "ean": "div.attribute-value.ng-star-inserted",
+    "euros": "div.price-unit.ng-star-inserted",
+    "cents": "span.price-cents",
+    "price": "div.product-price",
+    "breadcrumb": "ol.breadcrumb li",
+    "brand": "div.brand-name a",
+}
+
+# Fonction exécutée dans la page par les moteurs synchrone et asynchrone.
+# Un élément absent donne null, les règles de repli sont appliquées en Python.
+PRODUCT_FIELDS_SCRIPT = """
+(selectors) => {
+    const textOf = (selector) => {
+        const el = document.querySelector(selector);
+        return el ? el.innerText.trim() : null;
+    };
+    return {
+        nom: textOf(selectors.title),
+        ean: textOf(selectors.ean),
+        euros: textOf(selectors.euros),
+        cents: textOf(selectors.cents),
+        price: textOf(selectors.price),
+        breadcrumbs: Array.from(document.querySelectorAll(selectors.breadcrumb)).map((el) => el.innerText.trim()),
+        marque: textOf(selectors.brand)
+    };
+}
+"""
+
+def build_product_from_fields(url, fields):
+    """Crée le produit à partir des textes renvoyés par PRODUCT_FIELDS_SCRIPT"""
+    # Prix en euros et centimes séparés, sinon bloc de prix complet
+    if fields.get("euros") is not None and fields.get("cents") is not None:
+        prix_complet = f"{fields['euros']},{fields['cents'].replace(',', '').strip()} €"
+    else:
+        prix_complet = fields.get("price") or "Prix non disponible"
+    
+    # Catégorie: avant-dernier élément du fil d'Ariane (Premier = Accueil, Dernier = Produit actuel)
+    breadcrumbs = fields.get("breadcrumbs") or []
+    categorie = breadcrumbs[-2] if len(breadcrumbs) > 2 else ""
+    
+    # Créer le produit (prix et EAN analysés une seule fois)
+    return Product.from_record({
+        "Lien": url,
+        "Date": datetime.now().strftime("%Y-%m-%d"),
+        "Nom du produit": fields.get("nom") or "",
+        "EAN": fields.get("ean") or "",
+        "Prix": prix_complet,
+        "Catégorie": categorie,
+        "Marque": fields.get("marque") or ""
+    })
 
 def get_all_parapharma_product_urls(base_url="https://www.e.leclerc/cat/parapharmacie", max_pages=None):
     """
@@ -15,7 +78,7 @@ def get_all_parapharma_product_urls(base_url="https://www.e.leclerc/cat/paraphar
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            user_agent=USER_AGENT
         )
         page = context.new_page()
         
@@ -55,8 +118,15 @@ def get_all_parapharma_product_urls(base_url="https://www.e.leclerc/cat/paraphar
             next_button = page.locator("li.next:not(.disabled) a").first
             
             if next_button.count() > 0:
+                # Respecter le débit autorisé par le site
+                rate_limiter.acquire()
+                start_time = time.time()
                 next_button.click()
-                time.sleep(random.uniform(1, 2))  # Pause aléatoire pour éviter d'être détecté
+                try:
+                    page.wait_for_selector("div.product-thumbnail", timeout=30000)
+                    rate_limiter.record_success(time.time() - start_time)
+                except Exception:
+                    rate_limiter.record_failure("listing vide")
                 current_page += 1
             else:
                 has_next_page = False
@@ -92,11 +162,13 @@ def scrap_leclerc_with_playwright(url, retry_count=3):
             with sync_playwright() as p:
                 browser = p.chromium.launch(headless=True)
                 context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+                    user_agent=USER_AGENT
                 )
                 page = context.new_page()
                 
-                # Aller sur la page produit
+                # Aller sur la page produit en respectant le débit autorisé
+                rate_limiter.acquire()
+                start_time = time.time()
                 page.goto(url, timeout=60000)
                 
                 # Accepter les cookies si nécessaire
@@ -107,62 +179,17 @@ def scrap_leclerc_with_playwright(url, retry_count=3):
                     pass
                 
                 # Attendre que les éléments nécessaires se chargent
-                page.wait_for_selector("h1.product-block-title", timeout=30000)
+                page.wait_for_selector(PRODUCT_FIELDS_SELECTORS["title"], timeout=30000)
+                rate_limiter.record_success(time.time() - start_time)
 
-                # Récupérer les informations du produit
-                nom = page.locator("h1.product-block-title").inner_text().strip()
-                
-                # Récupérer l'EAN (s'il existe)
-                ean = ""
-                try:
-                    ean = page.locator("div.attribute-value.ng-star-inserted").nth(0).inner_text().strip()
-                except:
-                    # L'EAN n'est peut-être pas disponible pour tous les produits
-                    pass
-                
-                # Récupérer le prix
-                prix_complet = ""
-                try:
-                    euros = page.locator("div.price-unit.ng-star-inserted").inner_text().strip()
-                    cents = page.locator("span.price-cents").inner_text().strip().replace(",", "").strip()
-                    prix_complet = f"{euros},{cents} €"
-                except:
-                    # Tenter une autre méthode pour récupérer le prix
-                    try:
-                        prix_complet = page.locator("div.product-price").inner_text().strip()
-                    except:
-                        prix_complet = "Prix non disponible"
-                
-                # Récupérer la catégorie du produit
-                categorie = ""
-                try:
-                    breadcrumbs = page.locator("ol.breadcrumb li").all()
-                    if len(breadcrumbs) > 2:  # Premier = Accueil, Dernier = Produit actuel
-                        categorie = breadcrumbs[-2].inner_text().strip()
-                except:
-                    pass
-                
-                # Récupérer la marque du produit
-                marque = ""
-                try:
-                    marque = page.locator("div.brand-name a").inner_text().strip()
-                except:
-                    pass
-                
+                # Récupérer les informations du produit en un seul aller-retour
+                fields = page.evaluate(PRODUCT_FIELDS_SCRIPT, PRODUCT_FIELDS_SELECTORS)
                 browser.close()
                 
-                # Créer et retourner l'objet de données
-                return {
-                    "Lien": url,
-                    "Date": datetime.now().strftime("%Y-%m-%d"),
-                    "Nom du produit": nom,
-                    "EAN": ean,
-                    "Prix": prix_complet,
-                    "Catégorie": categorie,
-                    "Marque": marque
-                }
+                return build_product_from_fields(url, fields)
                 
         except Exception as e:
+            rate_limiter.record_failure("erreur sur une page produit")
             print(f"Erreur lors du scraping de {url}, tentative {attempt+1}/{retry_count}: {str(e)}")
             if attempt < retry_count - 1:
                 # Attendre avant de réessayer (temps d'attente exponentiel)
@@ -179,54 +206,146 @@ def scrap_leclerc_with_playwright(url, retry_count=3):
                     "Marque": ""
                 }
 
-def batch_scrape_products(urls, batch_size=10, output_file="produits_leclerc.csv", start_index=0):
+class AsyncPlaywrightEngine:
     """
-    Scrape les produits par lots avec sauvegarde intermédiaire
+    Moteur Playwright asynchrone: un seul navigateur, des contextes réutilisés
+    et plusieurs pages produits scrapées en parallèle (limité à concurrency)
     """
-    all_results = []
     
-    # Chargement des données déjà scrapées si le fichier existe
-    if os.path.exists(output_file) and start_index > 0:
-        with open(output_file, mode="r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            all_results = list(reader)
+    def __init__(self, concurrency=PLAYWRIGHT_CONCURRENCY):
+        self.concurrency = concurrency
+        self.playwright = None
+        self.browser = None
+        self.contexts = None
+        self.cookies_accepted = set()
+    
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=True)
+        # Un contexte par tâche concurrente, réutilisé d'un produit à l'autre
+        self.contexts = asyncio.Queue()
+        for _ in range(self.concurrency):
+            context = await self.browser.new_context(user_agent=USER_AGENT)
+            await self.contexts.put(context)
+        return self
+    
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
     
-    # Boucle de scraping par lots
+    async def __aenter__(self):
+        return await self.start()
+    
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.close()
+        return False
+    
+    async def _extract(self, context, url):
+        """Charge la page produit dans le contexte et en extrait les données"""
+        page = await context.new_page()
+        try:
+            # Aller sur la page produit en respectant le débit autorisé
+            await asyncio.to_thread(rate_limiter.acquire)
+            start_time = time.time()
+            await page.goto(url, timeout=60000)
+            
+            # Accepter les cookies une seule fois par contexte
+            if id(context) not in self.cookies_accepted:
+                try:
+                    if await page.locator("button#onetrust-accept-btn-handler").count() > 0:
+                        await page.click("button#onetrust-accept-btn-handler")
+                except:
+                    pass
+                self.cookies_accepted.add(id(context))
+            
+            # Attendre que les éléments nécessaires se chargent
+            await page.wait_for_selector(PRODUCT_FIELDS_SELECTORS["title"], timeout=30000)
+            rate_limiter.record_success(time.time() - start_time)
+            
+            # Récupérer les informations du produit en un seul aller-retour
+            fields = await page.evaluate(PRODUCT_FIELDS_SCRIPT, PRODUCT_FIELDS_SELECTORS)
+            return build_product_from_fields(url, fields)
+        finally:
+            await page.close()
+    
+    async def scrape(self, url, retry_count=3):
+        """Scrape un produit avec un contexte libre, avec le même mécanisme de retry que la version synchrone"""
+        context = await self.contexts.get()
+        try:
+            for attempt in range(retry_count):
+                try:
+                    return await self._extract(context, url)
+                except Exception as e:
+                    rate_limiter.record_failure("erreur sur une page produit")
+                    print(f"Erreur lors du scraping de {url}, tentative {attempt+1}/{retry_count}: {str(e)}")
+                    if attempt < retry_count - 1:
+                        await asyncio.sleep(5 * (attempt + 1))
+            
+            # Toutes les tentatives ont échoué
+            return {
+                "Lien": url,
+                "Date": datetime.now().strftime("%Y-%m-%d"),
+                "Nom du produit": "Erreur lors du scraping",
+                "EAN": "",
+                "Prix": "",
+                "Catégorie": "",
+                "Marque": ""
+            }
+        finally:
+            await self.contexts.put(context)
+    
+    async def scrape_many(self, urls):
+        """Scrape plusieurs produits en parallèle; les résultats suivent l'ordre des URLs"""
+        return await asyncio.gather(*[self.scrape(url) for url in urls])
+
+async def batch_scrape_products_async(urls, batch_size=10, output_file="produits_leclerc.csv", start_index=0, concurrency=PLAYWRIGHT_CONCURRENCY, append=None):
+    """
+    Scrape les produits par lots avec le moteur asynchrone et sauvegarde intermédiaire
+    
+    Les produits de chaque lot sont ajoutés au CSV et à son backup par un thread
+    d'écriture, puis oubliés: seul le lot courant est en mémoire. Les échecs ne sont
+    pas écrits (une reprise les retente). append complète les fichiers existants
+    (par défaut dès que start_index > 0). Retourne les compteurs (voir CrawlResults).
+    """
+    results = CrawlResults()
     total_urls = len(urls)
+    if append is None:
+        append = start_index > 0
+    writer = BackgroundWriter([
+        StreamingCSVWriter(output_file, append=append),
+        StreamingCSVWriter(backup_filename(output_file), append=append),
+    ]).start()
     
-    for i in range(start_index, total_urls, batch_size):
-        print(f"Traitement du lot {i//batch_size + 1}/{(total_urls + batch_size - 1)//batch_size}...")
-        
-        # Prendre le prochain lot d'URLs
-        batch_urls = urls[i:i+batch_size]
-        batch_results = []
-        
-        # Scraper chaque URL du lot
-        for url in batch_urls:
-            try:
-                product_data = scrap_leclerc_with_playwright(url)
-                batch_results.append(product_data)
+    try:
+        # Un seul navigateur pour tous les lots
+        async with AsyncPlaywrightEngine(concurrency) as engine:
+            for i in range(start_index, total_urls, batch_size):
+                print(f"Traitement du lot {i//batch_size + 1}/{(total_urls + batch_size - 1)//batch_size}...")
                 
-                # Pause aléatoire entre chaque requête
-                time.sleep(random.uniform(1, 3))
-            except Exception as e:
-                print(f"Erreur lors du traitement de l'URL {url}: {str(e)}")
-        
-        # Ajouter les résultats du lot aux résultats globaux
-        all_results.extend(batch_results)
-        
-        # Sauvegarder les résultats intermédiaires
-        export_to_csv(all_results, output_file)
-        
-        print(f"Progression: {min(i + batch_size, total_urls)}/{total_urls} produits traités")
-        
-        # Pause entre les lots pour éviter d'être bloqué
-        if i + batch_size < total_urls:
-            pause_time = random.uniform(5, 10)
-            print(f"Pause de {pause_time:.1f} secondes avant le prochain lot...")
-            time.sleep(pause_time)
+                # Scraper le lot en parallèle (le débit est régulé par le limiteur partagé)
+                batch_results = await engine.scrape_many(urls[i:i+batch_size])
+                
+                # Ajouter les produits du lot aux fichiers (sans doublons) et créer un checkpoint
+                for product_data in batch_results:
+                    if isinstance(product_data, Product) and results.add(product_data):
+                        writer.submit(product_data)
+                writer.checkpoint()
+                
+                print(f"Progression: {min(i + batch_size, total_urls)}/{total_urls} produits traités")
+    finally:
+        writer.close()
     
-    return all_results
+    return results.summary(max(0, total_urls - start_index))
+
+def batch_scrape_products(urls, batch_size=10, output_file="produits_leclerc.csv", start_index=0, concurrency=PLAYWRIGHT_CONCURRENCY, append=None):
+    """
+    Scrape les produits par lots avec sauvegarde intermédiaire
+    """
+    return asyncio.run(batch_scrape_products_async(urls, batch_size, output_file, start_index, concurrency, append))
 
 def export_to_csv(data, filename="produits_leclerc.csv"):
     """
@@ -260,20 +379,19 @@ def resume_scraping(urls_file="product_urls.json", output_file="produits_leclerc
     
     if not urls:
         print("Aucune URL trouvée. Veuillez d'abord exécuter get_all_parapharma_product_urls().")
-        return []
+        return CrawlResults().summary()
     
-    # Vérifier s'il y a des résultats précédents
-    start_index = 0
-    if os.path.exists(output_file):
-        with open(output_file, mode="r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            previous_results = list(reader)
-            start_index = len(previous_results)
-            
-        print(f"Reprise du scraping à partir de l'index {start_index}/{len(urls)}")
+    # Ignorer les URLs déjà présentes dans le CSV (quel que soit leur ordre ou les échecs)
+    output_path = resolve_output_path(output_file)
+    if not os.path.exists(output_path):
+        return batch_scrape_products(urls, batch_size, output_file)
+    with open(output_path, mode="r", newline="", encoding="utf-8") as f:
+        done_urls = {row.get("Lien") for row in csv.DictReader(f)}
+    remaining_urls = [url for url in urls if url not in done_urls]
+    print(f"Reprise du scraping: {len(urls) - len(remaining_urls)}/{len(urls)} produits déjà scrapés")
     
-    # Continuer le scraping
-    return batch_scrape_products(urls, batch_size, output_file, start_index)
+    # Continuer le scraping à la suite du fichier existant
+    return batch_scrape_products(remaining_urls, batch_size, output_file, append=True)
 
 
 if __name__ == "__main__":
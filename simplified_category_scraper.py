@@ -13,11 +13,35 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
 import re
 import traceback
-import random
+import queue
+import itertools
+import threading
+from extraction import (
+    PRODUCT_EXTRACTION_SCRIPT, LINK_EXTRACTION_SCRIPT, LISTING_SELECTORS,
+    TITLE_SELECTORS, EUROS_SELECTORS, CENTS_SELECTORS, PRICE_SELECTOR, BRAND_SELECTORS, DEFAULT_CATEGORY, get_script_selectors, build_product_record
+)
+from rate_limiter import rate_limiter
+from storage import StreamingCSVWriter, BackgroundWriter, CrawlResults, SQLiteStore, backup_filename, export_database_to_csv, resolve_output_path
+from price_history import PriceHistory
+from crawl_checkpoint import CrawlCheckpoint, crawl_checkpoint_filename
+from frontier import URLFrontier, canonical_product_url
+from html_extraction import extract_product_from_html
+from http_engine import HTTPFetchEngine
+from listing_api import ListingAPICrawler, LISTING_API_FILE, load_listing_request, save_listing_request
+from product import Product
+from driver_manager import DriverManager, resolve_chromedriver_path, invalidate_chromedriver_cache
+from lean_browsing import apply_lean_options, enable_request_blocking, log_page_savings, reset_lean_stats, read_performance_messages
+from network_capture import (
+    apply_capture_options, enable_network_capture, capture_json_responses,
+    build_record_from_capture, remember_search_requests, reset_capture_stats
+)
+from readiness import (
+    wait_for_product_ready, wait_for_listing_ready, wait_for_network_idle,
+    reset_wait_stats, log_wait_stats
+)
 
 # Configuration de base du logging
 logging.basicConfig(
@@ -39,6 +63,25 @@ scraping_status = {
     "last_product": None
 }
 
+# Verrou protégeant les mises à jour du statut par plusieurs workers
+status_lock = threading.Lock()
+
+# Nombre de WebDrivers travaillant en parallèle par défaut (un par cœur)
+DEFAULT_NUM_WORKERS = os.cpu_count() or 1
+
+# Mode d'extraction des fiches produits: "js" (un seul aller-retour), "html" (analyse
+# de page_source avec lxml) ou "webdriver"
+DEFAULT_EXTRACTION_MODE = "js"
+
+# Navigation allégée (images, polices, médias et traqueurs bloqués) désactivée par défaut
+LEAN_BROWSING = False
+
+# Capture des réponses JSON des API du site via DevTools, désactivée par défaut
+NETWORK_CAPTURE = False
+
+# Taille maximale de la file de liens entre la découverte et le scraping
+LINK_QUEUE_SIZE = 100
+
 def get_estimated_time_remaining():
     """Calcule le temps estimé restant pour le scraping"""
     if not scraping_status["in_progress"] or scraping_status["processed_products"] == 0:
@@ -151,64 +194,75 @@ def determine_total_pages(driver):
         logger.warning("Utilisation de la valeur par défaut: 320")
         return 320  # Valeur par défaut en cas d'erreur
 
-def extract_product_links(driver):
-    """Extrait tous les liens de produits sur une page avec sélecteurs améliorés"""
-    logger.info("Extraction des liens de produits...")
-    
-    # Attendre que la page se charge
+def collect_listing_hrefs(driver):
+    """Récupère les liens /fp/ de la page en un seul appel de script
+
+    Retourne les liens dans l'ordre de la page et le nombre de liens apportés par
+    chaque sélecteur. En cas d'échec du script, les éléments sont lus un par un.
+    """
     try:
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "a.product-card-link, .product-thumbnail a, .product-card a"))
-        )
-        # Attendre un peu plus pour être sûr que tout est chargé
-        time.sleep(2)
+        found = driver.execute_script(LINK_EXTRACTION_SCRIPT, LISTING_SELECTORS) or {}
+        return found.get("links", []), found.get("matched", {})
     except Exception as e:
-        logger.warning(f"Timeout lors de l'attente des produits: {e}")
-        # Continuer quand même, peut-être que certains éléments sont chargés
-    
-    # Liste pour stocker les liens
-    product_links = []
-    
-    # Essayer plusieurs sélecteurs pour être robuste face aux changements
-    selectors = [
-        "a.product-card-link",                # Sélecteur principal  
-        ".product-thumbnail a",               # Alternative 1
-        ".product-card a",                    # Alternative 2
-        "a[href*='/fp/']",                    # Lien contenant '/fp/' (product page)
-        "a[href*='/cat/']:not([href*='page='])"  # Lien vers une catégorie mais pas pagination
-    ]
-    
-    # Essayer chaque sélecteur
-    for selector in selectors:
+        logger.warning(f"Échec du script d'extraction des liens, lecture élément par élément: {e}")
+        return collect_listing_hrefs_with_webdriver(driver)
+
+def collect_listing_hrefs_with_webdriver(driver):
+    """Lit les liens /fp/ élément par élément (un aller-retour chromedriver par lien)"""
+    hrefs = []
+    matched = {}
+    for selector in LISTING_SELECTORS:
         try:
             elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            logger.info(f"Sélecteur '{selector}' a trouvé {len(elements)} éléments")
-            
-            for element in elements:
-                href = element.get_attribute("href")
-                if href and '/fp/' in href and href not in product_links:
-                    product_links.append(href)
-                    logger.info(f"Lien de produit ajouté: {href}")
+            found = [element.get_attribute("href") for element in elements]
+            found = [href for href in found if href and '/fp/' in href]
+            matched[selector] = len(found)
+            hrefs.extend(found)
         except Exception as e:
             logger.warning(f"Erreur avec le sélecteur '{selector}': {e}")
     
     # Si aucun produit n'est trouvé, essayer une approche plus générale
-    if not product_links:
-        logger.warning("Aucun produit trouvé avec les sélecteurs. Tentative avec tous les liens.")
+    if not hrefs:
         try:
-            all_links = driver.find_elements(By.TAG_NAME, "a")
-            for link in all_links:
-                href = link.get_attribute("href")
-                if href and '/fp/' in href and href not in product_links:
-                    product_links.append(href)
-                    logger.info(f"Lien de produit trouvé (méthode de secours): {href}")
+            found = [link.get_attribute("href") for link in driver.find_elements(By.TAG_NAME, "a")]
+            found = [href for href in found if href and '/fp/' in href]
+            matched["a"] = len(found)
+            hrefs.extend(found)
         except Exception as e:
             logger.error(f"Erreur lors de la recherche générique: {e}")
+    return hrefs, matched
+
+def extract_product_links(driver):
+    """Extrait tous les liens de produits d'une page de listing (canoniques, sans doublons)"""
+    logger.info("Extraction des liens de produits...")
+    
+    # Attendre que les produits soient présents puis que le réseau soit stable
+    try:
+        if wait_for_listing_ready(driver):
+            wait_for_network_idle(driver)
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'attente des produits: {e}")
+        # Continuer quand même, peut-être que certains éléments sont chargés
+    
+    hrefs, matched = collect_listing_hrefs(driver)
+    matching = {selector: count for selector, count in matched.items() if count}
+    if "a" in matching:
+        logger.warning("Aucun produit trouvé avec les sélecteurs, liens trouvés parmi tous les <a> de la page")
+    logger.info(f"Sélecteurs ayant trouvé des produits: {matching or 'aucun'}")
     
-    # Déduplication et log
-    product_links = list(set(product_links))  # Supprimer les doublons
+    # Liens canoniques dans l'ordre de la page (les paramètres de suivi sont retirés)
+    product_links = []
+    seen_links = set()
+    for href in hrefs:
+        link = canonical_product_url(href)
+        if link not in seen_links:
+            seen_links.add(link)
+            product_links.append(link)
     logger.info(f"Total de {len(product_links)} liens de produits uniques extraits")
     
+    # Requêtes de recherche du site, conservées pour être rejouées en HTTP
+    remember_search_requests(process_performance_log(driver, driver.current_url))
+    
     return product_links
 
 def navigate_to_page(driver, base_url, page_number):
@@ -228,13 +282,8 @@ def navigate_to_page(driver, base_url, page_number):
             logger.info(f"Tentative avec l'URL: {url}")
             driver.get(url)
             
-            # Attendre que la page se charge
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Vérifier si nous sommes bien sur la page demandée
-            time.sleep(2)  # Attendre un peu que tout se charge
+            # Attendre que les produits apparaissent (ou le plafond)
+            wait_for_listing_ready(driver, name="listing_navigation")
             
             # Vérifier si la page contient des produits
             product_elements = driver.find_elements(By.CSS_SELECTOR, "a.product-card-link, .product-thumbnail a, .product-card a")
@@ -262,7 +311,7 @@ def navigate_to_page(driver, base_url, page_number):
         for element in pagination_elements:
             if element.text.strip() == str(page_number):
                 element.click()
-                time.sleep(2)
+                wait_for_network_idle(driver)
                 logger.info(f"Navigation par clic vers la page {page_number} réussie")
                 return True
     except Exception as e:
@@ -271,151 +320,212 @@ def navigate_to_page(driver, base_url, page_number):
     logger.error(f"Toutes les tentatives de navigation vers la page {page_number} ont échoué")
     return False
 
-def scrap_leclerc_product(url, driver):
-    """Scrape les informations d'un produit spécifique en utilisant des sélecteurs plus robustes"""
+def scrap_leclerc_product(url, driver, extraction_mode=None):
+    """Scrape les informations d'un produit spécifique en utilisant des sélecteurs plus robustes
+
+    extraction_mode: "js" récupère tous les champs en un seul execute_script,
+    "html" lit page_source une fois et l'analyse hors du navigateur,
+    "webdriver" interroge le navigateur champ par champ (ancienne méthode).
+    """
+    extraction_mode = extraction_mode or DEFAULT_EXTRACTION_MODE
     try:
+        # Respecter le débit autorisé par le site
+        rate_limiter.acquire()
+        start_time = time.time()
         driver.get(url)
-        time.sleep(2)  # Attendre un peu que la page se charge complètement
+        # Attendre que les champs du produit soient présents dans le DOM
+        ready = wait_for_product_ready(driver)
         
-        # Extraction du titre du produit
-        nom = ""
-        try:
-            # Essayer avec différents sélecteurs possibles pour le titre
-            for selector in ["h1.product-block-title", "h1.cbBiP", "h1"]:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    nom = elements[0].text.strip()
-                    break
-            
-            # Si toujours pas de titre, essayer une recherche plus large
-            if not nom:
-                header_elements = driver.find_elements(By.TAG_NAME, "h1")
-                for el in header_elements:
-                    if el.text and len(el.text.strip()) > 5:  # Un titre significatif
-                        nom = el.text.strip()
-                        break
-        except Exception as e:
-            logger.warning(f"Erreur lors de l'extraction du titre: {str(e)}")
-            # Utiliser l'URL comme fallback pour le nom
-            nom_parts = url.split('/')[-1].split('-')
-            nom = ' '.join(nom_parts[:-1])  # Exclure le dernier élément qui est probablement l'EAN
+        if extraction_mode == "js":
+            candidates = driver.execute_script(PRODUCT_EXTRACTION_SCRIPT, get_script_selectors())
+            product_data = build_product_record(url, candidates or {})
+        elif extraction_mode == "html":
+            product_data = extract_product_from_html(url, driver.page_source)
+        else:
+            product_data = extract_product_with_webdriver(url, driver)
         
-        # Extraire l'EAN (depuis l'URL si possible)
-        ean = ""
-        try:
-            # Méthode 1: Extraire de l'URL
-            url_parts = url.split('-')
-            for part in url_parts:
-                # Nettoyage et vérification si c'est un EAN (13 chiffres)
-                cleaned_part = re.sub(r'\D', '', part)
-                if len(cleaned_part) == 13 and cleaned_part.isdigit():
-                    ean = cleaned_part
-                    break
-            
-            # Méthode 2: Chercher dans les tableaux de données
-            if not ean:
-                # Chercher dans tous les éléments de tableau
-                table_cells = driver.find_elements(By.TAG_NAME, "td")
-                for cell in table_cells:
-                    text = cell.text.strip()
-                    # Vérifier si c'est un EAN (13 chiffres)
-                    cleaned_text = re.sub(r'\D', '', text)
-                    if len(cleaned_text) == 13 and cleaned_text.isdigit():
-                        ean = cleaned_text
-                        break
-            
-            # Méthode 3: Recherche générique dans le texte de la page
-            if not ean:
-                page_text = driver.find_element(By.TAG_NAME, "body").text
-                ean_matches = re.findall(r'\b\d{13}\b', page_text)
-                if ean_matches:
-                    ean = ean_matches[0]
-        except Exception as e:
-            logger.warning(f"Erreur lors de l'extraction de l'EAN: {str(e)}")
+        # En mode capture réseau, les données de l'API priment sur le DOM
+        responses = process_performance_log(driver, url)
+        if getattr(driver, "network_capture", False):
+            product_data = build_record_from_capture(url, product_data, responses)
+        # Prix et EAN analysés une seule fois
+        product_data = Product.from_record(product_data)
         
-        # Extraire le prix
-        prix = "Non disponible"
-        try:
-            # Faire une tentative avec différents sélecteurs
-            # Méthode 1: Chercher des spans spécifiques pour les euros et centimes
-            euros_element = None
-            cents_element = None
-            
-            for selector in [".vcEUR", "span.price-unit", "div.price-unit"]:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    euros_element = elements[0]
-                    break
-            
-            for selector in [".bYgjT", "span.price-cents"]:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    cents_element = elements[0]
+        if ready:
+            rate_limiter.record_success(time.time() - start_time)
+        else:
+            rate_limiter.record_failure("page produit incomplète")
+        
+        # Mise à jour du statut
+        with status_lock:
+            scraping_status["processed_products"] += 1
+            scraping_status["last_product"] = product_data.name
+        
+        return product_data
+    except Exception as e:
+        rate_limiter.record_failure("erreur sur une page produit")
+        logger.error(f"Erreur lors du scraping du produit {url}: {str(e)}")
+        return None
+
+def process_performance_log(driver, url):
+    """Lit une seule fois le journal de performance pour la navigation allégée et la capture réseau
+
+    Retourne les réponses JSON capturées (liste vide hors mode capture).
+    """
+    lean_browsing = getattr(driver, "lean_browsing", False)
+    network_capture = getattr(driver, "network_capture", False)
+    if not (lean_browsing or network_capture):
+        return []
+    try:
+        messages = read_performance_messages(driver)
+    except Exception as e:
+        logger.warning(f"Impossible de lire le journal de performance: {e}")
+        return []
+    if lean_browsing:
+        log_page_savings(driver, url, messages)
+    return capture_json_responses(driver, messages) if network_capture else []
+
+def extract_product_with_webdriver(url, driver):
+    """Extrait les champs du produit avec un appel WebDriver par sélecteur"""
+    # Extraction du titre du produit
+    nom = ""
+    try:
+        # Essayer avec différents sélecteurs possibles pour le titre
+        for selector in TITLE_SELECTORS:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                nom = elements[0].text.strip()
+                break
+        
+        # Si toujours pas de titre, essayer une recherche plus large
+        if not nom:
+            header_elements = driver.find_elements(By.TAG_NAME, "h1")
+            for el in header_elements:
+                if el.text and len(el.text.strip()) > 5:  # Un titre significatif
+                    nom = el.text.strip()
                     break
-            
-            if euros_element and cents_element:
-                euros = euros_element.text.strip()
-                cents = cents_element.text.strip()
-                prix = f"{euros},{cents} €"
-            else:
-                # Méthode 2: Chercher un élément de prix complet
-                price_elements = driver.find_elements(By.CSS_SELECTOR, ".price, .product-price, [data-testid*='price']")
-                for el in price_elements:
-                    price_text = el.text.strip()
-                    if price_text and ('€' in price_text or 'EUR' in price_text):
-                        prix = price_text
-                        break
-                
-                # Méthode 3: Recherche de motif de prix dans le texte
-                if prix == "Non disponible":
-                    page_text = driver.find_element(By.TAG_NAME, "body").text
-                    price_matches = re.findall(r'\d+[,\.]\d{2}\s*€', page_text)
-                    if price_matches:
-                        prix = price_matches[0]
-        except Exception as e:
-            logger.warning(f"Erreur lors de l'extraction du prix: {str(e)}")
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'extraction du titre: {str(e)}")
+        # Utiliser l'URL comme fallback pour le nom
+        nom_parts = url.split('/')[-1].split('-')
+        nom = ' '.join(nom_parts[:-1])  # Exclure le dernier élément qui est probablement l'EAN
+    
+    # Extraire l'EAN (depuis l'URL si possible)
+    ean = ""
+    try:
+        # Méthode 1: Extraire de l'URL
+        url_parts = url.split('-')
+        for part in url_parts:
+            # Nettoyage et vérification si c'est un EAN (13 chiffres)
+            cleaned_part = re.sub(r'\D', '', part)
+            if len(cleaned_part) == 13 and cleaned_part.isdigit():
+                ean = cleaned_part
+                break
         
-        # Extraire la marque
-        marque = ""
-        try:
-            # Essayer différents sélecteurs pour la marque
-            for selector in ["p.product-brand", ".brand-name", "[data-testid*='brand']"]:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    marque = elements[0].text.strip()
+        # Méthode 2: Chercher dans les tableaux de données
+        if not ean:
+            # Chercher dans tous les éléments de tableau
+            table_cells = driver.find_elements(By.TAG_NAME, "td")
+            for cell in table_cells:
+                text = cell.text.strip()
+                # Vérifier si c'est un EAN (13 chiffres)
+                cleaned_text = re.sub(r'\D', '', text)
+                if len(cleaned_text) == 13 and cleaned_text.isdigit():
+                    ean = cleaned_text
                     break
-                    
-            # Si aucune marque trouvée, essayer de l'extraire du titre
-            if not marque and nom:
-                first_word = nom.split(' ')[0]
-                if len(first_word) > 2:  # Éviter les petits mots comme "Le" ou "La"
-                    marque = first_word
-        except Exception as e:
-            logger.warning(f"Erreur lors de l'extraction de la marque: {str(e)}")
         
-        # Extraire la catégorie
-        categorie = "Marques Parapharmacie"
+        # Méthode 3: Recherche générique dans le texte de la page
+        if not ean:
+            page_text = driver.find_element(By.TAG_NAME, "body").text
+            ean_matches = re.findall(r'\b\d{13}\b', page_text)
+            if ean_matches:
+                ean = ean_matches[0]
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'extraction de l'EAN: {str(e)}")
+    
+    # Extraire le prix
+    prix = "Non disponible"
+    try:
+        # Faire une tentative avec différents sélecteurs
+        # Méthode 1: Chercher des spans spécifiques pour les euros et centimes
+        euros_element = None
+        cents_element = None
         
-        # Mise à jour du statut
-        global scraping_status
-        scraping_status["processed_products"] += 1
-        scraping_status["last_product"] = nom
-        
-        return {
-            "Lien": url,
-            "Date": datetime.now().strftime("%Y-%m-%d"),
-            "Nom du produit": nom,
-            "Marque": marque,
-            "Catégorie": categorie,
-            "EAN": ean,
-            "Prix": prix
-        }
+        for selector in EUROS_SELECTORS:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                euros_element = elements[0]
+                break
+        
+        for selector in CENTS_SELECTORS:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                cents_element = elements[0]
+                break
+        
+        if euros_element and cents_element:
+            euros = euros_element.text.strip()
+            cents = cents_element.text.strip()
+            prix = f"{euros},{cents} €"
+        else:
+            # Méthode 2: Chercher un élément de prix complet
+            price_elements = driver.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR)
+            for el in price_elements:
+                price_text = el.text.strip()
+                if price_text and ('€' in price_text or 'EUR' in price_text):
+                    prix = price_text
+                    break
+            
+            # Méthode 3: Recherche de motif de prix dans le texte
+            if prix == "Non disponible":
+                page_text = driver.find_element(By.TAG_NAME, "body").text
+                price_matches = re.findall(r'\d+[,\.]\d{2}\s*€', page_text)
+                if price_matches:
+                    prix = price_matches[0]
     except Exception as e:
-        logger.error(f"Erreur lors du scraping du produit {url}: {str(e)}")
-        return None
+        logger.warning(f"Erreur lors de l'extraction du prix: {str(e)}")
+    
+    # Extraire la marque
+    marque = ""
+    try:
+        # Essayer différents sélecteurs pour la marque
+        for selector in BRAND_SELECTORS:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                marque = elements[0].text.strip()
+                break
+                
+        # Si aucune marque trouvée, essayer de l'extraire du titre
+        if not marque and nom:
+            first_word = nom.split(' ')[0]
+            if len(first_word) > 2:  # Éviter les petits mots comme "Le" ou "La"
+                marque = first_word
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'extraction de la marque: {str(e)}")
+    
+    # Extraire la catégorie
+    categorie = DEFAULT_CATEGORY
+    
+    return {
+        "Lien": url,
+        "Date": datetime.now().strftime("%Y-%m-%d"),
+        "Nom du produit": nom,
+        "Marque": marque,
+        "Catégorie": categorie,
+        "EAN": ean,
+        "Prix": prix
+    }
 
-def initialize_webdriver():
-    """Initialise le webdriver avec une configuration adaptée pour éviter la détection"""
+def initialize_webdriver(lean_browsing=None, network_capture=None):
+    """Initialise le webdriver avec une configuration adaptée pour éviter la détection
+
+    lean_browsing: bloque images, polices, médias et traqueurs tiers (LEAN_BLOCKLIST)
+    network_capture: capture les réponses JSON des API produit et recherche
+    """
+    if lean_browsing is None:
+        lean_browsing = LEAN_BROWSING
+    if network_capture is None:
+        network_capture = NETWORK_CAPTURE
     options = webdriver.ChromeOptions()
     
     # Options pour éviter la détection
@@ -432,149 +542,414 @@ def initialize_webdriver():
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option("useAutomationExtension", False)
     
+    # Navigation allégée: pas d'images et journal de performance pour mesurer les économies
+    if lean_browsing:
+        apply_lean_options(options)
+    # Capture réseau: même journal de performance, lu une fois par page
+    if network_capture:
+        apply_capture_options(options)
+    
     try:
-        # Essayer d'initialiser directement avec les options
-        driver = webdriver.Chrome(options=options)
-        # Masquer la présence de Selenium
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        logger.info("WebDriver initialisé avec succès (méthode directe)")
-        
-        return driver
+        # Utiliser le chromedriver résolu une seule fois et mis en cache
+        service = Service(resolve_chromedriver_path())
+        driver = webdriver.Chrome(service=service, options=options)
+        logger.info("WebDriver initialisé avec succès (chromedriver en cache)")
     except Exception as e:
-        logger.warning(f"Échec de l'initialisation directe: {e}")
+        logger.warning(f"Échec de l'initialisation avec le chromedriver en cache: {e}")
+        invalidate_chromedriver_cache()
         try:
-            # Utiliser ChromeDriverManager comme fallback
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            logger.info("WebDriver initialisé avec succès (méthode avec ChromeDriverManager)")
-            
-            return driver
+            # Laisser Selenium trouver le driver comme fallback
+            driver = webdriver.Chrome(options=options)
+            logger.info("WebDriver initialisé avec succès (méthode directe)")
         except Exception as e2:
-            logger.error(f"Échec de l'initialisation avec ChromeDriverManager: {e2}")
+            logger.error(f"Échec de l'initialisation directe: {e2}")
             raise Exception("Impossible d'initialiser le WebDriver. Vérifiez que Chrome est installé.") from e2
+    
+    # Configuration après démarrage: en cas d'échec, Chrome est fermé (le chromedriver n'est pas en cause)
+    try:
+        # Masquer la présence de Selenium
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        if lean_browsing:
+            enable_request_blocking(driver)
+        if network_capture:
+            enable_network_capture(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+def accept_cookies(driver, url):
+    """Ouvre l'URL et accepte la bannière de cookies si elle est affichée"""
+    try:
+        driver.get(url)
+        # Attendre et cliquer sur le bouton d'acceptation des cookies s'il existe
+        try:
+            WebDriverWait(driver, 5).until(
+                EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+            ).click()
+            logger.info("Cookies acceptés")
+        except:
+            logger.info("Pas de bannière de cookies trouvée")
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'accès à la page: {e}")
+
+def scrape_product_with_retry(link, manager, max_retries=2):
+    """Scrape un produit en réessayant plusieurs fois en cas d'échec
 
-def scrape_category_pages(category_url, max_pages=None, output_file="produits_leclerc_soinsvisage.csv"):
-    """Scrape toutes les pages d'une catégorie avec navigation améliorée"""
+    Le WebDriver est fourni par un DriverManager, qui le recycle après des échecs répétés.
+    """
+    for attempt in range(max_retries + 1):
+        product_data = scrap_leclerc_product(link, manager.get())
+        manager.record_page(product_data is not None)
+        if product_data:
+            return product_data
+        if attempt < max_retries:
+            logger.warning(f"Nouvelle tentative {attempt+1}/{max_retries} pour le produit: {link}")
+            time.sleep(2 * (attempt + 1))
+    return None
+
+def scrape_urls_with_manager(urls, manager, max_retries=0):
+    """Scrape une liste d'URLs en réutilisant le WebDriver d'un DriverManager"""
     results = []
+    for url in urls:
+        try:
+            product_data = scrape_product_with_retry(url, manager, max_retries)
+            if product_data:
+                results.append(product_data)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de l'URL {url}: {str(e)}")
+    return results
+
+def start_product_consumers(link_queue, managers, on_result, max_retries=2):
+    """Démarre un consommateur par DriverManager, qui scrape les liens reçus dans la file
+
+    Chaque consommateur s'arrête lorsqu'il reçoit None dans la file. Les produits
+    scrapés sont transmis à on_result au fur et à mesure.
+    """
+    def worker(worker_id, manager):
+        while True:
+            link = link_queue.get()
+            try:
+                if link is None:
+                    return
+                logger.info(f"[Worker {worker_id}] Scraping du produit: {link}")
+                product_data = scrape_product_with_retry(link, manager, max_retries)
+                if product_data:
+                    on_result(product_data)
+                    logger.info(f"[Worker {worker_id}] Produit scrapé avec succès: {product_data['Nom du produit']}")
+                else:
+                    logger.warning(f"[Worker {worker_id}] Échec du scraping pour le produit: {link}")
+            except Exception as e:
+                logger.error(f"[Worker {worker_id}] Erreur lors du scraping du produit {link}: {str(e)}")
+            finally:
+                link_queue.task_done()
+
+    threads = [
+        threading.Thread(target=worker, args=(worker_id, manager), daemon=True)
+        for worker_id, manager in enumerate(managers, start=1)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def stop_product_consumers(link_queue, threads):
+    """Signale la fin de la découverte et attend que les consommateurs vident la file"""
+    for _ in threads:
+        link_queue.put(None)
+    for thread in threads:
+        thread.join()
+
+def requeue_pending_links(link_queue, checkpoint, frontier):
+    """Remet en file les liens en attente du crawl précédent, retourne le nombre mis en file
+
+    Les produits déjà écrits sont ajoutés d'abord à la frontière: un lien en attente
+    qui en est un doublon (écarté par la frontière du crawl précédent) n'est pas remis en file.
+    """
+    if not checkpoint:
+        return 0
+    frontier.seed(checkpoint.done_urls())
+    queued_links = 0
+    for link in checkpoint.pending_urls():
+        if frontier.add(link):
+            link_queue.put(link)
+            queued_links += 1
+    return queued_links
+
+def queue_page_links(page, links, link_queue, checkpoint, writer, frontier):
+    """Met en file les liens nouveaux d'une page de listing puis journalise la page
+
+    Bloque tant que la file est pleine (contre-pression). Retourne le nombre de liens mis en file.
+    """
+    queued_links = 0
+    for link in links:
+        if checkpoint and checkpoint.is_done(link):
+            continue
+        if not frontier.add(link):
+            continue
+        link_queue.put(link)
+        queued_links += 1
+    
+    # Journaliser la page, puis les produits écrits depuis la page précédente
+    if checkpoint:
+        checkpoint.complete_page(page, links)
+    if writer:
+        writer.checkpoint()
+    return queued_links
+
+def produce_product_links(driver, category_url, total_pages, link_queue, checkpoint=None, writer=None, frontier=None):
+    """Parcourt les pages de la catégorie et pousse les liens de produits dans la file
+
+    La file étant bornée, la découverte se met en pause lorsque les consommateurs
+    ont du retard, ce qui garde la mémoire constante. Avec un CrawlCheckpoint, les
+    liens en attente du crawl précédent sont remis en file (sauf les doublons de
+    produits déjà écrits), les pages terminées ne sont pas relistées et chaque page
+    mise en file est journalisée. Un lien n'est mis en file que s'il est nouveau pour
+    la frontière (voir URLFrontier).
+    """
+    frontier = frontier if frontier is not None else URLFrontier()
+    queued_links = requeue_pending_links(link_queue, checkpoint, frontier)
+    for current_page in range(1, total_pages + 1):
+        if checkpoint and checkpoint.is_page_done(current_page):
+            logger.info(f"Page {current_page}/{total_pages} déjà terminée, ignorée")
+            continue
+        logger.info(f"Découverte de la page {current_page}/{total_pages}")
+        
+        # Si ce n'est pas la première page, naviguer vers la page
+        start_time = time.time()
+        if current_page > 1:
+            rate_limiter.acquire()
+            success = navigate_to_page(driver, category_url, current_page)
+            if not success:
+                rate_limiter.record_failure("navigation impossible")
+                logger.error(f"Impossible d'accéder à la page {current_page}, passage à la suivante")
+                continue
+        
+        # Extraire les liens des produits
+        product_links = extract_product_links(driver)
+        logger.info(f"Page {current_page}: {len(product_links)} produits trouvés")
+        
+        if not product_links:
+            rate_limiter.record_failure("listing vide")
+            logger.warning(f"Aucun produit trouvé sur la page {current_page}! Vérification du HTML...")
+            # Enregistrer une partie du HTML pour diagnostic
+            html_snippet = driver.page_source[:500] + "..." + driver.page_source[-500:]
+            logger.warning(f"Extrait du HTML: {html_snippet}")
+            continue
+        rate_limiter.record_success(time.time() - start_time)
+        
+        # Estimer le nombre total de produits à partir de la première page
+        if current_page == 1:
+            scraping_status["total_products"] = len(product_links) * total_pages
+            logger.info(f"Nombre estimé de produits: {scraping_status['total_products']} ({len(product_links)} par page * {total_pages} pages)")
+        
+        queued_links += queue_page_links(current_page, product_links, link_queue, checkpoint, writer, frontier)
+        logger.info(f"Page {current_page} mise en file ({link_queue.qsize()} liens en attente)")
+    
+    return queued_links
+
+def produce_product_links_from_api(crawler, link_queue, max_pages=None, checkpoint=None, writer=None, frontier=None):
+    """Comme produce_product_links, mais les pages de listing viennent de l'API rejouée en HTTP
+
+    Plusieurs pages sont téléchargées en parallèle; elles sont mises en file et
+    journalisées dans l'ordre. Une erreur ou un listing vide sur la première page
+    lève une exception avant qu'aucun lien ne soit mis en file. Les pages suivantes
+    restées en échec ne sont pas journalisées (voir crawler.failed_pages).
+    """
+    frontier = frontier if frontier is not None else URLFrontier()
+    skip_pages = set(checkpoint.completed_pages) if checkpoint else set()
+    pages = crawler.crawl(max_pages, skip_pages)
+    # La première page est téléchargée avant de remettre quoi que ce soit en file
+    first_page = next(pages, None)
+    queued_links = requeue_pending_links(link_queue, checkpoint, frontier)
+    for page, links in itertools.chain([first_page] if first_page else [], pages):
+        if links is None:
+            # Page non journalisée: reprise au prochain lancement (voir crawler.failed_pages)
+            continue
+        if not links:
+            logger.warning(f"Aucun produit trouvé sur la page {page} de l'API de listing")
+            continue
+        if page == 1:
+            scraping_status["total_products"] = len(links) * (crawler.total_pages or 1)
+        elif crawler.total_pages is None:
+            # Nombre de pages inconnu: le total grandit avec les pages parcourues
+            scraping_status["total_products"] += len(links)
+        canonical_links = [canonical_product_url(link) for link in links]
+        queued_links += queue_page_links(page, canonical_links, link_queue, checkpoint, writer, frontier)
+        logger.info(f"Page {page} de l'API mise en file ({link_queue.qsize()} liens en attente)")
+    return queued_links
+
+def learn_listing_request(category_url, filename=LISTING_API_FILE):
+    """Ouvre la catégorie dans un navigateur en mode capture et enregistre sa requête de listing
+
+    La requête enregistrée sert ensuite à scrape_category_pages pour paginer sans navigateur.
+    """
+    driver = initialize_webdriver(network_capture=True)
+    try:
+        accept_cookies(driver, category_url)
+        extract_product_links(driver)
+        return save_listing_request(category_url, filename=filename)
+    finally:
+        driver.quit()
+
+def create_sinks(output_file, database_file=None, append=False):
+    """Crée les destinations des produits: la base SQLite et l'historique des prix si demandés,
+    sinon le CSV et son backup"""
+    if database_file:
+        return [SQLiteStore(database_file), PriceHistory(database_file)]
+    return [
+        StreamingCSVWriter(output_file, append=append),
+        StreamingCSVWriter(backup_filename(output_file), append=append),
+    ]
+
+def scrape_category_pages(category_url, max_pages=None, output_file="produits_leclerc_soinsvisage.csv", num_workers=None, max_retries=2, queue_size=LINK_QUEUE_SIZE, lean_browsing=None, database_file=None, keep_results=False, frontier=None, network_capture=None, listing_api_file=None):
+    """Scrape toutes les pages d'une catégorie en pipeline
+
+    Un WebDriver dédié parcourt les pages de listing et alimente une file bornée,
+    pendant qu'un pool de WebDrivers consomme les liens et scrape les produits.
+    Avec database_file, les produits sont stockés dans SQLite et le CSV est
+    exporté depuis la base en fin de crawl.
+
+    Un journal de reprise (voir CrawlCheckpoint) est tenu à côté du fichier de sortie:
+    après un crash, relancer le même crawl saute les pages et produits terminés et
+    complète les fichiers existants. Le journal est supprimé en fin de crawl.
+
+    Passer le même URLFrontier à plusieurs crawls évite de rescraper un produit
+    présent dans plusieurs catégories.
+
+    Avec listing_api_file (voir learn_listing_request), les pages de listing sont
+    obtenues en rejouant la requête de recherche du site en HTTP, sans navigateur de
+    découverte; sinon, si la requête ne correspond pas à la catégorie ou si l'API
+    échoue dès la première page, le WebDriver de découverte navigue de page en page.
+    Si des pages de l'API restent en échec, le journal de reprise est conservé:
+    relancer le crawl ne télécharge que ces pages.
+
+    Les produits sont écrits au fil de l'eau puis oubliés: la mémoire ne dépend pas
+    de la taille du catalogue. Retourne les compteurs du crawl (voir CrawlResults),
+    avec la liste des produits sous "products" si keep_results est demandé.
+    """
+    results = CrawlResults(keep_results)
+    frontier = frontier if frontier is not None else URLFrontier()
+    queued_links = 0
+    num_workers = max(1, num_workers or DEFAULT_NUM_WORKERS)
+    link_queue = queue.Queue(maxsize=queue_size)
+    consumers = []
     
     # Réinitialiser le statut
     reset_status()
+    reset_wait_stats()
+    reset_lean_stats()
+    reset_capture_stats()
     scraping_status["in_progress"] = True
     scraping_status["start_time"] = time.time()
     
+    # Fichier principal et backup écrits par un thread dédié
+    writer = None
+    
+    def on_result(product_data):
+        if results.add(product_data):
+            writer.submit(product_data)
+        else:
+            logger.info(f"Produit déjà scrapé ignoré: {product_data['Lien']}")
+    
+    def worker_factory():
+        worker_driver = initialize_webdriver(lean_browsing, network_capture)
+        accept_cookies(worker_driver, category_url)
+        return worker_driver
+    
     driver = None
+    managers = []
+    checkpoint = CrawlCheckpoint(crawl_checkpoint_filename(output_file), category_url)
+    completed = False
+    failed_pages = []
     try:
-        # Initialiser le driver avec la fonction spécialisée
-        driver = initialize_webdriver()
+        # Reprise: les fichiers existants sont complétés au lieu d'être recréés
+        resuming = checkpoint.load()
+        writer = BackgroundWriter(create_sinks(output_file, database_file, append=resuming) + [checkpoint]).start()
         
-        # Accepter les cookies si nécessaire
-        try:
-            driver.get(category_url)
-            # Attendre et cliquer sur le bouton d'acceptation des cookies s'il existe
+        # Découverte par l'API de listing si une requête a été apprise pour cette catégorie
+        listing_request = load_listing_request(category_url, listing_api_file) if listing_api_file else None
+        
+        # Initialiser les workers du pool de scraping (recyclés par leur DriverManager)
+        for worker_idx in range(num_workers):
+            manager = DriverManager(worker_factory, name=f"WebDriver du worker {worker_idx + 1}")
             try:
-                WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-                ).click()
-                logger.info("Cookies acceptés")
-            except:
-                logger.info("Pas de bannière de cookies trouvée")
-        except Exception as e:
-            logger.warning(f"Erreur lors de l'accès à la page: {e}")
+                manager.get()
+                managers.append(manager)
+            except Exception as e:
+                logger.warning(f"Impossible d'initialiser le worker {worker_idx + 1}: {e}")
+        if not managers:
+            raise Exception("Aucun WebDriver de scraping n'a pu être initialisé")
+        logger.info(f"Pool de {len(managers)} WebDriver(s) de scraping prêt")
         
-        # Accéder à la page de la catégorie (à nouveau pour s'assurer que la page est chargée)
-        driver.get(category_url)
+        consumers = start_product_consumers(link_queue, managers, on_result, max_retries)
         
-        # Déterminer le nombre total de pages
-        total_pages = determine_total_pages(driver)
-        logger.info(f"Nombre total de pages détecté: {total_pages}")
+        if listing_request is not None:
+            crawler = ListingAPICrawler(listing_request)
+            try:
+                queued_links = produce_product_links_from_api(crawler, link_queue, max_pages, checkpoint, writer, frontier)
+                logger.info(f"Découverte par l'API terminée: {queued_links} liens mis en file, {frontier.duplicates} doublons écartés")
+                failed_pages = crawler.failed_pages
+            except Exception as e:
+                logger.warning(f"API de listing inutilisable ({e}), découverte par le navigateur")
+                listing_request = None
+            finally:
+                crawler.close()
         
-        if max_pages and max_pages < total_pages:
-            total_pages = max_pages
-            logger.info(f"Limitation au nombre de pages demandé: {max_pages}")
-            
-        # Compter le nombre total de produits estimé (première page)
-        product_links_first_page = extract_product_links(driver)
-        average_products_per_page = len(product_links_first_page)
-        scraping_status["total_products"] = average_products_per_page * total_pages
-        logger.info(f"Nombre estimé de produits: {scraping_status['total_products']} ({average_products_per_page} par page * {total_pages} pages)")
-        
-        # Scraper chaque page
-        for current_page in range(1, total_pages + 1):
-            logger.info(f"Scraping de la page {current_page}/{total_pages}")
+        if listing_request is None:
+            # Initialiser le driver de découverte avec la fonction spécialisée
+            driver = initialize_webdriver(lean_browsing, network_capture)
             
-            # Si ce n'est pas la première page, naviguer vers la page
-            if current_page > 1:
-                success = navigate_to_page(driver, category_url, current_page)
-                if not success:
-                    logger.error(f"Impossible d'accéder à la page {current_page}, passage à la suivante")
-                    continue
+            # Accepter les cookies si nécessaire
+            accept_cookies(driver, category_url)
             
-            # Extraire les liens des produits
-            product_links = extract_product_links(driver)
-            logger.info(f"Page {current_page}: {len(product_links)} produits trouvés")
-            
-            if not product_links:
-                logger.warning(f"Aucun produit trouvé sur la page {current_page}! Vérification du HTML...")
-                # Enregistrer une partie du HTML pour diagnostic
-                html_snippet = driver.page_source[:500] + "..." + driver.page_source[-500:]
-                logger.warning(f"Extrait du HTML: {html_snippet}")
-                continue
-            
-            # Mettre à jour le nombre total estimé de produits
-            if current_page == 1:
-                average_products_per_page = len(product_links)
-                scraping_status["total_products"] = average_products_per_page * total_pages
-                logger.info(f"Mise à jour du nombre estimé de produits: {scraping_status['total_products']}")
-            
-            # Scraper chaque produit de la page
-            for link_idx, link in enumerate(product_links):
-                try:
-                    logger.info(f"Scraping du produit {link_idx+1}/{len(product_links)} de la page {current_page}")
-                    product_data = scrap_leclerc_product(link, driver)
-                    if product_data:
-                        results.append(product_data)
-                        logger.info(f"Produit scrapé avec succès: {product_data['Nom du produit']}")
-                        
-                        # Exporter les résultats périodiquement
-                        if len(results) % 5 == 0:  # Exporter tous les 5 produits
-                            export_to_csv(results, filename=output_file)
-                            # Backup avec la méthode simple
-                            simple_export_to_csv(results, filename="backup_" + output_file)
-                    else:
-                        logger.warning(f"Échec du scraping pour le produit: {link}")
-                except Exception as e:
-                    logger.error(f"Erreur lors du scraping du produit {link}: {str(e)}")
-            
-            # Exporter les résultats de cette page
-            if results:
-                logger.info(f"Export après la page {current_page} avec {len(results)} produits")
-                export_to_csv(results, filename=output_file)
-                
-            # Pause entre les pages pour éviter d'être détecté
-            if current_page < total_pages:
-                pause_time = 2 + 3 * random.random()  # Entre 2 et 5 secondes
-                logger.info(f"Pause de {pause_time:.2f} secondes avant la page suivante")
-                time.sleep(pause_time)
+            # Accéder à la page de la catégorie (à nouveau pour s'assurer que la page est chargée)
+            driver.get(category_url)
+        
+            # Déterminer le nombre total de pages
+            total_pages = determine_total_pages(driver)
+            logger.info(f"Nombre total de pages détecté: {total_pages}")
+        
+            if max_pages and max_pages < total_pages:
+                total_pages = max_pages
+                logger.info(f"Limitation au nombre de pages demandé: {max_pages}")
+        
+            # Découvrir les produits pendant que les workers scrapent
+            queued_links += produce_product_links(driver, category_url, total_pages, link_queue, checkpoint, writer, frontier)
+            logger.info(f"Découverte terminée: {queued_links} liens mis en file, {frontier.duplicates} doublons écartés")
+        if failed_pages:
+            # Les pages en échec ne sont pas journalisées: le journal est gardé pour les relancer
+            logger.error(f"Pages de listing en échec: {failed_pages}, relancer le crawl pour les reprendre")
+        else:
+            completed = True
             
     except Exception as e:
         logger.error(f"Erreur lors du scraping de la catégorie: {str(e)}")
         logger.error(traceback.format_exc())
     
     finally:
-        # Exporter une dernière fois pour s'assurer que toutes les données sont sauvegardées
-        if results:
-            logger.info(f"Export final avec {len(results)} produits")
-            export_to_csv(results, filename=output_file)
-            # Backup avec la méthode simple
-            simple_export_to_csv(results, filename="backup_" + output_file)
+        # Laisser les workers terminer les liens déjà en file
+        stop_product_consumers(link_queue, consumers)
+        
+        # Vider la file d'écriture pour s'assurer que toutes les données sont sauvegardées
+        logger.info(f"Export final avec {results.scraped} produits ({results.duplicates} doublons ignorés)")
+        if writer:
+            writer.close()
+            if database_file:
+                export_database_to_csv(database_file, output_file)
+            if completed:
+                checkpoint.remove()
+        
+        # Résumé des durées d'attente pour ajuster les plafonds
+        log_wait_stats()
         
         # Mettre à jour le statut final
         scraping_status["in_progress"] = False
+        for manager in managers:
+            manager.close()
         if driver:
             driver.quit()
     
-    return results
+    return results.summary(queued_links)
 
 def export_to_csv(data, filename="produits_leclerc_soinsvisage.csv"):
     """Exporte les données dans un fichier CSV avec logs améliorés"""
@@ -702,62 +1077,164 @@ def simple_export_to_csv(data, filename="produits_leclerc_simple.csv"):
         print(f"❌ Erreur lors de l'export: {str(e)}")
         traceback.print_exc()
 
-def batch_scrape_products(urls, batch_size=10, output_file="produits_leclerc.csv", start_index=0):
+def batch_scrape_products(urls, batch_size=10, output_file="produits_leclerc.csv", start_index=0, driver_manager=None, database_file=None, keep_results=False, append=None):
     """
     Scrape les produits par lots avec sauvegarde intermédiaire
-    """
-    all_results = []
     
-    # Chargement des données déjà scrapées si le fichier existe
-    if os.path.exists(output_file) and start_index > 0:
-        with open(output_file, mode="r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            all_results = list(reader)
+    Un seul WebDriver est réutilisé pour toutes les URLs et recyclé par le DriverManager.
+    Avec database_file, les produits sont stockés dans SQLite et le CSV en est exporté.
+    Seul le lot courant est en mémoire; retourne les compteurs comme scrape_category_pages.
+    append complète les fichiers existants (par défaut dès que start_index > 0).
+    """
+    results = CrawlResults(keep_results)
     
     # Boucle de scraping par lots
     total_urls = len(urls)
+    manager = driver_manager or DriverManager(initialize_webdriver)
     
-    for i in range(start_index, total_urls, batch_size):
-        print(f"Traitement du lot {i//batch_size + 1}/{(total_urls + batch_size - 1)//batch_size}...")
-        
-        # Prendre le prochain lot d'URLs
-        batch_urls = urls[i:i+batch_size]
-        batch_results = []
-        
-        # Scraper chaque URL du lot
-        for url in batch_urls:
-            try:
-                driver = initialize_webdriver()
-                try:
-                    product_data = scrap_leclerc_product(url, driver)
-                    batch_results.append(product_data)
-                    
-                    # Pause aléatoire entre chaque requête
-                    time.sleep(1 + 2 * random.random())
-                finally:
-                    driver.quit()
-            except Exception as e:
-                logger.error(f"Erreur lors du traitement de l'URL {url}: {str(e)}")
-        
-        # Ajouter les résultats du lot aux résultats globaux
-        all_results.extend(batch_results)
-        
-        # Sauvegarder les résultats intermédiaires
-        export_to_csv(all_results, output_file)
-        # Backup avec la méthode simple
-        simple_export_to_csv(all_results, "backup_" + output_file)
+    # En reprise, les nouveaux produits sont ajoutés à la suite du fichier existant
+    if append is None:
+        append = start_index > 0
+    writer = BackgroundWriter(create_sinks(output_file, database_file, append=append)).start()
+    
+    try:
+        for i in range(start_index, total_urls, batch_size):
+            print(f"Traitement du lot {i//batch_size + 1}/{(total_urls + batch_size - 1)//batch_size}...")
+            
+            # Scraper le prochain lot d'URLs avec le WebDriver réutilisé
+            batch_urls = urls[i:i+batch_size]
+            batch_results = scrape_urls_with_manager(batch_urls, manager)
+            
+            # Ajouter les résultats du lot aux fichiers (sans doublons) et créer un checkpoint
+            for product_data in batch_results:
+                if results.add(product_data):
+                    writer.submit(product_data)
+            writer.checkpoint()
+            
+            print(f"Progression: {min(i + batch_size, total_urls)}/{total_urls} produits traités")
+    finally:
+        writer.close()
+        if database_file:
+            export_database_to_csv(database_file, output_file)
+        # Ne fermer que le WebDriver créé ici
+        if driver_manager is None:
+            manager.close()
+    
+    return results.summary(max(0, total_urls - start_index))
+
+def http_scrape_products(urls, output_file="produits_leclerc.csv", database_file=None, max_workers=None, base_url=None, browser_fallback=True, keep_results=False):
+    """
+    Scrape les produits en HTTP, sans navigateur, avec secours Selenium
+    
+    Les pages sont téléchargées en parallèle par un HTTPFetchEngine; seules les pages
+    qui ne passent pas la validation sont rechargées dans un WebDriver (créé à la
+    première page invalide, partagé sous verrou). urls peut être un générateur (liens
+    découverts au fil de l'eau). Retourne les compteurs du crawl.
+    """
+    results = CrawlResults(keep_results)
+    manager = DriverManager(initialize_webdriver, name="WebDriver de secours") if browser_fallback else None
+    fallback_lock = threading.Lock()
+    attempted = 0
+    
+    def fallback(url):
+        with fallback_lock:
+            return scrape_product_with_retry(url, manager, max_retries=0)
+    
+    engine = HTTPFetchEngine(base_url, fallback=fallback if manager else None, max_workers=max_workers)
+    writer = BackgroundWriter(create_sinks(output_file, database_file)).start()
+    try:
+        for product_data in engine.scrape_many(urls):
+            attempted += 1
+            if product_data is None:
+                continue
+            if results.add(product_data):
+                writer.submit(product_data)
+            # Le secours navigateur compte aussi ses pages: le total est recalculé ici
+            with status_lock:
+                scraping_status["processed_products"] = results.scraped + results.duplicates
+                scraping_status["last_product"] = product_data.name
+    finally:
+        writer.close()
+        if database_file:
+            export_database_to_csv(database_file, output_file)
+        engine.close()
+        if manager:
+            manager.close()
+    
+    return results.summary(attempted)
+
+def iter_http_listing_links(engine, category_url, first_links, max_pages=None, frontier=None):
+    """Liens produits nouveaux des pages de listing téléchargées en HTTP, page après page
+
+    first_links est le résultat de la première page, déjà téléchargée. Le parcours
+    s'arrête à max_pages, sur une page vide ou en échec, ou sur une page qui répète
+    la première (paramètre de page ignoré par le site).
+    """
+    frontier = frontier if frontier is not None else URLFrontier()
+    page, links = 1, first_links
+    while True:
+        for link in links:
+            link = canonical_product_url(link)
+            if frontier.add(link):
+                # Le total connu grandit avec la découverte
+                scraping_status["total_products"] += 1
+                yield link
+        logger.info(f"Page {page} découverte en HTTP ({len(links)} liens)")
+        page += 1
+        if max_pages and page > max_pages:
+            return
+        try:
+            links = engine.fetch_listing_links(category_url, page)
+        except Exception as e:
+            logger.error(f"Échec de la page {page} du listing en HTTP: {e}")
+            return
+        if not links or links == first_links:
+            logger.info(f"Fin du listing en HTTP à la page {page}")
+            return
+
+def http_scrape_category(category_url, max_pages=None, output_file="produits_leclerc_soinsvisage.csv", database_file=None, max_workers=None, base_url=None, browser_fallback=True, keep_results=False, frontier=None):
+    """Scrape une catégorie en HTTP, listing compris, avec secours Selenium
+
+    Les pages de listing (?page=N) sont téléchargées l'une après l'autre et leurs liens
+    passent directement au scraping HTTP des fiches (voir http_scrape_products).
+    Si la première page de listing n'est pas exploitable en HTTP (erreur ou aucun
+    lien), la catégorie est confiée à scrape_category_pages lorsque browser_fallback
+    est demandé. base_url redirige toutes les requêtes HTTP vers un serveur local.
+    """
+    frontier = frontier if frontier is not None else URLFrontier()
+    listing_engine = HTTPFetchEngine(base_url)
+    try:
+        try:
+            first_links = listing_engine.fetch_listing_links(category_url, 1)
+        except Exception as e:
+            logger.warning(f"Listing inaccessible en HTTP: {e}")
+            first_links = []
         
-        print(f"Progression: {min(i + batch_size, total_urls)}/{total_urls} produits traités")
+        if not first_links:
+            if not browser_fallback:
+                raise Exception(f"Aucun lien produit trouvé en HTTP sur {category_url}")
+            logger.warning("Aucun lien produit en HTTP, découverte et scraping par le navigateur")
+            return scrape_category_pages(
+                category_url, max_pages, output_file=output_file, database_file=database_file,
+                keep_results=keep_results, frontier=frontier
+            )
         
-        # Pause entre les lots pour éviter d'être bloqué
-        if i + batch_size < total_urls:
-            pause_time = 5 + 5 * random.random()
-            print(f"Pause de {pause_time:.1f} secondes avant le prochain lot...")
-            time.sleep(pause_time)
-    
-    return all_results
+        reset_status()
+        scraping_status["in_progress"] = True
+        scraping_status["start_time"] = time.time()
+        try:
+            links = iter_http_listing_links(listing_engine, category_url, first_links, max_pages, frontier)
+            summary = http_scrape_products(
+                links, output_file, database_file, max_workers, base_url, browser_fallback, keep_results
+            )
+        finally:
+            scraping_status["in_progress"] = False
+        logger.info(f"Catégorie scrapée en HTTP: {summary['scraped']} produits, {frontier.duplicates} doublons écartés")
+        return summary
+    finally:
+        listing_engine.close()
 
-def resume_scraping(urls_file="product_urls.json", output_file="produits_leclerc.csv", batch_size=10):
+def resume_scraping(urls_file="product_urls.json", output_file="produits_leclerc.csv", batch_size=10, driver_manager=None, database_file=None):
     """
     Reprend le scraping là où il s'est arrêté
     """
@@ -766,20 +1243,29 @@ def resume_scraping(urls_file="product_urls.json", output_file="produits_leclerc
     
     if not urls:
         print("Aucune URL trouvée. Veuillez d'abord exécuter get_all_parapharma_product_urls().")
-        return []
+        return CrawlResults().summary()
     
-    # Vérifier s'il y a des résultats précédents
-    start_index = 0
-    if os.path.exists(output_file):
-        with open(output_file, mode="r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            previous_results = list(reader)
-            start_index = len(previous_results)
-            
-        print(f"Reprise du scraping à partir de l'index {start_index}/{len(urls)}")
+    # Avec la base SQLite, ignorer les URLs déjà en base (une recherche indexée par URL)
+    if database_file:
+        store = SQLiteStore(database_file).open()
+        try:
+            remaining_urls = [url for url in urls if not store.has_url(url)]
+        finally:
+            store.close()
+        print(f"Reprise du scraping: {len(urls) - len(remaining_urls)}/{len(urls)} produits déjà en base")
+        return batch_scrape_products(remaining_urls, batch_size, output_file, 0, driver_manager, database_file)
+    
+    # Ignorer les URLs déjà présentes dans le CSV (quel que soit leur ordre ou les échecs)
+    output_path = resolve_output_path(output_file)
+    if not os.path.exists(output_path):
+        return batch_scrape_products(urls, batch_size, output_file, 0, driver_manager, database_file)
+    with open(output_path, mode="r", newline="", encoding="utf-8") as f:
+        done_urls = {row.get("Lien") for row in csv.DictReader(f)}
+    remaining_urls = [url for url in urls if url not in done_urls]
+    print(f"Reprise du scraping: {len(urls) - len(remaining_urls)}/{len(urls)} produits déjà scrapés")
     
-    # Continuer le scraping
-    return batch_scrape_products(urls, batch_size, output_file, start_index)
+    # Continuer le scraping à la suite du fichier existant
+    return batch_scrape_products(remaining_urls, batch_size, output_file, 0, driver_manager, database_file, append=True)
 
 # Fonction pour récupérer le statut actuel du scraping
 def get_status():
@@ -0,0 +1,464 @@
+"""
+Écriture incrémentale des résultats de scraping
+
+Les produits sont ajoutés en fin de fichier au fur et à mesure, avec un en-tête
+stable, au lieu de réécrire tout le CSV à chaque sauvegarde. Un point de reprise
+(checkpoint) écrit de façon atomique mémorise la dernière position sûre du fichier,
+ce qui permet d'éliminer une ligne à moitié écrite après un crash.
+"""
+import io
+import os
+import csv
+import json
+import queue
+import sqlite3
+import logging
+import threading
+
+from product import as_product
+
+logger = logging.getLogger(__name__)
+
+# Colonnes du CSV, dans l'ordre historique (triées par nom)
+CSV_FIELDNAMES = ["Catégorie", "Date", "EAN", "Lien", "Marque", "Nom du produit", "Prix"]
+
+# Lignes écrites entre deux vidages du tampon (flush) et entre deux checkpoints (fsync)
+FLUSH_EVERY = 10
+CHECKPOINT_EVERY = 50
+
+# Base SQLite optionnelle et taille des lots d'upserts
+DATABASE_FILE = "produits_leclerc.db"
+UPSERT_BATCH_SIZE = 100
+
+# Correspondance entre les colonnes du CSV et celles de la table products
+CSV_TO_COLUMN = {
+    "Lien": "url",
+    "Date": "date",
+    "Nom du produit": "name",
+    "Marque": "brand",
+    "Catégorie": "category",
+    "EAN": "ean",
+    "Prix": "price",
+}
+
+# Nombre maximal de produits en attente d'écriture dans le writer d'arrière-plan
+WRITER_QUEUE_SIZE = 1000
+
+# Messages de contrôle du writer d'arrière-plan
+_CHECKPOINT = object()
+_STOP = object()
+
+def resolve_output_path(filename):
+    """Chemin absolu du fichier de sortie (relatif au répertoire du projet)"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, filename)
+
+def backup_filename(filename):
+    """Nom du fichier de backup, placé à côté du fichier principal"""
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, "backup_" + name)
+
+def write_json_atomic(path, data):
+    """Écrit un fichier JSON de façon atomique (fichier temporaire puis remplacement)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class StreamingCSVWriter:
+    """Ajoute les produits à un CSV ligne par ligne avec checkpoints atomiques
+
+    append=False recommence un fichier neuf, append=True complète le fichier existant
+    (après avoir retiré une éventuelle fin de fichier incomplète).
+    """
+
+    def __init__(self, filename, fieldnames=None, append=False,
+                 flush_every=FLUSH_EVERY, checkpoint_every=CHECKPOINT_EVERY):
+        self.path = resolve_output_path(filename)
+        self.checkpoint_path = self.path + ".checkpoint"
+        self.fieldnames = list(fieldnames or CSV_FIELDNAMES)
+        self.append = append
+        self.flush_every = flush_every
+        self.checkpoint_every = checkpoint_every
+        self.file = None
+        self.writer = None
+        self.rows = 0
+        self.pending_flush = 0
+        self.pending_checkpoint = 0
+
+    def open(self):
+        """Ouvre le fichier et écrit l'en-tête si nécessaire"""
+        if self.append and os.path.isfile(self.path) and os.path.getsize(self.path) > 0:
+            self._recover()
+            self.rows = self._prepare_existing_file()
+            self.file = open(self.path, mode="a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+        else:
+            self.file = open(self.path, mode="w", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+            self.writer.writeheader()
+            self.rows = 0
+        self.checkpoint()
+        logger.info(f"Écriture incrémentale vers {self.path} ({self.rows} lignes existantes)")
+        return self
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_complete_tail(self, tail):
+        """Vérifie que les octets écrits après le checkpoint forment des lignes complètes"""
+        if not tail.endswith(b"\n"):
+            return False
+        try:
+            rows = list(csv.reader(io.StringIO(tail.decode("utf-8"), newline="")))
+        except (UnicodeDecodeError, csv.Error):
+            return False
+        return all(len(row) == len(self.fieldnames) for row in rows)
+
+    def _recover(self):
+        """Tronque le fichier au dernier checkpoint si sa fin est incomplète (crash)"""
+        checkpoint = self._load_checkpoint()
+        if not checkpoint:
+            return
+        offset = checkpoint.get("offset", 0)
+        size = os.path.getsize(self.path)
+        if size <= offset:
+            return
+        with open(self.path, mode="rb+") as f:
+            f.seek(offset)
+            if not self._is_complete_tail(f.read()):
+                logger.warning(f"Fin de fichier incomplète dans {self.path}, retour au checkpoint ({offset} octets)")
+                f.truncate(offset)
+
+    def _prepare_existing_file(self):
+        """Compte les lignes existantes et aligne l'en-tête si les colonnes ont changé"""
+        with open(self.path, mode="r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames == self.fieldnames:
+                return sum(1 for _ in reader)
+            existing_rows = list(reader)
+
+        # Réécriture unique avec le nouvel en-tête, remplacée de façon atomique
+        logger.info(f"Mise à jour de l'en-tête de {self.path}")
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(existing_rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return len(existing_rows)
+
+    def write(self, record):
+        """Ajoute un produit en fin de fichier"""
+        self.writer.writerow(record)
+        self.rows += 1
+        self.pending_flush += 1
+        self.pending_checkpoint += 1
+        if self.pending_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+        elif self.pending_flush >= self.flush_every:
+            self.file.flush()
+            self.pending_flush = 0
+
+    def write_many(self, records):
+        """Ajoute plusieurs produits en fin de fichier"""
+        for record in records:
+            self.write(record)
+
+    def checkpoint(self):
+        """Force l'écriture sur disque et mémorise la position sûre du fichier"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        write_json_atomic(self.checkpoint_path, {"offset": os.fstat(self.file.fileno()).st_size, "rows": self.rows})
+        self.pending_flush = 0
+        self.pending_checkpoint = 0
+
+    def close(self):
+        """Écrit le dernier checkpoint et ferme le fichier"""
+        if self.file is None:
+            return
+        try:
+            self.checkpoint()
+        finally:
+            self.file.close()
+            self.file = None
+        logger.info(f"✅ Fichier CSV à jour: {self.path}, {self.rows} lignes")
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+class BackgroundWriter:
+    """Écrit les produits dans un ou plusieurs sinks depuis un thread dédié
+
+    Un sink expose open(), write(record), checkpoint() et close(), comme
+    StreamingCSVWriter. Les produits passent par une file bornée: le scraping ne
+    bloque que si l'écriture a plus de WRITER_QUEUE_SIZE produits de retard.
+    close() vide la file et ferme tous les sinks.
+    """
+
+    def __init__(self, sinks, max_buffer=WRITER_QUEUE_SIZE):
+        self.sinks = list(sinks)
+        self.queue = queue.Queue(maxsize=max_buffer)
+        self.thread = None
+        self.written = 0
+        self.errors = 0
+
+    def start(self):
+        """Ouvre les sinks et démarre le thread d'écriture"""
+        opened = []
+        try:
+            for sink in self.sinks:
+                sink.open()
+                opened.append(sink)
+        except Exception:
+            for sink in opened:
+                sink.close()
+            raise
+        self.thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def submit(self, record):
+        """Transmet un produit au thread d'écriture"""
+        self.queue.put(record)
+
+    def checkpoint(self):
+        """Demande un checkpoint de tous les sinks après les produits déjà transmis"""
+        self.queue.put(_CHECKPOINT)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            for sink in self.sinks:
+                try:
+                    if item is _CHECKPOINT:
+                        sink.checkpoint()
+                    else:
+                        sink.write(item)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Erreur d'écriture dans {getattr(sink, 'path', sink)}: {e}")
+            if item is not _CHECKPOINT:
+                self.written += 1
+
+    def close(self):
+        """Écrit tous les produits en attente puis ferme les sinks"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.error(f"Erreur à la fermeture de {getattr(sink, 'path', sink)}: {e}")
+        logger.info(f"Writer d'arrière-plan arrêté: {self.written} produits écrits, {self.errors} erreurs")
+
+class CrawlResults:
+    """Suivi d'un crawl en streaming: compteurs et index de dédoublonnage
+
+    Les produits partent vers les sinks et ne sont pas gardés en mémoire (sauf avec
+    keep_results). L'index ne retient qu'une clé par produit: l'EAN entier s'il est
+    connu, sinon l'URL.
+    """
+
+    def __init__(self, keep_results=False):
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.scraped = 0
+        self.duplicates = 0
+        self.products = [] if keep_results else None
+
+    def add(self, product_data):
+        """Enregistre un produit scrapé, retourne False si c'est un doublon"""
+        product = as_product(product_data)
+        key = product.ean if product.ean is not None else product.url
+        with self.lock:
+            if key in self.seen:
+                self.duplicates += 1
+                return False
+            self.seen.add(key)
+            self.scraped += 1
+            if self.products is not None:
+                self.products.append(product)
+        return True
+
+    def summary(self, attempted=None):
+        """Compteurs du crawl (et produits si conservés)"""
+        with self.lock:
+            summary = {"scraped": self.scraped, "duplicates": self.duplicates}
+            if attempted is not None:
+                summary["failed"] = max(0, attempted - self.scraped - self.duplicates)
+            if self.products is not None:
+                summary["products"] = list(self.products)
+        return summary
+
+class SQLiteStore:
+    """Stockage des produits dans SQLite, une ligne par produit (clé EAN, sinon URL)
+
+    Les écritures sont regroupées en upserts par lots, en mode WAL. Utilisable
+    comme sink du BackgroundWriter; le CSV devient un export de la base.
+    """
+
+    def __init__(self, filename=DATABASE_FILE, batch_size=UPSERT_BATCH_SIZE):
+        self.path = resolve_output_path(filename)
+        self.batch_size = batch_size
+        self.connection = None
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def open(self):
+        """Ouvre la base et crée la table et les index si nécessaire"""
+        # Le BackgroundWriter écrit depuis son propre thread
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                key TEXT PRIMARY KEY,
+                ean TEXT,
+                url TEXT NOT NULL,
+                name TEXT,
+                brand TEXT,
+                category TEXT,
+                price TEXT,
+                date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_products_url ON products(url);
+            CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand);
+            CREATE INDEX IF NOT EXISTS idx_products_date ON products(date);
+        """)
+        self.connection.commit()
+        logger.info(f"Base SQLite ouverte: {self.path}")
+        return self
+
+    @staticmethod
+    def product_key(record):
+        """Clé du produit: l'EAN s'il est connu, sinon l'URL"""
+        return record.get("EAN") or record.get("Lien")
+
+    def write(self, record):
+        """Ajoute un produit au prochain lot d'upserts"""
+        with self.lock:
+            self.pending.append((
+                self.product_key(record),
+                record.get("EAN", ""),
+                record.get("Lien", ""),
+                record.get("Nom du produit", ""),
+                record.get("Marque", ""),
+                record.get("Catégorie", ""),
+                record.get("Prix", ""),
+                record.get("Date", ""),
+            ))
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def _resolve_key(self, key, ean, url):
+        """Clé sous laquelle écrire le produit, sans dupliquer la ligne de son URL
+
+        Un produit d'abord stocké sans EAN (clé = URL) passe sous sa clé EAN; un
+        produit revu sans EAN met à jour la ligne déjà stockée pour son URL.
+        """
+        if not ean:
+            row = self.connection.execute("SELECT key FROM products WHERE url = ? LIMIT 1", (url,)).fetchone()
+            return row[0] if row else key
+        # Si la clé EAN existe déjà, la ligne sous l'URL est simplement supprimée
+        self.connection.execute("UPDATE OR IGNORE products SET key = ? WHERE key = ?", (key, url))
+        self.connection.execute("DELETE FROM products WHERE key = ?", (url,))
+        return key
+
+    def _flush(self):
+        """Écrit le lot en attente dans une transaction (verrou déjà pris)"""
+        if not self.pending:
+            return
+        with self.connection:
+            for row in self.pending:
+                self.connection.execute("""
+                    INSERT INTO products (key, ean, url, name, brand, category, price, date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        ean = COALESCE(NULLIF(excluded.ean, ''), ean),
+                        url = excluded.url,
+                        name = excluded.name,
+                        brand = excluded.brand,
+                        category = excluded.category,
+                        price = excluded.price,
+                        date = excluded.date
+                """, (self._resolve_key(*row[:3]),) + row[1:])
+        self.pending = []
+
+    def checkpoint(self):
+        """Écrit le lot en attente"""
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """Écrit le lot en attente et ferme la base"""
+        if self.connection is None:
+            return
+        with self.lock:
+            self._flush()
+            self.connection.close()
+            self.connection = None
+
+    def has_url(self, url):
+        """Indique si le produit de cette URL est déjà en base (recherche indexée)"""
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM products WHERE url = ? LIMIT 1", (url,)).fetchone()
+        return row is not None
+
+    def get_by_ean(self, ean):
+        """Retourne le produit correspondant à l'EAN, au format du CSV"""
+        columns = list(CSV_TO_COLUMN.values())
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(columns)} FROM products WHERE key = ?", (ean,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(CSV_TO_COLUMN.keys(), row))
+
+    def iter_products(self, batch_size=1000):
+        """Parcourt tous les produits au format du CSV, par lots pour limiter la mémoire"""
+        columns = list(CSV_TO_COLUMN.values())
+        with self.lock:
+            self._flush()
+            cursor = self.connection.execute(f"SELECT {', '.join(columns)} FROM products ORDER BY rowid")
+            rows = cursor.fetchmany(batch_size)
+        while rows:
+            for row in rows:
+                yield dict(zip(CSV_TO_COLUMN.keys(), row))
+            with self.lock:
+                rows = cursor.fetchmany(batch_size)
+
+    def export_csv(self, filename):
+        """Exporte tous les produits de la base dans un CSV"""
+        with StreamingCSVWriter(filename) as writer:
+            for record in self.iter_products():
+                writer.write(record)
+        return writer.path
+
+def export_database_to_csv(database_file, filename):
+    """Exporte la base SQLite dans un CSV"""
+    store = SQLiteStore(database_file).open()
+    try:
+        path = store.export_csv(filename)
+        logger.info(f"✅ Base {store.path} exportée vers {path}")
+        return path
+    finally:
+        store.close()
@@ -0,0 +1,228 @@
+"""
+Données structurées des fiches produits: JSON-LD et état de transfert Angular
+
+Les pages e.leclerc sont rendues côté serveur par Angular. Les données du produit y
+sont sérialisées sous forme de JSON-LD (schema.org Product et BreadcrumbList) et dans
+l'état de transfert (<script id="ng-state"> ou "serverApp-state"). Ces blocs sont
+décodés en priorité; les heuristiques sur le DOM ne servent que pour les champs absents.
+
+Les fonctions reçoivent les textes des balises <script>, récupérés par le navigateur
+ou par lxml, et retournent les champs au format des colonnes du CSV.
+"""
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Clés recherchées dans l'état de transfert, par ordre de priorité
+STATE_EAN_KEYS = ("ean", "ean13", "gtin13", "gtin", "barcode")
+STATE_NAME_KEYS = ("label", "name", "title")
+STATE_PRICE_KEYS = ("price", "priceWithAllTaxes", "priceWithTaxes", "sellingPrice")
+STATE_BRAND_KEYS = ("brand", "brandName", "brandLabel")
+STATE_BREADCRUMB_KEYS = ("breadcrumb", "breadcrumbs", "categories", "categoryPath")
+
+# Nombre maximal de nœuds parcourus dans l'état de transfert
+STATE_MAX_NODES = 50000
+
+# Échappements utilisés par le TransferState d'Angular avant la version 16
+_ANGULAR_ESCAPES = [("&q;", '"'), ("&s;", "'"), ("&l;", "<"), ("&g;", ">"), ("&a;", "&")]
+
+_GTIN_PATTERN = re.compile(r"^\d{8,14}$")
+
+def decode_transfer_state(text):
+    """Décode le JSON de l'état de transfert Angular (échappé ou non)"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    if "&q;" in text:
+        for escaped, char in _ANGULAR_ESCAPES:
+            text = text.replace(escaped, char)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def format_price_text(value):
+    """Formate un prix en euros (nombre ou texte "14.99") comme sur le site ("14,99 €")"""
+    if isinstance(value, dict):
+        value = next((value[key] for key in ("value", "amount", "price") if key in value), None)
+    if value is None or isinstance(value, bool):
+        return ""
+    try:
+        euros = float(str(value).replace(",", ".").replace("€", "").strip())
+    except ValueError:
+        return ""
+    return f"{euros:.2f}".replace(".", ",") + " €"
+
+def _name_of(value):
+    """Nom d'une valeur schema.org (texte ou objet avec name/label)"""
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("label") or ""
+    return value.strip() if isinstance(value, str) else ""
+
+def is_valid_ean13(digits):
+    """Vérifie la clé de contrôle d'un EAN-13"""
+    if len(digits) != 13 or not digits.isdigit():
+        return False
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return (10 - total % 10) % 10 == int(digits[12])
+
+def _looks_like_gtin(value):
+    return bool(_GTIN_PATTERN.match(str(value or "").strip()))
+
+def _gtin_of(value):
+    """GTIN ramené en EAN-13 (GTIN-14 à zéro initial, UPC-A), "" s'il n'est pas valide
+
+    Un GTIN non convertible (GTIN-8, GTIN-14 d'emballage) laisse la main à pick_ean.
+    """
+    value = str(value or "").strip()
+    if not _GTIN_PATTERN.match(value):
+        return ""
+    if len(value) == 14 and value.startswith("0"):
+        value = value[1:]
+    elif len(value) == 12:
+        value = "0" + value
+    return value if is_valid_ean13(value) else ""
+
+def _types_of(node):
+    node_type = node.get("@type", [])
+    return node_type if isinstance(node_type, list) else [node_type]
+
+def _iter_ld_nodes(data):
+    """Parcourt les objets d'un bloc JSON-LD (listes et @graph compris)"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_ld_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _iter_ld_nodes(data["@graph"])
+
+def _breadcrumb_category(names, product_name=""):
+    """Catégorie la plus précise d'un fil d'Ariane (hors produit et page d'accueil)"""
+    names = [name for name in names if name and name != product_name and name.lower() != "accueil"]
+    return names[-1] if names else ""
+
+def _position_of(item):
+    """Position d'un élément de fil d'Ariane (entier ou texte), 0 si illisible"""
+    try:
+        return int(item.get("position", 0))
+    except (TypeError, ValueError):
+        return 0
+
+def _ld_product_fields(node):
+    """Champs d'un objet schema.org Product"""
+    offers = node.get("offers")
+    if isinstance(offers, list):
+        offers = next((offer for offer in offers if isinstance(offer, dict)), {})
+    if not isinstance(offers, dict):
+        offers = {}
+    return {
+        "Nom du produit": _name_of(node.get("name")),
+        "Marque": _name_of(node.get("brand")),
+        "EAN": next(
+            (_gtin_of(node.get(key)) for key in ("gtin13", "gtin", "gtin14", "gtin12", "gtin8") if _gtin_of(node.get(key))),
+            ""
+        ),
+        "Prix": format_price_text(offers.get("price", offers.get("lowPrice"))),
+    }
+
+def _ld_breadcrumb(node):
+    """Noms d'un objet schema.org BreadcrumbList, dans l'ordre des positions"""
+    items = node.get("itemListElement")
+    items = [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+    return [_name_of(item.get("item")) or _name_of(item) for item in sorted(items, key=_position_of)]
+
+def _parse_ld_block(data):
+    """Champs du premier produit et fil d'Ariane d'un bloc JSON-LD décodé"""
+    product = None
+    breadcrumb = []
+    for node in _iter_ld_nodes(data):
+        types = _types_of(node)
+        if "Product" in types and product is None:
+            product = _ld_product_fields(node)
+        elif "BreadcrumbList" in types and not breadcrumb:
+            breadcrumb = _ld_breadcrumb(node)
+    return product, breadcrumb
+
+def parse_ld_json(texts):
+    """Champs du produit trouvés dans les blocs JSON-LD
+
+    Un bloc illisible ou de forme inattendue est ignoré: les autres blocs et les
+    heuristiques sur le DOM prennent le relais.
+    """
+    fields = {}
+    breadcrumb = []
+    for text in texts or []:
+        try:
+            product, block_breadcrumb = _parse_ld_block(json.loads(text))
+        except (TypeError, ValueError, AttributeError) as e:
+            logger.debug(f"Bloc JSON-LD ignoré: {e}")
+            continue
+        if product is not None and "Nom du produit" not in fields:
+            fields.update(product)
+        if block_breadcrumb and not breadcrumb:
+            breadcrumb = block_breadcrumb
+    if breadcrumb:
+        fields["Catégorie"] = _breadcrumb_category(breadcrumb, fields.get("Nom du produit", ""))
+    return {column: value for column, value in fields.items() if value}
+
+def _iter_state_products(data):
+    """Objets de l'état de transfert qui ressemblent à un produit (EAN et nom), dans l'ordre"""
+    stack = [data]
+    visited = 0
+    while stack and visited < STATE_MAX_NODES:
+        node = stack.pop()
+        visited += 1
+        if isinstance(node, dict):
+            if any(_looks_like_gtin(node.get(key)) for key in STATE_EAN_KEYS) and any(
+                isinstance(node.get(key), str) for key in STATE_NAME_KEYS
+            ):
+                yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _state_product_fields(product):
+    fields = {
+        "Nom du produit": next((product[key].strip() for key in STATE_NAME_KEYS if isinstance(product.get(key), str)), ""),
+        "EAN": next((_gtin_of(product.get(key)) for key in STATE_EAN_KEYS if _gtin_of(product.get(key))), ""),
+        "Prix": next((format_price_text(product[key]) for key in STATE_PRICE_KEYS if key in product), ""),
+        "Marque": next((_name_of(product[key]) for key in STATE_BRAND_KEYS if key in product), ""),
+    }
+    breadcrumb = next((product[key] for key in STATE_BREADCRUMB_KEYS if isinstance(product.get(key), list)), [])
+    fields["Catégorie"] = _breadcrumb_category([_name_of(item) for item in breadcrumb], fields["Nom du produit"])
+    return {column: value for column, value in fields.items() if value}
+
+def extract_state_fields(data):
+    """Champs du premier produit trouvé dans des données JSON déjà décodées
+
+    Sert pour l'état de transfert comme pour les réponses JSON des API du site.
+    """
+    product = next(_iter_state_products(data), None)
+    if product is None:
+        return {}
+    return _state_product_fields(product)
+
+def extract_state_products(data):
+    """Champs de chacun des produits trouvés dans des données JSON déjà décodées
+
+    Une réponse d'API peut contenir plusieurs produits (recommandations, produits
+    associés): l'appelant choisit celui qui correspond à la page.
+    """
+    return [_state_product_fields(product) for product in _iter_state_products(data)]
+
+def parse_transfer_state(texts):
+    """Champs du produit trouvés dans l'état de transfert Angular"""
+    for text in texts or []:
+        fields = extract_state_fields(decode_transfer_state(text))
+        if fields:
+            return fields
+    return {}
+
+def parse_structured_data(ld_json_texts=None, state_texts=None):
+    """Champs du produit issus du JSON-LD, complétés par l'état de transfert"""
+    fields = parse_transfer_state(state_texts)
+    fields.update(parse_ld_json(ld_json_texts))
+    return fields
@@ -0,0 +1,99 @@
+"""
+Clés canoniques, frontière d'URLs et journal de reprise du crawl
+"""
+from crawl_checkpoint import CrawlCheckpoint
+from frontier import URLFrontier, canonical_product_key, canonical_product_url, ean_from_slug, url_fingerprint
+
+CATEGORY_URL = "https://www.e.leclerc/cat/parapharmacie"
+EAN = 3282770204681
+PRODUCT_URL = f"https://www.e.leclerc/fp/creme-mains-{EAN}"
+OTHER_URL = "https://www.e.leclerc/fp/coffret-cadeau"
+
+def test_canonical_url_drops_query_fragment_and_slash():
+    url = "HTTPS://WWW.E.Leclerc/fp/coffret-cadeau/?utm_source=mail#avis"
+    assert canonical_product_url(url) == OTHER_URL
+
+def test_ean_from_slug():
+    assert ean_from_slug(PRODUCT_URL + "?sid=42") == EAN
+    assert ean_from_slug(PRODUCT_URL[:-1] + "0") is None
+    assert ean_from_slug(f"https://www.e.leclerc/cat/rayon-{EAN}") is None
+    assert ean_from_slug(OTHER_URL) is None
+
+def test_canonical_key_prefers_ean():
+    assert canonical_product_key(PRODUCT_URL) == ("ean", EAN)
+    assert canonical_product_key(f"https://www.e.leclerc/fp/autre-nom-{EAN}") == ("ean", EAN)
+    assert canonical_product_key(OTHER_URL + "?page=2") == ("url", url_fingerprint(OTHER_URL))
+
+def test_frontier_add_dedupes_variants():
+    frontier = URLFrontier()
+    assert frontier.add(PRODUCT_URL)
+    assert not frontier.add(PRODUCT_URL + "?utm_source=listing")
+    assert frontier.add(OTHER_URL)
+    assert not frontier.add(OTHER_URL + "/#avis")
+    assert len(frontier) == 2
+    assert frontier.duplicates == 2
+    assert OTHER_URL + "?x=1" in frontier
+
+def test_frontier_seed_is_not_counted_as_duplicate():
+    frontier = URLFrontier()
+    frontier.seed([PRODUCT_URL, OTHER_URL])
+    assert frontier.duplicates == 0
+    assert not frontier.add(PRODUCT_URL)
+    assert frontier.duplicates == 1
+    assert len(frontier) == 2
+
+def test_checkpoint_round_trip(tmp_path):
+    filename = str(tmp_path / "produits.csv.crawl")
+    checkpoint = CrawlCheckpoint(filename, CATEGORY_URL)
+    assert not checkpoint.load()
+    checkpoint.open()
+    checkpoint.complete_page(1, [PRODUCT_URL, OTHER_URL])
+    checkpoint.write({"Lien": PRODUCT_URL})
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(filename, CATEGORY_URL)
+    assert resumed.load()
+    assert resumed.is_page_done(1)
+    assert not resumed.is_page_done(2)
+    assert resumed.is_done(PRODUCT_URL)
+    assert not resumed.is_done(OTHER_URL)
+    assert resumed.pending_urls() == [OTHER_URL]
+
+def test_checkpoint_marks_are_written_at_checkpoint(tmp_path):
+    filename = str(tmp_path / "produits.csv.crawl")
+    checkpoint = CrawlCheckpoint(filename, CATEGORY_URL).open()
+    checkpoint.complete_page(1, [PRODUCT_URL])
+    checkpoint.write({"Lien": PRODUCT_URL})
+
+    # Produit marqué en mémoire mais pas encore sur disque
+    before = CrawlCheckpoint(filename, CATEGORY_URL)
+    before.load()
+    assert before.pending_urls() == [PRODUCT_URL]
+
+    checkpoint.checkpoint()
+    after = CrawlCheckpoint(filename, CATEGORY_URL)
+    after.load()
+    assert after.pending_urls() == []
+    checkpoint.close()
+
+def test_checkpoint_ignores_other_category(tmp_path):
+    filename = str(tmp_path / "produits.csv.crawl")
+    checkpoint = CrawlCheckpoint(filename, CATEGORY_URL).open()
+    checkpoint.complete_page(1, [PRODUCT_URL])
+    checkpoint.close()
+
+    other = CrawlCheckpoint(filename, "https://www.e.leclerc/cat/epicerie")
+    assert not other.load()
+    assert not other.is_page_done(1)
+
+def test_checkpoint_survives_truncated_last_line(tmp_path):
+    filename = str(tmp_path / "produits.csv.crawl")
+    checkpoint = CrawlCheckpoint(filename, CATEGORY_URL).open()
+    checkpoint.complete_page(1, [PRODUCT_URL, OTHER_URL])
+    checkpoint.close()
+    with open(filename, "a", encoding="utf-8") as f:
+        f.write('{"done": "https://www.e.le')
+
+    resumed = CrawlCheckpoint(filename, CATEGORY_URL)
+    assert resumed.load()
+    assert resumed.pending_urls() == [PRODUCT_URL, OTHER_URL]
@@ -0,0 +1,109 @@
+"""
+Crawl HTTP d'une catégorie contre un serveur local (base_url), sans navigateur
+"""
+import csv
+import json
+import threading
+from datetime import date
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from http_engine import HTTPFetchEngine
+from product import Product
+from rate_limiter import rate_limiter
+
+CATEGORY_URL = "https://www.e.leclerc/cat/test"
+
+PRODUCTS = {
+    "/fp/creme-a-3282770204681": ("Crème A", "3282770204681", "12.90"),
+    "/fp/creme-b-3282770204667": ("Crème B", "3282770204667", "8.50"),
+    "/fp/creme-c-3596206176757": ("Crème C", "3596206176757", "3.20"),
+}
+
+LISTING_PAGES = {
+    "page=1": ["/fp/creme-a-3282770204681", "/fp/creme-b-3282770204667?ref=listing"],
+    "page=2": ["/fp/creme-c-3596206176757", "/fp/creme-a-3282770204681", "/fp/introuvable-1234"],
+}
+
+def listing_html(links):
+    items = "".join(f'<a href="{link}">Produit</a>' for link in links)
+    return f"<html><body><div>{items}</div></body></html>"
+
+def product_html(name, ean, price):
+    ld_json = json.dumps({"@type": "Product", "name": name, "gtin13": ean, "offers": {"price": price}})
+    return f'<html><head><script type="application/ld+json">{ld_json}</script></head><body><h1>{name}</h1></body></html>'
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/cat/test":
+            body = listing_html(LISTING_PAGES.get(query or "page=1", []))
+        elif path in PRODUCTS:
+            body = product_html(*PRODUCTS[path])
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    rate_limiter.configure(initial_rate=100, max_rate=100, capacity=10)
+    yield f"http://127.0.0.1:{server.server_port}"
+    rate_limiter.configure()
+    server.shutdown()
+    server.server_close()
+
+def test_http_scrape_category_through_base_url(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from simplified_category_scraper import http_scrape_category
+
+    output_file = str(tmp_path / "categorie.csv")
+    summary = http_scrape_category(
+        CATEGORY_URL, output_file=output_file, base_url=site, browser_fallback=False, keep_results=True
+    )
+
+    assert summary["scraped"] == 3
+    assert summary["failed"] == 1
+    with open(output_file, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["EAN"] for row in rows] == ["3282770204681", "3282770204667", "3596206176757"]
+    # Les résultats gardent les URLs d'origine, sans paramètres de suivi
+    assert rows[1]["Lien"] == "https://www.e.leclerc/fp/creme-b-3282770204667"
+    assert rows[0]["Prix"] == "12,90 €"
+
+def test_http_scrape_category_without_listing_links(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from simplified_category_scraper import http_scrape_category
+
+    with pytest.raises(Exception, match="Aucun lien produit"):
+        http_scrape_category(
+            "https://www.e.leclerc/cat/vide", output_file=str(tmp_path / "vide.csv"),
+            base_url=site, browser_fallback=False
+        )
+
+def test_fallback_receives_the_rebased_url(site):
+    requested = []
+
+    def fallback(url):
+        requested.append(url)
+        return Product(url, date.today(), name="Introuvable")
+
+    url = "https://www.e.leclerc/fp/introuvable-1234"
+    with HTTPFetchEngine(site, fallback=fallback, max_workers=1) as engine:
+        product = engine.scrape_product(url)
+
+    assert requested == [f"{site}/fp/introuvable-1234"]
+    assert product.url == url
+    assert engine.get_stats()["fallback"] == 1
@@ -0,0 +1,140 @@
+"""
+Pagination de l'API de listing rejouée en HTTP, contre un serveur local
+"""
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import listing_api
+from listing_api import ListingAPICrawler, build_page_request, extract_total_pages
+from rate_limiter import rate_limiter
+
+PAGE_SIZE = 4
+
+class ListingHandler(BaseHTTPRequestHandler):
+    """API de recherche: ?page=N, 10 produits, sans nombre de pages ni total"""
+
+    products = 10
+    failures = {}
+
+    def do_GET(self):
+        page = int(parse_qs(urlsplit(self.path).query)["page"][0])
+        if self.failures.get(page, 0) > 0:
+            self.failures[page] -= 1
+            self.send_error(400)
+            return
+        start = (page - 1) * PAGE_SIZE
+        items = [{"url": f"/fp/produit-{index}"} for index in range(start, min(start + PAGE_SIZE, self.products))]
+        data = json.dumps({"results": {"items": items}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(listing_api, "LISTING_RETRY_DELAY", 0)
+    monkeypatch.setattr(ListingHandler, "failures", {})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ListingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    rate_limiter.configure(initial_rate=100, max_rate=100, capacity=10)
+    yield f"http://127.0.0.1:{server.server_port}"
+    rate_limiter.configure()
+    server.shutdown()
+    server.server_close()
+
+def template(api_url):
+    return {"url": f"{api_url}/api/search?page=1", "method": "GET", "site_url": "https://www.e.leclerc/"}
+
+def crawl(crawler, **kwargs):
+    try:
+        return list(crawler.crawl(**kwargs))
+    finally:
+        crawler.close()
+
+def test_crawl_without_page_count_stops_at_empty_page(api):
+    crawler = ListingAPICrawler(template(api), max_workers=2)
+    pages = crawl(crawler)
+    assert crawler.total_pages is None
+    assert [page for page, _ in pages] == [1, 2, 3]
+    assert pages[2][1] == ["https://www.e.leclerc/fp/produit-8", "https://www.e.leclerc/fp/produit-9"]
+
+def test_crawl_without_page_count_respects_max_pages(api):
+    pages = crawl(ListingAPICrawler(template(api), max_workers=2), max_pages=2)
+    assert [page for page, _ in pages] == [1, 2]
+
+def test_failed_page_is_retried(api):
+    ListingHandler.failures[2] = listing_api.LISTING_PAGE_RETRIES
+    crawler = ListingAPICrawler(template(api), max_workers=2)
+    pages = crawl(crawler)
+    assert [page for page, links in pages if links] == [1, 2, 3]
+    assert crawler.failed_pages == []
+
+def test_page_still_failing_is_reported(api):
+    ListingHandler.failures[2] = listing_api.LISTING_PAGE_RETRIES + 1
+    crawler = ListingAPICrawler(template(api), max_workers=2)
+    pages = crawl(crawler)
+    assert pages[1] == (2, None)
+    assert crawler.failed_pages == [2]
+
+def query_of(request):
+    return parse_qs(urlsplit(request["url"]).query)
+
+def test_build_page_request_get_query():
+    template = {"url": "https://api.example/search?q=creme&page=1&size=24", "method": "GET",
+                "headers": {"Accept": "application/json", "Cookie": "secret", "Content-Length": "0"}}
+    request = build_page_request(template, 3)
+    assert query_of(request) == {"q": ["creme"], "page": ["3"], "size": ["24"]}
+    assert request["headers"] == {"Accept": "application/json"}
+    assert request["data"] is None
+
+def test_build_page_request_post_json_body():
+    template = {"url": "https://api.example/search", "method": "POST",
+                "postData": json.dumps({"query": {"text": "creme", "pageNumber": 1}})}
+    request = build_page_request(template, 4)
+    assert request["method"] == "POST"
+    assert json.loads(request["data"]) == {"query": {"text": "creme", "pageNumber": 4}}
+    assert query_of(request) == {}
+
+def test_build_page_request_adds_page_to_post_body():
+    template = {"url": "https://api.example/search", "method": "POST", "postData": json.dumps({"q": "creme"})}
+    request = build_page_request(template, 2)
+    assert json.loads(request["data"]) == {"q": "creme", "page": 2}
+    assert "page" not in query_of(request)
+
+def test_build_page_request_offset_mode():
+    template = {"url": "https://api.example/search?from=0&limit=30", "method": "GET"}
+    assert query_of(build_page_request(template, 3))["from"] == ["60"]
+    body_template = {"url": "https://api.example/search", "method": "POST", "postData": json.dumps({"offset": 0})}
+    assert json.loads(build_page_request(body_template, 1, page_size=24)["data"]) == {"offset": 0}
+    assert json.loads(build_page_request(body_template, 3, page_size=24)["data"]) == {"offset": 48}
+    with pytest.raises(ValueError):
+        build_page_request(body_template, 2)
+
+def test_build_page_request_zero_based_pages():
+    template = {"url": "https://api.example/search?page=0", "method": "GET"}
+    assert query_of(build_page_request(template, 1))["page"] == ["0"]
+    assert query_of(build_page_request(template, 3))["page"] == ["2"]
+    body_template = {"url": "https://api.example/search", "method": "POST",
+                     "postData": json.dumps({"page": 5}), "page_base": 0}
+    assert json.loads(build_page_request(body_template, 1)["data"]) == {"page": 0}
+
+def test_extract_total_pages():
+    assert extract_total_pages({"meta": {"totalPages": 12}}) == 12
+    assert extract_total_pages({"pagination": {"nbPages": "7"}}) == 7
+    assert extract_total_pages({"total": 95}, page_size=24) == 4
+    assert extract_total_pages({"total": 95}) is None
+    assert extract_total_pages({"items": []}) is None
+
+def test_extract_total_pages_prefers_top_level_keys():
+    data = {"items": [{"offer": {"total": 3}}], "total": 240}
+    assert extract_total_pages(data, page_size=24) == 10
+    assert extract_total_pages({"cart": {"total": "12,90"}, "results": {"totalCount": 48}}, page_size=24) == 2
@@ -0,0 +1,88 @@
+"""
+Produit lu dans les réponses JSON capturées, contrôlé par le DOM
+"""
+import pytest
+
+import network_capture
+from network_capture import api_fields_from_responses, build_record_from_capture, compare_dom_and_api, get_capture_stats
+
+EAN = "3282770204681"
+OTHER_EAN = "3596206176757"
+URL = f"https://www.e.leclerc/fp/creme-mains-{EAN}"
+
+@pytest.fixture(autouse=True)
+def stats():
+    network_capture.reset_capture_stats()
+    yield
+    network_capture.reset_capture_stats()
+
+def dom_record(**overrides):
+    record = {
+        "Lien": URL,
+        "Date": "2024-03-01",
+        "Nom du produit": "Crème mains",
+        "Marque": "Neutrogena",
+        "Catégorie": "Marques Parapharmacie",
+        "EAN": EAN,
+        "Prix": "4,99 €",
+    }
+    record.update(overrides)
+    return record
+
+def api_product(ean, label="Crème mains", price=4.99, brand="Neutrogena"):
+    return {"ean": ean, "label": label, "price": price, "brand": {"label": brand}}
+
+def response(data, kind="product"):
+    return {"url": "https://www.e.leclerc/api/rest/product", "kind": kind, "request": {}, "data": data}
+
+def test_api_fields_pick_the_page_ean():
+    responses = [response({"products": [api_product(OTHER_EAN, "Savon"), api_product(EAN)]})]
+    fields, skipped = api_fields_from_responses(responses, {int(EAN)})
+    assert fields["EAN"] == EAN
+    assert fields["Prix"] == "4,99 €"
+    assert skipped == 1
+    assert get_capture_stats()["api_records"] == 1
+
+def test_api_fields_ignore_search_responses():
+    fields, skipped = api_fields_from_responses([response(api_product(EAN), kind="search")], {int(EAN)})
+    assert fields == {}
+    assert skipped == 0
+
+def test_recommendations_keep_the_dom_record():
+    record = dom_record()
+    responses = [response({"recommendations": [api_product(OTHER_EAN, "Savon", 2.5)]})]
+    assert build_record_from_capture(URL, record, responses) is record
+    stats = get_capture_stats()
+    assert stats["unmatched"] == 1
+    assert stats["api_records"] == 0
+
+def test_no_product_response_is_not_unmatched():
+    record = dom_record()
+    assert build_record_from_capture(URL, record, []) is record
+    assert get_capture_stats()["unmatched"] == 0
+
+def test_api_fields_override_dom():
+    responses = [response({"product": api_product(EAN, price=3.99)})]
+    record = build_record_from_capture(URL, dom_record(Catégorie="Soins"), responses)
+    assert record["Prix"] == "3,99 €"
+    assert record["Catégorie"] == "Soins"
+    assert record["Lien"] == URL
+
+def test_matches_dom_ean_when_slug_has_none():
+    url = "https://www.e.leclerc/fp/creme-mains"
+    responses = [response({"product": api_product(EAN)})]
+    record = build_record_from_capture(url, dom_record(Lien=url), responses)
+    assert record["EAN"] == EAN
+    assert get_capture_stats()["api_records"] == 1
+
+def test_disagreement_is_counted():
+    api_fields = {"Nom du produit": "Crème mains", "EAN": EAN, "Prix": "5,49 €", "Marque": "NEUTROGENA"}
+    disagreements = compare_dom_and_api(URL, dom_record(), api_fields)
+    assert disagreements == [("price_cents", 499, 549)]
+    assert get_capture_stats()["disagreements"] == 1
+
+def test_agreement_is_not_counted():
+    api_fields = {"Nom du produit": "crème mains ", "EAN": EAN, "Prix": "4,99 €"}
+    assert compare_dom_and_api(URL, dom_record(), api_fields) == []
+    assert compare_dom_and_api(URL, dom_record(), {}) == []
+    assert get_capture_stats()["disagreements"] == 0
@@ -0,0 +1,96 @@
+"""
+Historique des prix en plages et analyse des prix en centimes
+"""
+import pytest
+
+from extraction import parse_price_cents
+from price_history import PriceHistory, parse_day
+
+EAN = 3282770204681
+OTHER_EAN = 3596206176757
+
+@pytest.fixture
+def history(tmp_path):
+    history = PriceHistory(str(tmp_path / "historique.db")).open()
+    yield history
+    history.close()
+
+def observe(history, ean, day, price_cents):
+    history.observe(ean, parse_day(day), price_cents)
+
+def test_same_price_extends_the_run(history):
+    observe(history, EAN, "2024-03-01", 1290)
+    observe(history, EAN, "2024-03-02", 1290)
+    observe(history, EAN, "2024-03-05", 1290)
+    assert history.price_series(EAN) == [{"from": "2024-03-01", "to": "2024-03-05", "price_cents": 1290}]
+
+def test_price_change_opens_a_new_run(history):
+    observe(history, EAN, "2024-03-01", 1290)
+    observe(history, EAN, "2024-03-02", 1190)
+    observe(history, EAN, "2024-03-03", 1290)
+    assert history.price_series(EAN) == [
+        {"from": "2024-03-01", "to": "2024-03-01", "price_cents": 1290},
+        {"from": "2024-03-02", "to": "2024-03-02", "price_cents": 1190},
+        {"from": "2024-03-03", "to": "2024-03-03", "price_cents": 1290},
+    ]
+
+def test_out_of_order_observation_is_dropped(history):
+    observe(history, EAN, "2024-03-01", 1290)
+    observe(history, EAN, "2024-03-05", 1290)
+    observe(history, EAN, "2024-03-03", 990)
+    observe(history, EAN, "2024-03-04", 1290)
+    assert history.price_series(EAN) == [{"from": "2024-03-01", "to": "2024-03-05", "price_cents": 1290}]
+
+def test_unavailable_price_is_its_own_run(history):
+    observe(history, EAN, "2024-03-01", 1290)
+    observe(history, EAN, "2024-03-02", None)
+    observe(history, EAN, "2024-03-03", None)
+    assert history.price_series(EAN)[-1] == {"from": "2024-03-02", "to": "2024-03-03", "price_cents": None}
+
+def test_write_uses_csv_records(history):
+    history.write({"Lien": "https://x/fp/a", "Date": "2024-03-01", "EAN": "3282770204681", "Prix": "12,90 €"})
+    history.write({"Lien": "https://x/fp/b", "Date": "2024-03-01", "EAN": "", "Prix": "3,50 €"})
+    history.checkpoint()
+    assert history.price_series("3282770204681") == [{"from": "2024-03-01", "to": "2024-03-01", "price_cents": 1290}]
+
+def test_changes_since(history):
+    observe(history, EAN, "2024-03-01", 1290)
+    observe(history, EAN, "2024-03-10", 1190)
+    observe(history, OTHER_EAN, "2024-03-12", 350)
+    observe(history, OTHER_EAN, "2024-03-15", 390)
+    assert history.changes_since("2024-03-10") == [
+        {"ean": "3282770204681", "date": "2024-03-10", "old_price_cents": 1290, "new_price_cents": 1190},
+        {"ean": "3596206176757", "date": "2024-03-15", "old_price_cents": 350, "new_price_cents": 390},
+    ]
+    assert history.changes_since("2024-03-11") == [
+        {"ean": "3596206176757", "date": "2024-03-15", "old_price_cents": 350, "new_price_cents": 390},
+    ]
+
+def test_history_survives_reopening(tmp_path):
+    path = str(tmp_path / "historique.db")
+    history = PriceHistory(path).open()
+    observe(history, EAN, "2024-03-01", 1290)
+    history.close()
+    history = PriceHistory(path).open()
+    observe(history, EAN, "2024-03-02", 1290)
+    assert history.price_series(EAN) == [{"from": "2024-03-01", "to": "2024-03-02", "price_cents": 1290}]
+    history.close()
+
+@pytest.mark.parametrize("text, cents", [
+    ("14,99 €", 1499),
+    ("14.99", 1499),
+    ("14 €", 1400),
+    ("14,9 €", 1490),
+    ("1 299,99 €", 129999),
+    ("1 299,99 €", 129999),
+    ("Prix: 3,50 €", 350),
+    ("Lot de 2 150,00 €", 15000),
+    ("Lot de 2 1 299,00 €", 129900),
+    ("Lot de 3 - 15,90 €", 1590),
+    ("0,99 € / 100 ml", 99),
+    ("", None),
+    (None, None),
+    ("Non disponible", None),
+])
+def test_parse_price_cents(text, cents):
+    assert parse_price_cents(text) == cents
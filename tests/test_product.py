@@ -0,0 +1,93 @@
+"""
+Produit typé, adaptateurs de colonnes du CSV et choix de l'EAN
+"""
+import logging
+from datetime import date
+
+from extraction import pick_ean
+from product import Product, as_product, parse_ean
+
+VALID_EAN = "3282770204681"
+INVALID_EAN = "3282770204680"
+OTHER_EAN = "3596206176757"
+
+def csv_record(**overrides):
+    record = {
+        "Catégorie": "Parapharmacie",
+        "Date": "2024-03-01",
+        "EAN": VALID_EAN,
+        "Lien": f"https://www.e.leclerc/fp/creme-mains-{VALID_EAN}",
+        "Marque": "Neutrogena",
+        "Nom du produit": "Crème mains",
+        "Prix": "1 299,99 €",
+    }
+    record.update(overrides)
+    return record
+
+def test_from_record_parses_numeric_fields():
+    product = Product.from_record(csv_record())
+    assert product.ean == int(VALID_EAN)
+    assert product.price_cents == 129999
+    assert product.date == date(2024, 3, 1)
+    assert product.available is True
+
+def test_price_round_trip_drops_thousands_separator():
+    record = Product.from_record(csv_record()).to_record()
+    assert record["Prix"] == "1299,99 €"
+    assert Product.from_record(record).to_record() == record
+
+def test_to_record_keeps_csv_columns():
+    record = Product.from_record(csv_record()).to_record()
+    assert list(record) == list(Product.COLUMNS)
+    assert record["EAN"] == VALID_EAN
+    assert record["Date"] == "2024-03-01"
+    assert record["Nom du produit"] == "Crème mains"
+
+def test_missing_price_is_unavailable():
+    product = Product.from_record(csv_record(Prix="Prix non trouvé"))
+    assert product.price_cents is None
+    assert product.available is False
+    assert product["Prix"] == "Non disponible"
+
+def test_ean_keeps_leading_zero():
+    product = Product.from_record(csv_record(EAN="0012345678905"))
+    assert product.ean == 12345678905
+    assert product["EAN"] == "0012345678905"
+
+def test_invalid_ean_is_blanked_with_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="product"):
+        product = Product.from_record(csv_record(EAN=INVALID_EAN))
+    assert product.ean is None
+    assert product["EAN"] == ""
+    assert INVALID_EAN in caplog.text
+
+def test_short_value_is_not_an_ean():
+    assert parse_ean("1234") is None
+    assert parse_ean("") is None
+
+def test_dict_access_uses_csv_columns():
+    product = Product.from_record(csv_record())
+    assert set(product.keys()) == set(Product.COLUMNS)
+    assert product.get("Marque") == "Neutrogena"
+    assert product.get("Inconnue", "-") == "-"
+
+def test_as_product_converts_records_only():
+    product = Product.from_record(csv_record())
+    assert as_product(product) is product
+    assert as_product(csv_record()).to_record() == product.to_record()
+
+def test_pick_ean_prefers_url():
+    url = f"https://www.e.leclerc/fp/creme-mains-{VALID_EAN}"
+    assert pick_ean(url, [OTHER_EAN], "") == VALID_EAN
+
+def test_pick_ean_skips_invalid_candidate(caplog):
+    url = f"https://www.e.leclerc/fp/creme-mains-{INVALID_EAN}"
+    with caplog.at_level(logging.WARNING, logger="extraction"):
+        assert pick_ean(url, ["Code EAN", OTHER_EAN], "") == OTHER_EAN
+    assert INVALID_EAN in caplog.text
+
+def test_pick_ean_falls_back_to_page_text():
+    url = "https://www.e.leclerc/fp/creme-mains"
+    body = f"Référence {INVALID_EAN} puis {VALID_EAN}"
+    assert pick_ean(url, [], body) == VALID_EAN
+    assert pick_ean(url, [], f"Référence {INVALID_EAN}") == ""
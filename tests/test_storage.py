@@ -0,0 +1,174 @@
+"""
+Écriture incrémentale: CSV avec checkpoints, writer d'arrière-plan et base SQLite
+"""
+import csv
+import json
+import time
+
+import pytest
+
+from storage import BackgroundWriter, SQLiteStore, StreamingCSVWriter, export_database_to_csv
+
+def record(index, ean=""):
+    return {
+        "Lien": f"https://www.e.leclerc/fp/produit-{index}",
+        "Date": "2024-03-01",
+        "Nom du produit": f"Produit {index}",
+        "Marque": "Avène",
+        "Catégorie": "Soins visage",
+        "EAN": ean,
+        "Prix": "12,90 €",
+    }
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def crash(writer):
+    """Ferme le fichier sans checkpoint, comme un arrêt brutal du processus"""
+    writer.file.flush()
+    writer.file.close()
+    writer.file = None
+
+def test_csv_rows_and_checkpoint_sidecar(tmp_path):
+    path = str(tmp_path / "produits.csv")
+    with StreamingCSVWriter(path) as writer:
+        writer.write_many(record(index) for index in range(3))
+    assert [row["Nom du produit"] for row in read_rows(path)] == ["Produit 0", "Produit 1", "Produit 2"]
+    with open(path + ".checkpoint", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["rows"] == 3
+    assert checkpoint["offset"] == (tmp_path / "produits.csv").stat().st_size
+    assert not (tmp_path / "produits.csv.checkpoint.tmp").exists()
+
+def test_partial_rows_after_checkpoint_are_truncated(tmp_path):
+    path = str(tmp_path / "produits.csv")
+    writer = StreamingCSVWriter(path).open()
+    writer.write_many(record(index) for index in range(3))
+    writer.checkpoint()
+    writer.write(record(3))
+    writer.file.write('Soins visage,2024-03-01,,https://www.e.leclerc/fp/produit-4,"Avè')
+    crash(writer)
+
+    writer = StreamingCSVWriter(path, append=True).open()
+    assert writer.rows == 3
+    writer.write(record(5))
+    writer.close()
+    assert [row["Nom du produit"] for row in read_rows(path)] == ["Produit 0", "Produit 1", "Produit 2", "Produit 5"]
+
+def test_complete_rows_after_checkpoint_are_kept(tmp_path):
+    path = str(tmp_path / "produits.csv")
+    writer = StreamingCSVWriter(path).open()
+    writer.write(record(0))
+    writer.checkpoint()
+    writer.write(record(1))
+    crash(writer)
+
+    writer = StreamingCSVWriter(path, append=True).open()
+    assert writer.rows == 2
+    writer.close()
+    assert len(read_rows(path)) == 2
+
+def test_append_false_starts_a_new_file(tmp_path):
+    path = str(tmp_path / "produits.csv")
+    with StreamingCSVWriter(path) as writer:
+        writer.write(record(0))
+    with StreamingCSVWriter(path) as writer:
+        writer.write(record(1))
+    assert [row["Nom du produit"] for row in read_rows(path)] == ["Produit 1"]
+
+class SlowSink:
+    """Sink qui note ses appels et ralentit chaque écriture"""
+
+    def __init__(self):
+        self.calls = []
+
+    def open(self):
+        self.calls.append("open")
+
+    def write(self, record):
+        time.sleep(0.001)
+        self.calls.append(record["Lien"])
+
+    def checkpoint(self):
+        self.calls.append("checkpoint")
+
+    def close(self):
+        self.calls.append("close")
+
+class FailingSink(SlowSink):
+    def write(self, record):
+        raise OSError("disque plein")
+
+def test_background_writer_close_drains_the_queue():
+    sink = SlowSink()
+    writer = BackgroundWriter([sink], max_buffer=10).start()
+    for index in range(100):
+        writer.submit(record(index))
+    writer.checkpoint()
+    writer.close()
+    assert sink.calls[0] == "open"
+    assert sink.calls[1:101] == [record(index)["Lien"] for index in range(100)]
+    assert sink.calls[101:] == ["checkpoint", "close"]
+    assert writer.written == 100
+
+def test_background_writer_keeps_other_sinks_on_error(tmp_path):
+    path = str(tmp_path / "produits.csv")
+    writer = BackgroundWriter([FailingSink(), StreamingCSVWriter(path)]).start()
+    writer.submit(record(0))
+    writer.close()
+    assert writer.errors == 1
+    assert len(read_rows(path)) == 1
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "produits.db")).open()
+    yield store
+    store.close()
+
+def test_sqlite_upsert_by_ean(store):
+    store.write(record(0, ean="3282770204681"))
+    updated = dict(record(1, ean="3282770204681"), Prix="11,90 €")
+    store.write(updated)
+    store.checkpoint()
+    products = list(store.iter_products())
+    assert len(products) == 1
+    assert products[0]["Prix"] == "11,90 €"
+    assert store.get_by_ean("3282770204681")["Lien"] == updated["Lien"]
+
+def test_sqlite_upsert_by_url_without_ean(store):
+    store.write(record(0))
+    store.write(dict(record(0), Prix="9,90 €"))
+    store.write(record(1))
+    assert [product["Prix"] for product in store.iter_products()] == ["9,90 €", "12,90 €"]
+
+def test_sqlite_ean_found_later_merges_the_url_row(store):
+    store.write(record(0))
+    store.write(record(1))
+    store.checkpoint()
+    store.write(dict(record(0, ean="3282770204681"), Prix="11,90 €"))
+    products = list(store.iter_products())
+    assert [product["EAN"] for product in products] == ["3282770204681", ""]
+    assert products[0]["Prix"] == "11,90 €"
+    assert store.get_by_ean("3282770204681")["Lien"] == record(0)["Lien"]
+
+def test_sqlite_missing_ean_updates_the_ean_row(store):
+    store.write(record(0, ean="3282770204681"))
+    store.write(dict(record(0), Prix="9,90 €"))
+    products = list(store.iter_products())
+    assert len(products) == 1
+    assert products[0]["EAN"] == "3282770204681"
+    assert products[0]["Prix"] == "9,90 €"
+
+def test_sqlite_has_url(store):
+    store.write(record(0, ean="3282770204681"))
+    store.checkpoint()
+    assert store.has_url(record(0)["Lien"])
+    assert not store.has_url(record(1)["Lien"])
+
+def test_sqlite_export_to_csv(tmp_path, store):
+    store.write(record(0, ean="3282770204681"))
+    store.write(record(1))
+    store.close()
+    path = export_database_to_csv(str(tmp_path / "produits.db"), str(tmp_path / "export.csv"))
+    assert [row["EAN"] for row in read_rows(path)] == ["3282770204681", ""]
@@ -0,0 +1,94 @@
+"""
+Données structurées: JSON-LD de forme inattendue et repli sur le DOM
+"""
+import json
+
+from extraction import build_product_record
+from structured_data import parse_ld_json, parse_structured_data
+
+URL = "https://www.e.leclerc/fp/avene-cicalfate-creme-100-ml-3282770204681"
+
+def ld(data):
+    return json.dumps(data)
+
+def candidates(ld_json):
+    return {
+        "ld_json": ld_json,
+        "state": [],
+        "title": "Crème réparatrice DOM",
+        "h1_texts": [],
+        "td_texts": [],
+        "euros": "12",
+        "cents": "90",
+        "price_texts": [],
+        "brand": "Avène",
+        "body_text": "",
+    }
+
+def test_product_and_breadcrumb():
+    fields = parse_ld_json([
+        ld({"@type": "Product", "name": "Cicalfate", "brand": {"name": "Avène"},
+            "gtin13": "3282770204681", "offers": {"price": "12.90"}}),
+        ld({"@type": "BreadcrumbList", "itemListElement": [
+            {"position": 2, "item": {"name": "Soins visage"}},
+            {"position": 1, "item": {"name": "Accueil"}},
+        ]}),
+    ])
+    assert fields == {
+        "Nom du produit": "Cicalfate", "Marque": "Avène", "EAN": "3282770204681",
+        "Prix": "12,90 €", "Catégorie": "Soins visage",
+    }
+
+def test_string_offers_keeps_other_fields():
+    fields = parse_ld_json([ld({"@type": "Product", "name": "Cicalfate", "offers": "12.90"})])
+    assert fields == {"Nom du produit": "Cicalfate"}
+
+def test_offers_list_skips_non_dict_entries():
+    fields = parse_ld_json([ld({"@type": "Product", "name": "Cicalfate", "offers": ["x", {"price": 5}]})])
+    assert fields["Prix"] == "5,00 €"
+
+def test_non_dict_breadcrumb_entries_are_skipped():
+    fields = parse_ld_json([ld({"@type": "BreadcrumbList", "itemListElement": [
+        "Accueil", {"position": 1, "item": {"name": "Parapharmacie"}}, None,
+    ]})])
+    assert fields == {"Catégorie": "Parapharmacie"}
+
+def test_mixed_position_types_are_sorted_as_integers():
+    fields = parse_ld_json([ld({"@type": "BreadcrumbList", "itemListElement": [
+        {"position": "10", "item": {"name": "Crèmes"}},
+        {"position": 2, "item": {"name": "Soins visage"}},
+        {"position": "x", "item": {"name": "Accueil"}},
+    ]})])
+    assert fields == {"Catégorie": "Crèmes"}
+
+def test_bad_block_is_skipped_for_the_next_one():
+    fields = parse_ld_json([
+        "{not json",
+        ld({"@type": "BreadcrumbList", "itemListElement": {"position": 1}}),
+        ld({"@type": "Product", "name": "Cicalfate"}),
+    ])
+    assert fields == {"Nom du produit": "Cicalfate"}
+
+def test_gtin14_is_normalised_to_ean13():
+    fields = parse_ld_json([ld({"@type": "Product", "name": "Cicalfate", "gtin14": "03282770204681"})])
+    assert fields["EAN"] == "3282770204681"
+
+def test_invalid_gtin_is_left_to_pick_ean():
+    fields = parse_ld_json([ld({"@type": "Product", "name": "Cicalfate", "gtin13": "3282770204680"})])
+    assert "EAN" not in fields
+
+def test_unexpected_shapes_fall_back_to_the_dom():
+    record = build_product_record(URL, candidates([
+        ld({"@type": "Product", "name": "Cicalfate", "offers": "gratuit"}),
+        ld({"@type": "BreadcrumbList", "itemListElement": ["Accueil", {"position": "1"}, {"position": 2}]}),
+    ]))
+    assert record["Nom du produit"] == "Cicalfate"
+    assert record["Prix"] == "12,90 €"
+    assert record["Marque"] == "Avène"
+    assert record["EAN"] == "3282770204681"
+
+def test_transfer_state_completed_by_ld_json():
+    state = json.dumps({"product": {"ean": "3282770204681", "label": "Cicalfate état", "price": 11.5}})
+    fields = parse_structured_data([ld({"@type": "Product", "name": "Cicalfate"})], [state.replace('"', "&q;")])
+    assert fields["Nom du produit"] == "Cicalfate"
+    assert fields["Prix"] == "11,50 €"